@@ -0,0 +1,127 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import httpx
+
+from http_cache import CachedPage
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """Spaces out requests so no single host sees more than `rps` requests per second."""
+
+    def __init__(self, rps):
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self._next_slot = {}
+        self._locks = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class AsyncFetcher:
+    """Pooled keep-alive HTTP client with bounded concurrency, per-host rate limiting and retries.
+
+    With `stats` (a run_report.RunStats), every attempt is recorded with its latency, size and status.
+    """
+
+    def __init__(self, concurrency=8, rps=4.0, retries=3, backoff=0.5, timeout=30.0, cache=None, stats=None):
+        self.concurrency = concurrency
+        self.cache = cache
+        self.stats = stats
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = HostRateLimiter(rps)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=concurrency,
+                max_keepalive_connections=concurrency,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _backoff_delay(self, attempt):
+        return self.backoff * (2 ** attempt) * (1 + random.random())
+
+    async def get(self, url, headers=None):
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self.rate_limiter.wait(host)
+                start = time.perf_counter()
+                try:
+                    response = await self._client.get(url, headers=headers)
+                except httpx.TransportError as exc:
+                    if self.stats is not None:
+                        self.stats.record_fetch(time.perf_counter() - start, error=type(exc).__name__)
+                    if attempt >= self.retries:
+                        raise
+                    response = None
+                else:
+                    if self.stats is not None:
+                        self.stats.record_fetch(time.perf_counter() - start, response.status_code, len(response.content))
+
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
+
+            if attempt >= self.retries:
+                response.raise_for_status()
+
+            delay = self._backoff_delay(attempt)
+            if response is not None:
+                delay = max(delay, _retry_after_seconds(response) or 0.0)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get_text(self, url):
+        response = await self.get(url)
+        return response.text
+
+    async def fetch_page(self, url):
+        if self.cache is None:
+            return CachedPage(url, await self.get_text(url), True)
+        response = await self.get(url, headers=self.cache.conditional_headers(url))
+        return self.cache.resolve(url, response)
@@ -0,0 +1,361 @@
+import time
+from collections import Counter
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import SQLModel
+
+import job_queue
+import repo_path  # noqa: F401  makes the shared app modules importable
+from app import changes, dataset_version, search_index
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _table(name):
+    return SQLModel.metadata.tables[name]
+
+
+def _upsert(table, index_elements):
+    statement = insert(table)
+    update_columns = {
+        column.name: statement.excluded[column.name]
+        for column in table.columns
+        if column.name not in index_elements and column.name != "id"
+    }
+    return statement.on_conflict_do_update(index_elements=index_elements, set_=update_columns)
+
+
+def _stored(conn, table, key, columns, keys):
+    """{key: row} of the stored rows of `table` whose `key` column is in `keys`."""
+    table = _table(table)
+    rows = conn.execute(select(table.c[key], *(table.c[column] for column in columns)).where(table.c[key].in_(list(keys))))
+    return {row[0]: row for row in rows}
+
+
+def _changed(entity, rows, stored, now, events):
+    """The `rows` whose content hash differs from the `stored` one, stamped with hash and time; adds their events."""
+    changed = []
+    for key, row in rows.items():
+        row["content_hash"] = changes.content_hash(entity, row)
+        if key in stored and stored[key].content_hash == row["content_hash"]:
+            continue
+        row["changed_at"] = now
+        changed.append(row)
+        events.append(changes.event(entity, "updated" if key in stored else "created", row))
+    return changed
+
+
+class BulkWriter:
+    """Buffers parsed scraper records and writes them in large transactions.
+
+    Every record gets a content hash (see app/changes.py) that is compared with the stored one, so
+    only new and changed rows are written. Services, details and Standorte are written with INSERT
+    ... ON CONFLICT DO UPDATE. The Formulare of a service and the links of a Standort are replaced
+    as a set: Formulare are matched to the stored ones by URL and links by service, so only the
+    difference is inserted, updated or deleted. After a complete listing pass, `remove_unlisted`
+    deletes the services or Standorte the listing no longer has, with their dependent rows. Every write appends a created, updated or deleted
+    event to the change log; the search index documents of the changed rows are refreshed and the
+    dataset version is bumped in the same transaction, and a flush that changed nothing leaves
+    both alone. A flush happens whenever `batch_size` records are pending and once more when the
+    writer is closed. With a `geocoder`, the coordinates of the buffered Standorte are looked up
+    right before their transaction starts. With `stats` (a run_report.RunStats), geocoding and
+    write time and the outcome of every buffered row are recorded.
+    """
+
+    def __init__(self, engine, batch_size=DEFAULT_BATCH_SIZE, geocoder=None, stats=None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.geocoder = geocoder
+        self.stats = stats
+        self._reset()
+
+    def _reset(self):
+        self._services = {}
+        self._details = {}
+        self._formulare = {}
+        self._standorte = {}
+        self._links = {}
+        # entity -> {id: listing fields} of entries whose detail page did not change
+        self._listings = {"service": {}, "standort": {}}
+        # entity -> ids in a complete listing; stored rows of the entity outside them are deleted
+        self._listed = {}
+        self._finished_jobs = []
+        self._after_flush = []
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def _added(self, count=1):
+        self._pending += count
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def add_service(self, service_id, service_name, link, can_be_done_online):
+        self._services[service_id] = {
+            "id": service_id,
+            "service_name": service_name,
+            "link": link,
+            "can_be_done_online": can_be_done_online,
+        }
+        self._added()
+
+    def add_service_listing(self, service_id, service_name, link):
+        """Buffer the name and link an unchanged service has in the A-Z listing; its detail fields are kept as stored."""
+        self._listings["service"][service_id] = {"service_name": service_name, "link": link}
+        self._added()
+
+    def add_service_detail(self, service_id, title, description, description_clean=None, sections=None):
+        self._details[service_id] = {
+            "service_id": service_id,
+            "title": title,
+            "description": description,
+            "description_clean": description_clean,
+            "sections": sections,
+        }
+        self._added()
+
+    def replace_formulare(self, service_id, formulars):
+        self._formulare[service_id] = [
+            {"service_id": service_id, "title": formular["title"], "url": formular["url"]}
+            for formular in formulars
+        ]
+        self._added(max(1, len(formulars)))
+
+    def add_standort(self, standort_id, name, link, address=None, phone=None, fax=None, email=None, homepage=None):
+        self._standorte[standort_id] = {
+            "id": standort_id,
+            "name": name,
+            "link": link,
+            "address": address,
+            "phone": phone,
+            "fax": fax,
+            "email": email,
+            "homepage": homepage,
+            "lat": None,
+            "lon": None,
+        }
+        self._added()
+
+    def add_standort_listing(self, standort_id, name, link):
+        """Buffer the name and link an unchanged Standort has in the listing; its address and contacts are kept as stored."""
+        self._listings["standort"][standort_id] = {"name": name, "link": link}
+        self._added()
+
+    def remove_unlisted(self, entity, listed_ids):
+        """Delete the stored services or Standorte (`entity`) missing from a complete listing with `listed_ids`.
+
+        An empty listing is taken for a broken index page rather than for the removal of everything.
+        """
+        listed_ids = set(listed_ids)
+        if listed_ids:
+            self._listed[entity] = listed_ids
+            self._added()
+
+    def link_services(self, standort_id, service_ids):
+        self._links[standort_id] = set(service_ids)
+        self._added(max(1, len(service_ids)))
+
+    def finish_job(self, job_id):
+        """Mark a queue job done in the same transaction as the records it produced."""
+        self._finished_jobs.append(job_id)
+        self._added()
+
+    def after_flush(self, callback, *args):
+        """Run `callback(*args)` once everything buffered so far has been committed."""
+        self._after_flush.append((callback, args))
+
+    def _geocode_standorte(self):
+        if self.geocoder is None or not self._standorte:
+            return
+        start = time.perf_counter()
+        for standort in self._standorte.values():
+            point = self.geocoder.geocode(standort["address"]) if standort["address"] else None
+            if point is not None:
+                standort["lat"], standort["lon"] = point
+        if self.stats is not None:
+            self.stats.geocode.add(time.perf_counter() - start, len(self._standorte))
+
+    def _merge_listings(self, conn, entity, rows):
+        """Add the buffered listing fields of `entity` to `rows` as full rows, completed with the stored values.
+
+        Entries with a freshly parsed page are already in `rows`. Entries that were never stored are
+        left out: the page cache only skips pages whose records were committed.
+        """
+        listings = {key: fields for key, fields in self._listings[entity].items() if key not in rows}
+        if not listings:
+            return
+        table, key_column, _ = changes.ENTITIES[entity]
+        stored = _stored(conn, table, key_column, changes.HASHED_COLUMNS[entity], listings)
+        for key, fields in listings.items():
+            if key in stored:
+                rows[key] = {**stored[key]._asdict(), **fields}
+
+    def _buffered_rows(self):
+        return {
+            "service": len(self._services),
+            "servicedetail": len(self._details),
+            "formular": sum(len(rows) for rows in self._formulare.values()),
+            "standort": len(self._standorte),
+            "link": sum(len(service_ids) for service_ids in self._links.values()),
+        }
+
+    def _write_formulare(self, conn, now, events):
+        """Replace the stored Formulare of the buffered services; returns the ids of the services whose Formulare changed."""
+        formular = _table("formular")
+        stored = {}
+        for row in conn.execute(
+            select(formular.c.id, formular.c.service_id, formular.c.url, formular.c.content_hash)
+            .where(formular.c.service_id.in_(list(self._formulare))).order_by(formular.c.id)
+        ):
+            stored.setdefault((row.service_id, row.url), []).append(row)
+        inserts, updates = [], []
+        for rows in self._formulare.values():
+            for row in rows:
+                row["content_hash"] = changes.content_hash("formular", row)
+                matches = stored.get((row["service_id"], row["url"]))
+                if not matches:
+                    row["changed_at"] = now
+                    inserts.append(row)
+                    continue
+                match = matches.pop(0)
+                if match.content_hash != row["content_hash"]:
+                    row.update(id=match.id, changed_at=now)
+                    updates.append(row)
+        deletes = [match for matches in stored.values() for match in matches]
+        if deletes:
+            conn.execute(delete(formular).where(formular.c.id.in_([match.id for match in deletes])))
+            events.extend(changes.event("formular", "deleted", match._asdict()) for match in deletes)
+        if updates:
+            conn.execute(
+                update(formular).where(formular.c.id == bindparam("formular_id"))
+                .values(title=bindparam("title"), content_hash=bindparam("content_hash"), changed_at=bindparam("changed_at")),
+                [{**row, "formular_id": row["id"]} for row in updates],
+            )
+            events.extend(changes.event("formular", "updated", row) for row in updates)
+        if inserts:
+            ids = conn.execute(insert(formular).returning(formular.c.id, sort_by_parameter_order=True), inserts).scalars().all()
+            for row, formular_id in zip(inserts, ids):
+                row["id"] = formular_id
+            events.extend(changes.event("formular", "created", row) for row in inserts)
+        return {row["service_id"] for row in inserts + updates} | {match.service_id for match in deletes}
+
+    def _write_links(self, conn, now, events):
+        link = _table("standorteservices")
+        stored = {}
+        for standort_id, service_id in conn.execute(
+            select(link.c.standort_id, link.c.service_id).where(link.c.standort_id.in_(list(self._links)))
+        ):
+            stored.setdefault(standort_id, set()).add(service_id)
+        inserts, deletes = [], []
+        for standort_id, service_ids in self._links.items():
+            known = stored.get(standort_id, set())
+            for service_id in sorted(service_ids - known):
+                row = {"standort_id": standort_id, "service_id": service_id}
+                row.update(content_hash=changes.content_hash("link", row), changed_at=now)
+                inserts.append(row)
+            deletes.extend({"standort_id": standort_id, "service_id": service_id} for service_id in sorted(known - service_ids))
+        if deletes:
+            conn.execute(
+                delete(link).where(link.c.standort_id == bindparam("link_standort_id"), link.c.service_id == bindparam("link_service_id")),
+                [{"link_standort_id": row["standort_id"], "link_service_id": row["service_id"]} for row in deletes],
+            )
+            events.extend(changes.event("link", "deleted", row) for row in deletes)
+        if inserts:
+            conn.execute(insert(link), inserts)
+            events.extend(changes.event("link", "created", row) for row in inserts)
+
+    def _delete_rows(self, conn, entity, column, ids, events):
+        """Delete the `entity` rows whose `column` is in `ids`, adding a deleted event for each."""
+        table, key, related = changes.ENTITIES[entity]
+        table = _table(table)
+        columns = dict.fromkeys((*changes.ROW_KEYS.get(entity, (key,)), *((related,) if related else ())))
+        rows = conn.execute(select(*(table.c[name] for name in columns)).where(table.c[column].in_(ids))).mappings().all()
+        if rows:
+            conn.execute(delete(table).where(table.c[column].in_(ids)))
+            events.extend(changes.event(entity, "deleted", dict(row)) for row in rows)
+
+    def _delete_unlisted(self, conn, events):
+        """Delete the rows missing from the complete listings; returns the removed (service ids, Standort ids)."""
+        removed = {}
+        for entity, listed_ids in self._listed.items():
+            table, key, _ = changes.ENTITIES[entity]
+            table = _table(table)
+            removed[entity] = [
+                row_id for row_id in conn.execute(select(table.c[key]).order_by(table.c[key])).scalars()
+                if row_id not in listed_ids
+            ]
+        services, standorte = removed.get("service", []), removed.get("standort", [])
+        if services:
+            self._delete_rows(conn, "link", "service_id", services, events)
+            self._delete_rows(conn, "formular", "service_id", services, events)
+            self._delete_rows(conn, "servicedetail", "service_id", services, events)
+            self._delete_rows(conn, "service", "id", services, events)
+        if standorte:
+            self._delete_rows(conn, "link", "standort_id", standorte, events)
+            self._delete_rows(conn, "standort", "id", standorte, events)
+        return set(services), set(standorte)
+
+    def flush(self):
+        if not self._pending and not self._after_flush:
+            return
+        # geocoding may call a remote service, so it happens before the write transaction
+        self._geocode_standorte()
+        now = time.time()
+        start = time.perf_counter()
+        events = []
+        with self.engine.begin() as conn:
+            services, details, standorte = (), (), ()
+            formulare = set()
+            self._merge_listings(conn, "service", self._services)
+            self._merge_listings(conn, "standort", self._standorte)
+            if self._services:
+                stored = _stored(conn, "service", "id", ("content_hash",), self._services)
+                services = _changed("service", self._services, stored, now, events)
+                if services:
+                    conn.execute(_upsert(_table("service"), ["id"]), services)
+            if self._details:
+                stored = _stored(conn, "servicedetail", "service_id", ("content_hash",), self._details)
+                details = _changed("servicedetail", self._details, stored, now, events)
+                if details:
+                    conn.execute(_upsert(_table("servicedetail"), ["service_id"]), details)
+            if self._formulare:
+                formulare = self._write_formulare(conn, now, events)
+            if self._standorte:
+                stored = _stored(conn, "standorte", "id", ("content_hash", "lat", "lon"), self._standorte)
+                for standort_id, standort in self._standorte.items():
+                    # an address the geocoder does not know keeps coordinates set by an earlier backfill
+                    if standort["lat"] is None and standort_id in stored:
+                        standort["lat"], standort["lon"] = stored[standort_id].lat, stored[standort_id].lon
+                standorte = _changed("standort", self._standorte, stored, now, events)
+                if standorte:
+                    conn.execute(_upsert(_table("standorte"), ["id"]), standorte)
+            if self._links:
+                self._write_links(conn, now, events)
+            removed_services, removed_standorte = self._delete_unlisted(conn, events)
+            if self._finished_jobs:
+                job_queue.mark_done(conn, self._finished_jobs)
+            # keep the full-text index in step with the rows written in this transaction; the
+            # documents of removed rows are dropped without replacement
+            search_index.reindex(
+                conn, "service", {row["id"] for row in services} | {row["service_id"] for row in details} | removed_services
+            )
+            # Formular documents carry the name of their service
+            search_index.reindex(conn, "formular", formulare | {row["id"] for row in services} | removed_services)
+            search_index.reindex(conn, "standort", {row["id"] for row in standorte} | removed_standorte)
+            if events:
+                changes.record(conn, events, now)
+                dataset_version.bump(conn)
+        if self.stats is not None:
+            self.stats.db_write.add(time.perf_counter() - start)
+            written = Counter(change["entity"] for change in events if change["op"] != "deleted")
+            self.stats.record_rows(events, {entity: count - written[entity] for entity, count in self._buffered_rows().items() if count})
+        callbacks = self._after_flush
+        self._reset()
+        for callback, args in callbacks:
+            callback(*args)
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache.sqlite")
+
+
+@dataclass
+class CachedPage:
+    url: str
+    text: str
+    changed: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+    size: int = 0
+
+
+@dataclass
+class CacheStats:
+    not_modified: int = 0
+    identical: int = 0
+    misses: int = 0
+    bytes_saved: int = 0
+
+    def merge(self, other):
+        self.not_modified += other.not_modified
+        self.identical += other.identical
+        self.misses += other.misses
+        self.bytes_saved += other.bytes_saved
+
+    @property
+    def hits(self):
+        return self.not_modified + self.identical
+
+    def summary(self):
+        return (
+            f"HTTP cache: {self.hits} hits ({self.not_modified} not modified, {self.identical} identical), "
+            f"{self.misses} misses, {self.bytes_saved / 1024:.1f} KiB saved"
+        )
+
+
+class ResponseCache:
+    """Persistent per-URL validators (ETag/Last-Modified), body hash and last body for conditional fetches."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.stats = CacheStats()
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _lookup(self, url):
+        return self._conn.execute(
+            "SELECT etag, last_modified, body_hash, body, size FROM http_cache WHERE url = ?", (url,)
+        ).fetchone()
+
+    def conditional_headers(self, url):
+        row = self._lookup(url)
+        headers = {}
+        if row:
+            etag, last_modified = row[0], row[1]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def resolve(self, url, response):
+        """Turn a requests/httpx response into a CachedPage; `changed` is False on a 304 or an identical body."""
+        row = self._lookup(url)
+        if response.status_code == 304 and row:
+            self.stats.not_modified += 1
+            self.stats.bytes_saved += row[4]
+            return CachedPage(url, zlib.decompress(row[3]).decode("utf-8"), False, row[0], row[1], row[2], row[4])
+
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        page = CachedPage(
+            url,
+            response.text,
+            not row or row[2] != body_hash,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            body_hash,
+            len(response.content),
+        )
+        if page.changed:
+            self.stats.misses += 1
+        else:
+            self.stats.identical += 1
+        return page
+
+    def save(self, page):
+        """Persist a page's validators once its contents have been stored, so a failed write is retried next run."""
+        self._conn.execute(
+            """
+            INSERT INTO http_cache (url, etag, last_modified, body_hash, body, size, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                body_hash = excluded.body_hash,
+                body = excluded.body,
+                size = excluded.size,
+                fetched_at = excluded.fetched_at
+            """,
+            (
+                page.url,
+                page.etag,
+                page.last_modified,
+                page.body_hash,
+                zlib.compress(page.text.encode("utf-8")),
+                page.size,
+                time.time(),
+            ),
+        )
+        self._conn.commit()
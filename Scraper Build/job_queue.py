@@ -0,0 +1,159 @@
+import time
+from typing import Optional
+
+from sqlalchemy import UniqueConstraint, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Field, SQLModel
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF = 30.0
+
+
+class ScrapeJob(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("kind", "ref_id"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str
+    ref_id: int
+    name: str
+    url: str
+    status: str = Field(default=PENDING, index=True)
+    attempts: int = 0
+    last_error: Optional[str] = None
+    next_attempt_at: float = 0.0
+    claimed_by: Optional[str] = None
+    updated_at: float = 0.0
+
+
+def _jobs():
+    return ScrapeJob.__table__
+
+
+def clear(engine):
+    with engine.begin() as conn:
+        conn.execute(_jobs().delete())
+
+
+def enqueue(engine, kind, entries):
+    """Register discovered (ref_id, name, url) entries as pending jobs, resetting earlier runs of the same job."""
+    jobs = _jobs()
+    now = time.time()
+    rows = [
+        {"kind": kind, "ref_id": ref_id, "name": name, "url": url, "status": PENDING,
+         "attempts": 0, "last_error": None, "next_attempt_at": 0.0, "claimed_by": None, "updated_at": now}
+        for ref_id, name, url in entries
+    ]
+    if not rows:
+        return
+    statement = insert(jobs)
+    statement = statement.on_conflict_do_update(
+        index_elements=["kind", "ref_id"],
+        set_={column: statement.excluded[column] for column in rows[0] if column not in ("kind", "ref_id")},
+    )
+    with engine.begin() as conn:
+        conn.execute(statement, rows)
+
+
+def has_unfinished(engine):
+    """Whether an earlier run left jobs to resume: pending, running or failed ones."""
+    jobs = _jobs()
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(jobs).where(jobs.c.status.in_((PENDING, RUNNING, FAILED)))
+        ).scalar_one() > 0
+
+
+def resume(engine):
+    """Requeue the jobs an earlier run left behind; returns (released, retried).
+
+    Jobs claimed by workers that are no longer running go back to pending as they are; failed
+    jobs get a fresh set of attempts and are due at once.
+    """
+    jobs = _jobs()
+    now = time.time()
+    with engine.begin() as conn:
+        released = conn.execute(
+            update(jobs).where(jobs.c.status == RUNNING).values(status=PENDING, claimed_by=None, updated_at=now)
+        ).rowcount
+        retried = conn.execute(
+            update(jobs).where(jobs.c.status == FAILED)
+            .values(status=PENDING, attempts=0, next_attempt_at=0.0, claimed_by=None, updated_at=now)
+        ).rowcount
+    return released, retried
+
+
+def claim(engine, worker, limit=1):
+    """Atomically move up to `limit` due jobs to running and return them as (id, kind, ref_id, name, url, attempts) rows."""
+    jobs = _jobs()
+    now = time.time()
+    due = (
+        select(jobs.c.id)
+        .where(jobs.c.status == PENDING, jobs.c.next_attempt_at <= now)
+        .order_by(jobs.c.next_attempt_at, jobs.c.id)
+        .limit(limit)
+    )
+    statement = (
+        update(jobs)
+        .where(jobs.c.id.in_(due.scalar_subquery()))
+        .values(status=RUNNING, claimed_by=worker, attempts=jobs.c.attempts + 1, updated_at=now)
+        .returning(jobs.c.id, jobs.c.kind, jobs.c.ref_id, jobs.c.name, jobs.c.url, jobs.c.attempts)
+    )
+    with engine.begin() as conn:
+        return conn.execute(statement).all()
+
+
+def next_due(engine):
+    """Seconds until the next pending job becomes due, or None when nothing is pending."""
+    jobs = _jobs()
+    with engine.connect() as conn:
+        due_at = conn.execute(select(func.min(jobs.c.next_attempt_at)).where(jobs.c.status == PENDING)).scalar()
+    if due_at is None:
+        return None
+    return max(0.0, due_at - time.time())
+
+
+def any_running(engine):
+    jobs = _jobs()
+    with engine.connect() as conn:
+        return conn.execute(select(jobs.c.id).where(jobs.c.status == RUNNING).limit(1)).first() is not None
+
+
+def mark_done(conn, job_ids):
+    """Mark jobs done on an open connection, so it commits together with the rows the jobs produced."""
+    jobs = _jobs()
+    conn.execute(
+        update(jobs).where(jobs.c.id.in_(list(job_ids)))
+        .values(status=DONE, last_error=None, claimed_by=None, updated_at=time.time())
+    )
+
+
+def mark_failed(engine, job_id, attempts, error, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=DEFAULT_BACKOFF):
+    """Schedule a retry with exponential backoff, or give up after `max_attempts`."""
+    jobs = _jobs()
+    now = time.time()
+    if attempts >= max_attempts:
+        values = {"status": FAILED, "next_attempt_at": 0.0}
+    else:
+        values = {"status": PENDING, "next_attempt_at": now + backoff * 2 ** (attempts - 1)}
+    with engine.begin() as conn:
+        conn.execute(
+            update(jobs).where(jobs.c.id == job_id)
+            .values(last_error=str(error)[:1000], claimed_by=None, updated_at=now, **values)
+        )
+
+
+def ref_ids(engine, kind):
+    """The ids of the discovered entries of `kind`."""
+    jobs = _jobs()
+    with engine.connect() as conn:
+        return set(conn.execute(select(jobs.c.ref_id).where(jobs.c.kind == kind)).scalars())
+
+
+def status_counts(engine):
+    jobs = _jobs()
+    with engine.connect() as conn:
+        return dict(conn.execute(select(jobs.c.status, func.count()).group_by(jobs.c.status)).all())
@@ -0,0 +1,31 @@
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+
+
+class InlineExecutor(Executor):
+    """Runs submitted calls immediately in the calling thread, used when parse workers are disabled."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def timed(fn, *args):
+    """`fn(*args)` as (seconds, result), so parse time is measured in the worker process that parses."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def make_parse_pool(workers=None):
+    """Process pool for the CPU-bound parse stage; `workers=0` parses inline."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0:
+        return InlineExecutor()
+    return ProcessPoolExecutor(max_workers=workers)
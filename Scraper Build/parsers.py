@@ -0,0 +1,167 @@
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+import repo_path  # noqa: F401  makes the shared app modules importable
+from app.normalize import normalize_description
+
+# Pure HTML -> record functions. They take no shared state, so the scraper can run them on a process pool.
+
+PARSER = 'lxml'
+
+
+class RegionStrainer(ElementFilter):
+    """Parse-only filter that keeps top-level tags matching any of the given ids or classes, with their subtrees."""
+
+    def __init__(self, ids=(), classes=()):
+        self.ids = frozenset(ids)
+        self.classes = frozenset(classes)
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        if not attrs:
+            return False
+        if attrs.get('id') in self.ids:
+            return True
+        classes = attrs.get('class') or ''
+        if isinstance(classes, str):
+            classes = classes.split()
+        return not self.classes.isdisjoint(classes)
+
+    def allow_string_creation(self, string):
+        return False
+
+
+# h1.title, the main content, the Online-Abwicklung heading and the Formulare list
+SERVICE_DETAIL_STRAINER = RegionStrainer(
+    ids=('layout-grid__area--maincontent', 'Online-Abwicklung'),
+    classes=('title', 'list-clean'),
+)
+# contact box and the anliegen[] checkbox form
+STANDORT_DETAIL_STRAINER = RegionStrainer(classes=('modul-contact', 'location_servicelist_checkboxgroup'))
+
+
+def make_soup(html, parse_only=None):
+    return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+
+def parse_service_detail(html):
+    return extract_service_detail(make_soup(html, SERVICE_DETAIL_STRAINER))
+
+
+def extract_service_detail(soup):
+    title = soup.find('h1', class_='title').text.strip()
+
+    # Capture content from the specific div until the "Für Sie zuständig" section
+    content_div = soup.find('div', id='layout-grid__area--maincontent', class_='servicedetail-view')
+    if content_div:
+        description_parts = []
+        for elem in content_div.children:
+            if elem.name == 'h2' and 'Für Sie zuständig' in elem.text:
+                break
+            description_parts.append(str(elem))
+        description = ''.join(description_parts)
+    else:
+        description = ""
+
+    # Check if the service can be done online
+    can_be_done_online = bool(soup.find('h2', id='Online-Abwicklung'))
+
+    # Extract forms if present
+    formular_section = soup.find('h2', class_='title', string='Formulare')
+    if formular_section:
+        formular_list = formular_section.find_next('ul', class_='list-clean')
+        if formular_list:
+            formular_links = formular_list.find_all('a')
+            formulars = [{'title': link.text.strip(), 'url': link['href']} for link in formular_links]
+        else:
+            formulars = []
+    else:
+        formulars = []
+
+    # Clean the description once at ingest instead of on every request
+    description_clean, sections = normalize_description(description)
+
+    details = {
+        'title': title,
+        'description': description,
+        'description_clean': description_clean,
+        'sections': sections,
+    }
+
+    return details, can_be_done_online, formulars
+
+
+def parse_standorte_details(html):
+    return extract_standorte_details(make_soup(html, STANDORT_DETAIL_STRAINER))
+
+
+def extract_standorte_details(soup):
+    # Extract the contact details
+    contact_info = soup.find('div', class_='modul-contact')
+    address, phone, fax, email, homepage = None, None, None, None, None
+    
+    if contact_info:
+        address_tag = contact_info.find('li', class_='address loc')
+        if address_tag:
+            address = address_tag.get_text(strip=True)
+        
+        phone_tag = contact_info.find('li', class_='tel')
+        if phone_tag:
+            phone = phone_tag.get_text(strip=True).replace('Tel.:', '').strip()
+        
+        fax_tag = contact_info.find('li', class_='fax')
+        if fax_tag:
+            fax = fax_tag.get_text(strip=True).replace('Fax:', '').strip()
+
+        email_tag = contact_info.find('li', class_='email')
+        if email_tag:
+            email = email_tag.find('a').get('href').replace('mailto:', '').strip()
+
+        homepage_tag = contact_info.find('li', class_='homepage')
+        if homepage_tag:
+            homepage = homepage_tag.find('a').get('href').strip()
+
+    # Extract the offered services and link them
+    service_relations = []
+    services_section = soup.find('form', class_='location_servicelist_checkboxgroup')
+    if services_section:
+        service_inputs = services_section.find_all('input', {'name': 'anliegen[]'})
+        for service_input in service_inputs:
+            try:
+                service_id = int(service_input['value'])
+                service_relations.append(service_id)
+            except ValueError:
+                continue  # Skip this input if it doesn't contain a valid service ID
+    
+    return address, phone, fax, email, homepage, service_relations
+
+
+def parse_service_index(html):
+    soup = make_soup(html)
+    sections = []
+    for letter_section in soup.find_all('div', class_='azlist-letter'):
+        entries = []
+        for service in letter_section.find_next('ul').find_all('li'):
+            service_link = service.find('a')['href']
+            service_name = service.find('a').text.strip()
+            service_id = int(service_link.split('/')[-2])
+            entries.append((service_id, service_name, service_link))
+        sections.append((letter_section.find('h2').text, entries))
+    return sections
+
+
+def parse_standorte_index(html):
+    soup = make_soup(html)
+    sections = []
+    for section in soup.find_all('div', class_='azlist-letter'):
+        h2_tag = section.find('h2', class_='letter')
+        if h2_tag:
+            entries = []
+            for item in section.find_next('ul').find_all('li'):
+                link_tag = item.find('a')
+                if link_tag:
+                    standort_link = link_tag['href']
+                    standort_name = link_tag.text.strip()
+                    standort_id = int(standort_link.split('/')[-2])
+                    entries.append((standort_id, standort_name, standort_link))
+            sections.append((h2_tag.text.strip(), entries))
+    return sections
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scraper shares code with the API (normalization, migrations) from the app package.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
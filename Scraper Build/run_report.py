@@ -0,0 +1,175 @@
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+import repo_path  # noqa: F401  makes the shared app modules importable
+from app.prometheus import Histogram, histogram_samples, render, write_textfile
+
+DEFAULT_REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+METRIC_PREFIX = "services_scrape"
+# row outcomes of a write, the change log operations plus rows whose content hash did not change
+OUTCOMES = ("created", "updated", "deleted", "unchanged")
+
+
+@dataclass
+class Timing:
+    count: int = 0
+    seconds: float = 0.0
+
+    def add(self, seconds, count=1):
+        self.count += count
+        self.seconds += seconds
+
+    def merge(self, other):
+        self.add(other.seconds, other.count)
+
+    def to_dict(self):
+        return {"count": self.count, "seconds": round(self.seconds, 3),
+                "mean_ms": round(self.seconds / self.count * 1000, 3) if self.count else None}
+
+
+@dataclass
+class RunStats:
+    """Counters and timings of one scrape, per stage.
+
+    Fetches are counted per attempt (retries included) with their latency, response size and
+    status code; parse time is measured where the page is parsed, also in the parse pool; DB write
+    time covers the flush transactions of the BulkWriter, geocoding time the lookups before them.
+    Queue workers fill their own RunStats, which are merged into the run's.
+    """
+
+    fetch_latency: Histogram = field(default_factory=Histogram)
+    fetch_bytes: int = 0
+    status_codes: Counter = field(default_factory=Counter)
+    fetch_errors: Counter = field(default_factory=Counter)
+    parse: Timing = field(default_factory=Timing)
+    geocode: Timing = field(default_factory=Timing)
+    db_write: Timing = field(default_factory=Timing)
+    # (entity, outcome) -> rows
+    rows: Counter = field(default_factory=Counter)
+    # stage -> wall seconds
+    stages: dict = field(default_factory=dict)
+
+    def record_fetch(self, seconds, status=None, size=0, error=None):
+        self.fetch_latency.observe(seconds)
+        self.fetch_bytes += size
+        if status is not None:
+            self.status_codes[status] += 1
+        if error is not None:
+            self.fetch_errors[error] += 1
+
+    def record_rows(self, events, unchanged):
+        self.rows.update((change["entity"], change["op"]) for change in events)
+        self.rows.update({(entity, "unchanged"): count for entity, count in unchanged.items()})
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def merge(self, other):
+        self.fetch_latency.merge(other.fetch_latency)
+        self.fetch_bytes += other.fetch_bytes
+        self.status_codes.update(other.status_codes)
+        self.fetch_errors.update(other.fetch_errors)
+        self.parse.merge(other.parse)
+        self.geocode.merge(other.geocode)
+        self.db_write.merge(other.db_write)
+        self.rows.update(other.rows)
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+def build(stats, mode, started_at, finished_at, error=None, cache_stats=None):
+    """The run report as a JSON-serializable dict."""
+    duration = finished_at - started_at
+    rows = {}
+    for (entity, outcome), count in sorted(stats.rows.items()):
+        rows.setdefault(entity, dict.fromkeys(OUTCOMES, 0))[outcome] = count
+    requests = stats.fetch_latency.count
+    return {
+        "mode": mode,
+        "status": "failed" if error else "ok",
+        "error": error,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started_at)),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(finished_at)),
+        "duration_seconds": round(duration, 3),
+        "stages": {name: round(seconds, 3) for name, seconds in stats.stages.items()},
+        "fetch": {
+            "requests": requests,
+            "requests_per_second": round(requests / duration, 3) if duration else None,
+            "bytes": stats.fetch_bytes,
+            "status_codes": {str(status): count for status, count in sorted(stats.status_codes.items())},
+            "errors": dict(stats.fetch_errors),
+            "latency_seconds": stats.fetch_latency.to_dict(),
+        },
+        "cache": {**asdict(cache_stats), "hits": cache_stats.hits} if cache_stats is not None else None,
+        "parse": stats.parse.to_dict(),
+        "geocode": stats.geocode.to_dict(),
+        "db_write": stats.db_write.to_dict(),
+        "rows": rows,
+    }
+
+
+def prometheus_text(report, stats):
+    """The run as gauges for the node_exporter textfile collector; every run replaces the previous values."""
+    prefix = METRIC_PREFIX
+    families = [
+        (f"{prefix}_last_run_timestamp_seconds", "gauge", "Unix time the last scrape finished.",
+         [("", {"mode": report["mode"]}, time.time())]),
+        (f"{prefix}_success", "gauge", "1 if the last scrape finished without an error.",
+         [("", {}, int(report["status"] == "ok"))]),
+        (f"{prefix}_duration_seconds", "gauge", "Wall time of the last scrape.",
+         [("", {}, report["duration_seconds"])]),
+        (f"{prefix}_stage_duration_seconds", "gauge", "Wall time per stage of the last scrape.",
+         [("", {"stage": name}, seconds) for name, seconds in report["stages"].items()]),
+        (f"{prefix}_fetch_duration_seconds", "histogram", "Latency of the HTTP requests of the last scrape.",
+         histogram_samples(stats.fetch_latency)),
+        (f"{prefix}_fetch_bytes", "gauge", "Response bytes received in the last scrape.",
+         [("", {}, stats.fetch_bytes)]),
+        (f"{prefix}_fetch_responses", "gauge", "HTTP responses per status code in the last scrape.",
+         [("", {"code": status}, count) for status, count in sorted(stats.status_codes.items())]),
+        (f"{prefix}_fetch_errors", "gauge", "Failed requests without a response per error in the last scrape.",
+         [("", {"error": error}, count) for error, count in sorted(stats.fetch_errors.items())]),
+    ]
+    for stage, timing in (("parse", stats.parse), ("geocode", stats.geocode), ("db_write", stats.db_write)):
+        families.append((f"{prefix}_{stage}_seconds", "gauge", f"Seconds spent in the {stage} stage of the last scrape.",
+                         [("", {}, timing.seconds)]))
+        families.append((f"{prefix}_{stage}_operations", "gauge", f"Pages, lookups or flushes of the {stage} stage of the last scrape.",
+                         [("", {}, timing.count)]))
+    families.append((f"{prefix}_rows", "gauge", "Rows per entity and outcome written by the last scrape.",
+                     [("", {"entity": entity, "outcome": outcome}, count) for (entity, outcome), count in sorted(stats.rows.items())]))
+    if report["cache"] is not None:
+        families.append((f"{prefix}_cache_pages", "gauge", "Pages per HTTP cache outcome in the last scrape.",
+                         [("", {"outcome": outcome}, report["cache"][outcome]) for outcome in ("not_modified", "identical", "misses")]))
+    return render(families)
+
+
+def default_report_path(started_at):
+    return os.path.join(DEFAULT_REPORT_DIR, time.strftime("scrape-%Y%m%d-%H%M%S.json", time.gmtime(started_at)))
+
+
+def write(report, stats, path, textfile=None):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    if textfile:
+        write_textfile(textfile, prometheus_text(report, stats))
+
+
+def summary(report):
+    fetch, db_write = report["fetch"], report["db_write"]
+    changed = sum(count for outcomes in report["rows"].values() for outcome, count in outcomes.items() if outcome != "unchanged")
+    p95 = fetch["latency_seconds"]["p95"]
+    return (
+        f"Run {report['status']} in {report['duration_seconds']:.1f} s: {fetch['requests']} requests "
+        f"(p95 {p95 * 1000 if p95 is not None else 0:.0f} ms, {fetch['bytes'] / 1024:.0f} KiB), "
+        f"{report['parse']['count']} pages parsed in {report['parse']['seconds']:.1f} s, "
+        f"{changed} rows changed in {db_write['count']} writes taking {db_write['seconds']:.1f} s"
+    )
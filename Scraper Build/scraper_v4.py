@@ -1,27 +1,58 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
 import requests
-from bs4 import BeautifulSoup
-from sqlmodel import SQLModel, Field, create_engine, Session, select, Relationship
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field, Relationship
 from tqdm import tqdm
 from typing import List, Optional
+import repo_path  # noqa: F401  makes the shared app modules importable
+from app import dataset_version, geocoding, migrations, search_index
+from app.database import make_engine as make_profile_engine
+from async_fetcher import AsyncFetcher
+from http_cache import CachedPage, CacheStats, ResponseCache, DEFAULT_CACHE_PATH
+from bulk_writer import BulkWriter, DEFAULT_BATCH_SIZE
+from parsers import parse_service_detail, parse_service_index, parse_standorte_details, parse_standorte_index
+from parse_pool import make_parse_pool, timed
+import job_queue
+import run_report
+
+BASE_URL = 'https://service.berlin.de'
+SERVICES_URL = f'{BASE_URL}/dienstleistungen/'
+STANDORTE_URL = f'{BASE_URL}/standorte/'
 
 class StandorteServices(SQLModel, table=True):
+    __table_args__ = (Index("ix_standorteservices_service_id", "service_id", "standort_id"),)
     standort_id: int = Field(foreign_key="standorte.id", primary_key=True)
     service_id: int = Field(foreign_key="service.id", primary_key=True)
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
 
 class Service(SQLModel, table=True):
+    __table_args__ = (Index("ix_service_service_name_id", "service_name", "id"),)
     id: int = Field(default=None, primary_key=True)
     service_name: str
     link: str
     can_be_done_online: bool = Field(default=False)  # New field for online processing
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
     standorte: List["Standorte"] = Relationship(back_populates="services", link_model=StandorteServices)
 
 class ServiceDetail(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
-    service_id: int = Field(foreign_key="service.id")
+    service_id: int = Field(foreign_key="service.id", index=True, unique=True)
     title: str
     description: str
+    description_clean: Optional[str] = None
+    sections: Optional[str] = None
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
 
 class Standorte(SQLModel, table=True):
+    __table_args__ = (Index("ix_standorte_name_id", "name", "id"),)
     id: int = Field(default=None, primary_key=True)
     name: str
     link: str
@@ -30,246 +61,399 @@ class Standorte(SQLModel, table=True):
     fax: Optional[str] = None
     email: Optional[str] = None
     homepage: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
     services: List[Service] = Relationship(back_populates="standorte", link_model=StandorteServices)
 
 class Formular(SQLModel, table=True):
+    __table_args__ = (Index("ix_formular_title_id", "title", "id"),)
     id: int = Field(default=None, primary_key=True)
-    service_id: int = Field(foreign_key="service.id")
+    service_id: int = Field(foreign_key="service.id", index=True)
     title: str
     url: str
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
 
 
+def make_engine():
+    # the database the API reads (SERVICES_DB_PATH); queue workers that write at once wait for the
+    # lock instead of failing, and the API's readers are not blocked thanks to WAL
+    return make_profile_engine("scraper")
+
 def create_db_and_tables(engine):
     SQLModel.metadata.create_all(engine)
-
-def upsert_data(session, service_id, service_name, service_link, can_be_done_online):
-    existing_service = session.get(Service, service_id)
-    if existing_service:
-        existing_service.service_name = service_name
-        existing_service.link = service_link
-        existing_service.can_be_done_online = can_be_done_online
-        session.add(existing_service)
-    else:
-        new_service = Service(
-            id=service_id,
-            service_name=service_name,
-            link=service_link,
-            can_be_done_online=can_be_done_online
-        )
-        session.add(new_service)
-    session.commit()
-
-def upsert_service_detail(session, service_id, detail):
-    existing_detail = session.exec(select(ServiceDetail).where(ServiceDetail.service_id == service_id)).first()
-    if existing_detail:
-        existing_detail.title = detail['title']
-        existing_detail.description = detail['description']
-        session.add(existing_detail)
-    else:
-        new_detail = ServiceDetail(
-            service_id=service_id,
-            title=detail['title'],
-            description=detail['description']
-        )
-        session.add(new_detail)
-    session.commit()
-
-def upsert_formular(session, service_id, title, url):
-    # Insert new formular record
-    new_formular = Formular(service_id=service_id, title=title, url=url)
-    session.add(new_formular)
-    session.commit()
-
-def scrape_service_detail(service_link):
-    detail_url = f"{service_link}"
-    
-    response = requests.get(detail_url)
-    response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    title = soup.find('h1', class_='title').text.strip()
-
-    # Capture content from the specific div until the "Für Sie zuständig" section
-    content_div = soup.find('div', id='layout-grid__area--maincontent', class_='servicedetail-view')
-    if content_div:
-        description_parts = []
-        for elem in content_div.children:
-            if elem.name == 'h2' and 'Für Sie zuständig' in elem.text:
-                break
-            description_parts.append(str(elem))
-        description = ''.join(description_parts)
-    else:
-        description = ""
-
-    # Check if the service can be done online
-    can_be_done_online = bool(soup.find('h2', id='Online-Abwicklung'))
-
-    # Extract forms if present
-    formular_section = soup.find('h2', class_='title', string='Formulare')
-    if formular_section:
-        formular_list = formular_section.find_next('ul', class_='list-clean')
-        if formular_list:
-            formular_links = formular_list.find_all('a')
-            formulars = [{'title': link.text.strip(), 'url': link['href']} for link in formular_links]
+    # create_all skips columns and indexes of tables that already exist, the migrations add them
+    migrations.migrate(engine)
+    with engine.begin() as conn:
+        if not search_index.exists(conn):
+            search_index.rebuild(conn)
+        if dataset_version.read(conn) is None:
+            dataset_version.bump(conn)
+
+def fetch_page(url, cache=None, stats=None):
+    headers = cache.conditional_headers(url) if cache else None
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, headers=headers)
+    except requests.RequestException as exc:
+        if stats is not None:
+            stats.record_fetch(time.perf_counter() - start, error=type(exc).__name__)
+        raise
+    if stats is not None:
+        stats.record_fetch(time.perf_counter() - start, response.status_code, len(response.content))
+    if response.status_code != 304:
+        response.raise_for_status()
+    if cache is None:
+        return CachedPage(url, response.text, True)
+    return cache.resolve(url, response)
+
+def save_page(cache, page):
+    if cache is not None and page.changed:
+        cache.save(page)
+
+def save_page_after_flush(writer, cache, page):
+    if cache is not None and page.changed:
+        writer.after_flush(cache.save, page)
+
+def store_service(writer, service_id, service_name, service_link, parsed_detail):
+    service_detail, can_be_done_online, formulars = parsed_detail
+
+    writer.add_service(service_id, service_name, service_link, can_be_done_online)
+    writer.add_service_detail(service_id, service_detail['title'], service_detail['description'],
+                              service_detail['description_clean'], service_detail['sections'])
+
+    # Replace the forms of this service with the ones currently listed
+    writer.replace_formulare(service_id, formulars)
+
+def store_parsed(writer, cache, pending, store, wait=False):
+    """Write the pages whose parse has finished (or all of them with `wait`) and return the rest."""
+    remaining = []
+    for future, page, entry in pending:
+        if wait or future.done():
+            seconds, parsed = future.result()
+            if writer.stats is not None:
+                writer.stats.parse.add(seconds)
+            store(writer, *entry, parsed)
+            save_page_after_flush(writer, cache, page)
         else:
-            formulars = []
-    else:
-        formulars = []
-
-    details = {
-        'title': title,
-        'description': description,
-    }
-
-    return details, can_be_done_online, formulars
+            remaining.append((future, page, entry))
+    return remaining
 
-def scrape_services():
-    url = 'https://service.berlin.de/dienstleistungen/'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def scrape_services(cache=None, batch_size=DEFAULT_BATCH_SIZE, parse_workers=None, stats=None):
+    index_page = fetch_page(SERVICES_URL, cache, stats)
 
-    engine = create_engine('sqlite:///services.db')
+    engine = make_engine()
     create_db_and_tables(engine)
     
-    with Session(engine) as session:
-        letter_sections = soup.find_all('div', class_='azlist-letter')
-        
-        for letter_section in tqdm(letter_sections, desc="Scraping Sections"):
-            services = letter_section.find_next('ul').find_all('li')
-            
-            for service in tqdm(services, desc=f"Processing {letter_section.find('h2').text}", leave=False):
-                service_link = service.find('a')['href']
-                service_name = service.find('a').text.strip()
-                service_id = int(service_link.split('/')[-2])
-
-                # Scrape service details and online status
-                service_detail, can_be_done_online, formulars = scrape_service_detail(service_link)
-                
-                upsert_data(session, service_id, service_name, service_link, can_be_done_online)
-                upsert_service_detail(session, service_id, service_detail)
-
-                # Insert any found forms into the database
-                for formular in formulars:
-                    upsert_formular(session, service_id, formular['title'], formular['url'])
-
-def upsert_standorte_data(session, standort_id, name, link, address=None, phone=None, fax=None, email=None, homepage=None):
-    existing_standort = session.get(Standorte, standort_id)
-    if existing_standort:
-        existing_standort.name = name
-        existing_standort.link = link
-        existing_standort.address = address
-        existing_standort.phone = phone
-        existing_standort.fax = fax
-        existing_standort.email = email
-        existing_standort.homepage = homepage
-        session.add(existing_standort)
-    else:
-        new_standort = Standorte(
-            id=standort_id,
-            name=name,
-            link=link,
-            address=address,
-            phone=phone,
-            fax=fax,
-            email=email,
-            homepage=homepage
-        )
-        session.add(new_standort)
-    session.commit()
-
-def link_service_to_standort(session, standort_id, service_id):
-    # Check if the relationship already exists
-    existing_link = session.exec(
-        select(StandorteServices).where(
-            StandorteServices.standort_id == standort_id,
-            StandorteServices.service_id == service_id
-        )
-    ).first()
-
-    if not existing_link:
-        session.add(StandorteServices(standort_id=standort_id, service_id=service_id))
-        session.commit()
-
-def scrape_standorte_details(standort_link, standort_id):
-    detail_url = f"https://service.berlin.de{standort_link}"
-    response = requests.get(detail_url)
-    response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    # Extract the contact details
-    contact_info = soup.find('div', class_='modul-contact')
-    address, phone, fax, email, homepage = None, None, None, None, None
-    
-    if contact_info:
-        address_tag = contact_info.find('li', class_='address loc')
-        if address_tag:
-            address = address_tag.get_text(strip=True)
-        
-        phone_tag = contact_info.find('li', class_='tel')
-        if phone_tag:
-            phone = phone_tag.get_text(strip=True).replace('Tel.:', '').strip()
-        
-        fax_tag = contact_info.find('li', class_='fax')
-        if fax_tag:
-            fax = fax_tag.get_text(strip=True).replace('Fax:', '').strip()
-
-        email_tag = contact_info.find('li', class_='email')
-        if email_tag:
-            email = email_tag.find('a').get('href').replace('mailto:', '').strip()
-
-        homepage_tag = contact_info.find('li', class_='homepage')
-        if homepage_tag:
-            homepage = homepage_tag.find('a').get('href').strip()
-
-    # Extract the offered services and link them
-    service_relations = []
-    services_section = soup.find('form', class_='location_servicelist_checkboxgroup')
-    if services_section:
-        service_inputs = services_section.find_all('input', {'name': 'anliegen[]'})
-        for service_input in service_inputs:
-            try:
-                service_id = int(service_input['value'])
-                service_relations.append(service_id)
-            except ValueError:
-                continue  # Skip this input if it doesn't contain a valid service ID
-    
-    return address, phone, fax, email, homepage, service_relations
-
-def scrape_standorte():
-    url = 'https://service.berlin.de/standorte/'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    sections = parse_service_index(index_page.text)
+    with make_parse_pool(parse_workers) as pool, BulkWriter(engine, batch_size, geocoding.make_geocoder(), stats) as writer:
+        pending = []
+        for letter, services in tqdm(sections, desc="Scraping Sections"):
+            for service_id, service_name, service_link in tqdm(services, desc=f"Processing {letter}", leave=False):
+                # Scrape service details and online status, unchanged pages are not parsed again
+                page = fetch_page(service_link, cache, stats)
+                if page.changed:
+                    future = pool.submit(timed, parse_service_detail, page.text)
+                    pending.append((future, page, (service_id, service_name, service_link)))
+                else:
+                    writer.add_service_listing(service_id, service_name, service_link)
+                pending = store_parsed(writer, cache, pending, store_service)
+        store_parsed(writer, cache, pending, store_service, wait=True)
+        # every listed service has been stored, the ones missing from the listing are gone
+        writer.remove_unlisted('service', {service_id for _, services in sections for service_id, _, _ in services})
+    save_page(cache, index_page)
+
+async def parse_async(loop, pool, writer, parse, page):
+    seconds, parsed = await loop.run_in_executor(pool, timed, parse, page.text)
+    if writer.stats is not None:
+        writer.stats.parse.add(seconds)
+    return parsed
+
+async def scrape_services_async(fetcher, batch_size=DEFAULT_BATCH_SIZE, parse_workers=None):
+    index_page = await fetcher.fetch_page(SERVICES_URL)
+    services = [entry for _, entries in parse_service_index(index_page.text) for entry in entries]
+    loop = asyncio.get_running_loop()
+
+    engine = make_engine()
+    create_db_and_tables(engine)
 
-    engine = create_engine('sqlite:///services.db')
+    with make_parse_pool(parse_workers) as pool, BulkWriter(engine, batch_size, geocoding.make_geocoder(), fetcher.stats) as writer:
+        async def fetch_detail(service_id, service_name, service_link):
+            page = await fetcher.fetch_page(service_link)
+            parsed_detail = await parse_async(loop, pool, writer, parse_service_detail, page) if page.changed else None
+            return service_id, service_name, service_link, page, parsed_detail
+
+        tasks = [asyncio.create_task(fetch_detail(*service)) for service in services]
+        try:
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Scraping Services"):
+                service_id, service_name, service_link, page, parsed_detail = await task
+                if page.changed:
+                    store_service(writer, service_id, service_name, service_link, parsed_detail)
+                    save_page_after_flush(writer, fetcher.cache, page)
+                else:
+                    writer.add_service_listing(service_id, service_name, service_link)
+            writer.remove_unlisted('service', {service_id for service_id, _, _ in services})
+        finally:
+            for task in tasks:
+                task.cancel()
+    save_page(fetcher.cache, index_page)
+
+def store_standort(writer, standort_id, standort_name, standort_link, parsed_detail):
+    address, phone, fax, email, homepage, service_relations = parsed_detail
+    writer.add_standort(standort_id, standort_name, standort_link, address, phone, fax, email, homepage)
+
+    # Link services to this Standort
+    writer.link_services(standort_id, service_relations)
+
+def scrape_standorte(cache=None, batch_size=DEFAULT_BATCH_SIZE, parse_workers=None, stats=None):
+    index_page = fetch_page(STANDORTE_URL, cache, stats)
+
+    engine = make_engine()
     create_db_and_tables(engine)
     
-    with Session(engine) as session:
-        standorte_sections = soup.find_all('div', class_='azlist-letter')
-
-        for section in tqdm(standorte_sections, desc="Scraping Standorte Sections"):
-            h2_tag = section.find('h2', class_='letter')
-            if h2_tag:
-                h2_text = h2_tag.text.strip()
-                standorte_items = section.find_next('ul').find_all('li')
-
-                for item in tqdm(standorte_items, desc=f"Processing {h2_text}", leave=False):
-                    link_tag = item.find('a')
-                    if link_tag:
-                        standort_link = link_tag['href']
-                        standort_name = link_tag.text.strip()
-                        standort_id = int(standort_link.split('/')[-2])
+    sections = parse_standorte_index(index_page.text)
+    with make_parse_pool(parse_workers) as pool, BulkWriter(engine, batch_size, geocoding.make_geocoder(), stats) as writer:
+        pending = []
+        for letter, standorte_items in tqdm(sections, desc="Scraping Standorte Sections"):
+            for standort_id, standort_name, standort_link in tqdm(standorte_items, desc=f"Processing {letter}", leave=False):
+                page = fetch_page(f"{BASE_URL}{standort_link}", cache, stats)
+                if page.changed:
+                    future = pool.submit(timed, parse_standorte_details, page.text)
+                    pending.append((future, page, (standort_id, standort_name, standort_link)))
+                else:
+                    writer.add_standort_listing(standort_id, standort_name, standort_link)
+                pending = store_parsed(writer, cache, pending, store_standort)
+        store_parsed(writer, cache, pending, store_standort, wait=True)
+        writer.remove_unlisted('standort', {standort_id for _, items in sections for standort_id, _, _ in items})
+    save_page(cache, index_page)
+
+async def scrape_standorte_async(fetcher, batch_size=DEFAULT_BATCH_SIZE, parse_workers=None):
+    index_page = await fetcher.fetch_page(STANDORTE_URL)
+    standorte = [entry for _, entries in parse_standorte_index(index_page.text) for entry in entries]
+    loop = asyncio.get_running_loop()
+
+    engine = make_engine()
+    create_db_and_tables(engine)
 
-                        address, phone, fax, email, homepage, service_relations = scrape_standorte_details(standort_link, standort_id)
-                        upsert_standorte_data(session, standort_id, standort_name, standort_link, address, phone, fax, email, homepage)
+    with make_parse_pool(parse_workers) as pool, BulkWriter(engine, batch_size, geocoding.make_geocoder(), fetcher.stats) as writer:
+        async def fetch_detail(standort_id, standort_name, standort_link):
+            page = await fetcher.fetch_page(f"{BASE_URL}{standort_link}")
+            parsed_detail = await parse_async(loop, pool, writer, parse_standorte_details, page) if page.changed else None
+            return standort_id, standort_name, standort_link, page, parsed_detail
+
+        tasks = [asyncio.create_task(fetch_detail(*standort)) for standort in standorte]
+        try:
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Scraping Standorte"):
+                standort_id, standort_name, standort_link, page, parsed_detail = await task
+                if page.changed:
+                    store_standort(writer, standort_id, standort_name, standort_link, parsed_detail)
+                    save_page_after_flush(writer, fetcher.cache, page)
+                else:
+                    writer.add_standort_listing(standort_id, standort_name, standort_link)
+            writer.remove_unlisted('standort', {standort_id for standort_id, _, _ in standorte})
+        finally:
+            for task in tasks:
+                task.cancel()
+    save_page(fetcher.cache, index_page)
+
+async def scrape_all_async(concurrency, rps, retries, cache=None, batch_size=DEFAULT_BATCH_SIZE, parse_workers=None, stats=None):
+    stats = stats if stats is not None else run_report.RunStats()
+    async with AsyncFetcher(concurrency=concurrency, rps=rps, retries=retries, cache=cache, stats=stats) as fetcher:
+        with stats.stage("services"):
+            await scrape_services_async(fetcher, batch_size, parse_workers)
+        print("Data has been successfully scraped and stored in the database.")
+        with stats.stage("standorte"):
+            await scrape_standorte_async(fetcher, batch_size, parse_workers)
+        print("Standorte data has been successfully scraped and stored in the database.")
+
+def process_job(writer, cache, kind, ref_id, name, link):
+    if kind == 'service':
+        page = fetch_page(link, cache, writer.stats)
+        parse, store, store_listing = parse_service_detail, store_service, writer.add_service_listing
+    else:
+        page = fetch_page(f"{BASE_URL}{link}", cache, writer.stats)
+        parse, store, store_listing = parse_standorte_details, store_standort, writer.add_standort_listing
+    if page.changed:
+        seconds, parsed = timed(parse, page.text)
+        if writer.stats is not None:
+            writer.stats.parse.add(seconds)
+        store(writer, ref_id, name, link, parsed)
+    else:
+        # the listing may have renamed the entry even though its detail page is the same
+        store_listing(ref_id, name, link)
+    save_page_after_flush(writer, cache, page)
+
+def run_queue_worker(cache_path, batch_size, max_attempts, retry_backoff, results):
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    engine = make_engine()
+    cache = ResponseCache(cache_path) if cache_path else None
+    stats = run_report.RunStats()
+
+    with BulkWriter(engine, batch_size, geocoding.make_geocoder(), stats) as writer:
+        while True:
+            claimed = job_queue.claim(engine, worker)
+            if not claimed:
+                # commit what we have so finished jobs are visible, then wait for retries that are not due yet
+                writer.flush()
+                wait = job_queue.next_due(engine)
+                if wait is None:
+                    if not job_queue.any_running(engine):
+                        break
+                    wait = 1.0
+                time.sleep(min(wait, 5.0))
+                continue
+
+            for job_id, kind, ref_id, name, link, attempts in claimed:
+                try:
+                    process_job(writer, cache, kind, ref_id, name, link)
+                except Exception as exc:
+                    job_queue.mark_failed(engine, job_id, attempts, f"{type(exc).__name__}: {exc}", max_attempts, retry_backoff)
+                else:
+                    writer.finish_job(job_id)
+    results.put((cache.stats if cache is not None else None, stats))
+    if cache is not None:
+        cache.close()
+
+def discover_jobs(engine, cache=None, stats=None):
+    service_index = fetch_page(SERVICES_URL, cache, stats)
+    standorte_index = fetch_page(STANDORTE_URL, cache, stats)
+    job_queue.clear(engine)
+    job_queue.enqueue(engine, 'service', [entry for _, entries in parse_service_index(service_index.text) for entry in entries])
+    job_queue.enqueue(engine, 'standort', [entry for _, entries in parse_standorte_index(standorte_index.text) for entry in entries])
+    save_page(cache, service_index)
+    save_page(cache, standorte_index)
+
+def scrape_with_queue(workers, cache_path=None, batch_size=DEFAULT_BATCH_SIZE, fresh=False,
+                      max_attempts=job_queue.DEFAULT_MAX_ATTEMPTS, retry_backoff=job_queue.DEFAULT_BACKOFF, stats=None):
+    """Scrape through the job queue; returns the merged HTTP cache stats of the run, or None without a cache."""
+    engine = make_engine()
+    create_db_and_tables(engine)
 
-                        # Link services to this Standort
-                        for service_id in service_relations:
-                            link_service_to_standort(session, standort_id, service_id)
+    stats = stats if stats is not None else run_report.RunStats()
+    cache_stats = CacheStats()
+    if fresh or not job_queue.has_unfinished(engine):
+        cache = ResponseCache(cache_path) if cache_path else None
+        with stats.stage("discover"):
+            discover_jobs(engine, cache, stats)
+        if cache is not None:
+            cache_stats.merge(cache.stats)
+            cache.close()
+    else:
+        # resume: jobs left running by a crashed run and failed jobs go back to the queue
+        released, retried = job_queue.resume(engine)
+        print(f"Resuming unfinished scrape jobs ({released} interrupted, {retried} failed).")
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=run_queue_worker, args=(cache_path, batch_size, max_attempts, retry_backoff, results))
+        for _ in range(workers)
+    ]
+    with stats.stage("jobs"):
+        for process in processes:
+            process.start()
+        with tqdm(total=sum(job_queue.status_counts(engine).values()), desc="Scraping Jobs") as progress:
+            while any(process.is_alive() for process in processes):
+                counts = job_queue.status_counts(engine)
+                progress.n = counts.get(job_queue.DONE, 0) + counts.get(job_queue.FAILED, 0)
+                progress.refresh()
+                time.sleep(1.0)
+        for process in processes:
+            process.join()
+    while not results.empty():
+        worker_cache_stats, worker_stats = results.get()
+        if worker_cache_stats is not None:
+            cache_stats.merge(worker_cache_stats)
+        stats.merge(worker_stats)
+
+    counts = job_queue.status_counts(engine)
+    if set(counts) == {job_queue.DONE}:
+        # every discovered job is done, so the jobs are a complete listing
+        with BulkWriter(engine, batch_size, stats=stats) as writer:
+            for kind in ('service', 'standort'):
+                writer.remove_unlisted(kind, job_queue.ref_ids(engine, kind))
+    print(f"Scrape jobs: {counts.get(job_queue.DONE, 0)} done, {counts.get(job_queue.FAILED, 0)} failed, "
+          f"{counts.get(job_queue.PENDING, 0) + counts.get(job_queue.RUNNING, 0)} unfinished")
+    if cache_path:
+        print(cache_stats.summary())
+        return cache_stats
+    return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape services and Standorte from service.berlin.de")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="fetch detail pages concurrently over a pooled keep-alive client")
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help="maximum number of requests in flight (async mode)")
+    parser.add_argument('--rps', type=float, default=4.0,
+                        help="maximum requests per second per host (async mode, 0 disables the limit)")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="retries with exponential backoff for failed requests (async mode)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="scrape through the persistent job queue with this many worker processes")
+    parser.add_argument('--fresh', action='store_true',
+                        help="queue mode: start a new run even if an earlier one left unfinished jobs")
+    parser.add_argument('--max-attempts', type=int, default=job_queue.DEFAULT_MAX_ATTEMPTS,
+                        help="queue mode: attempts per job before it is marked failed")
+    parser.add_argument('--retry-backoff', type=float, default=job_queue.DEFAULT_BACKOFF,
+                        help="queue mode: base delay in seconds of the exponential retry backoff")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="number of buffered records written per database transaction")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="processes used to parse pages (default: CPU count, 0 parses inline)")
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help="ignore the conditional-fetch cache and re-process every page")
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH,
+                        help="location of the on-disk HTTP response cache")
+    parser.add_argument('--report', default=None,
+                        help="path of the JSON run report (default: reports/scrape-<UTC time>.json next to this script)")
+    parser.add_argument('--prometheus-textfile', default=None,
+                        help="also write the run's metrics to this file for the node_exporter textfile collector")
+    return parser.parse_args()
+
+def run(args, stats):
+    """Scrape in the mode selected by `args`; returns the HTTP cache stats of the run, or None without a cache."""
+    # a missing gazetteer fails the run before any page is fetched
+    geocoding.ensure_available()
+    if args.workers:
+        return scrape_with_queue(args.workers, args.cache_path if args.use_cache else None, args.batch_size,
+                                 args.fresh, args.max_attempts, args.retry_backoff, stats)
+
+    cache = ResponseCache(args.cache_path) if args.use_cache else None
+    try:
+        if args.use_async:
+            asyncio.run(scrape_all_async(args.concurrency, args.rps, args.retries, cache, args.batch_size, args.parse_workers, stats))
+        else:
+            with stats.stage("services"):
+                scrape_services(cache, args.batch_size, args.parse_workers, stats)
+            print("Data has been successfully scraped and stored in the database.")
+            with stats.stage("standorte"):
+                scrape_standorte(cache, args.batch_size, args.parse_workers, stats)
+            print("Standorte data has been successfully scraped and stored in the database.")
+    finally:
+        if cache is not None:
+            cache.close()
+    if cache is not None:
+        print(cache.stats.summary())
+        return cache.stats
+    return None
 
 if __name__ == "__main__":
-    scrape_services()
-    print("Data has been successfully scraped and stored in the database.")
-    scrape_standorte()
-    print("Standorte data has been successfully scraped and stored in the database.")
\ No newline at end of file
+    args = parse_args()
+    stats = run_report.RunStats()
+    cache_stats = error = None
+    started_at = time.time()
+    try:
+        cache_stats = run(args, stats)
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        # written for failed and interrupted runs too, so they show up in the history
+        mode = "queue" if args.workers else "async" if args.use_async else "sequential"
+        report = run_report.build(stats, mode, started_at, time.time(), error, cache_stats)
+        report_path = args.report or run_report.default_report_path(started_at)
+        run_report.write(report, stats, report_path, args.prometheus_textfile)
+        print(run_report.summary(report))
+        print(f"Run report written to {report_path}")
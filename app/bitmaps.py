@@ -0,0 +1,194 @@
+import threading
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from . import settings
+
+OFFER_MODES = ("all", "any")
+# the products of the ids in the link checksum are reduced modulo a prime, so their sum cannot overflow
+CHECKSUM_MODULUS = 1_000_000_007
+
+
+def parse_offers(offers):
+    """`all:1,2,3` (Standorte offering every service) or `any:1,2,3` (at least one) as (mode, ids); a bare list means all."""
+    if not offers:
+        return None
+    mode, _, ids = offers.rpartition(":")
+    mode = mode or "all"
+    if mode not in OFFER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown offers mode {mode!r}, available: {', '.join(OFFER_MODES)}")
+    try:
+        service_ids = tuple(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="offers must be all: or any: followed by a comma separated list of service ids")
+    if not service_ids or len(service_ids) > settings.MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"offers must list between 1 and {settings.MAX_PAGE_SIZE} service ids")
+    return mode, service_ids
+
+
+def _positions(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class _Positions:
+    """Dense bit positions for sparse ids; positions are handed out in order of first appearance."""
+
+    def __init__(self):
+        self.position = {}
+        self.ids = []
+
+    def __getitem__(self, key):
+        position = self.position.get(key)
+        if position is None:
+            position = self.position[key] = len(self.ids)
+            self.ids.append(key)
+        return position
+
+
+class LinkBitmaps:
+    """The Standort/service link table as bitsets, in both directions.
+
+    Every service has an int whose set bits are the positions of the Standorte offering it, and
+    every Standort one whose bits are the positions of its services, with a mask of the online
+    services next to them. "Offers all of A, B and C" is then an AND of three ints and the
+    online/offline split of an office a popcount of its bits masked with the online services.
+    Links can be added incrementally; a removed link needs a rebuild.
+    """
+
+    def __init__(self):
+        self._standorte = _Positions()
+        self._services = _Positions()
+        self._by_service = {}
+        self._by_standort = {}
+        self._known = 0
+        self._online = 0
+        self.links = 0
+
+    @classmethod
+    def build(cls, links, online):
+        """Bitmaps of the (standort_id, service_id) `links`, with `online` mapping service ids to can_be_done_online."""
+        bitmaps = cls()
+        bitmaps.set_services(online)
+        bitmaps.add_links(links)
+        return bitmaps
+
+    def add_links(self, links):
+        for standort_id, service_id in links:
+            standort_bit = 1 << self._standorte[standort_id]
+            service_bit = 1 << self._services[service_id]
+            bits = self._by_standort.get(standort_id, 0)
+            if bits & service_bit:
+                continue
+            self._by_standort[standort_id] = bits | service_bit
+            self._by_service[service_id] = self._by_service.get(service_id, 0) | standort_bit
+            self.links += 1
+
+    def set_services(self, online):
+        """Replace the set of known services and their online flags; links of unknown services are not counted."""
+        known = flags = 0
+        for service_id, can_be_done_online in online.items():
+            bit = 1 << self._services[service_id]
+            known |= bit
+            if can_be_done_online:
+                flags |= bit
+        self._known, self._online = known, flags
+
+    def _standort_ids(self, bits):
+        ids = self._standorte.ids
+        return sorted(ids[position] for position in _positions(bits))
+
+    def offering(self, mode, service_ids):
+        """Ids of the Standorte offering all (mode "all") or any (mode "any") of `service_ids`, in id order."""
+        sets = [self._by_service.get(service_id, 0) for service_id in service_ids]
+        if mode == "all":
+            bits = sets[0]
+            for other in sets[1:]:
+                bits &= other
+        else:
+            bits = 0
+            for other in sets:
+                bits |= other
+        return self._standort_ids(bits)
+
+    def facets(self, standort_ids=None):
+        """(standort_id, services, online services) per Standort with links, or per id of `standort_ids`, in id order."""
+        if standort_ids is None:
+            standort_ids = sorted(self._by_standort)
+        known, online = self._known, self._online
+        facets = []
+        for standort_id in standort_ids:
+            bits = self._by_standort.get(standort_id, 0)
+            facets.append((standort_id, (bits & known).bit_count(), (bits & online).bit_count()))
+        return facets
+
+
+class BitmapCache:
+    """LinkBitmaps of the database, brought up to date when the dataset version changes.
+
+    Most scrapes only add links, so new links are read by rowid after the last one seen. They are
+    only applied when they account for the whole change of the link table's fingerprint (count,
+    highest rowid, sums of both ids and of their products); a removed link, a rowid SQLite handed
+    out again after a delete, or any other edit triggers a full rebuild. The online flags of the
+    services are re-read on every change.
+    """
+
+    FINGERPRINT_SQL = f"""
+        SELECT count(*), coalesce(max(rowid), 0), coalesce(sum(standort_id), 0), coalesce(sum(service_id), 0),
+               coalesce(sum((standort_id * service_id) % {CHECKSUM_MODULUS}), 0)
+        FROM standorteservices
+    """
+
+    def __init__(self):
+        self._version = None
+        self._bitmaps = None
+        self._last_rowid = 0
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    def get(self, version, engine):
+        with self._lock:
+            if self._bitmaps is None or version != self._version:
+                with engine.connect() as conn:
+                    self._refresh(conn)
+                self._version = version
+            return self._bitmaps
+
+    def _refresh(self, conn):
+        fingerprint = tuple(conn.execute(text(self.FINGERPRINT_SQL)).one())
+        online = dict(conn.execute(text("SELECT id, can_be_done_online FROM service")).all())
+        if fingerprint != self._fingerprint:
+            added = None
+            if self._bitmaps is not None and fingerprint[1] >= self._last_rowid:
+                added = conn.execute(
+                    text("SELECT rowid, standort_id, service_id FROM standorteservices WHERE rowid > :after ORDER BY rowid"),
+                    {"after": self._last_rowid},
+                ).all()
+                if _advance(self._fingerprint, added) != fingerprint:
+                    added = None
+            if added is None:
+                bitmaps = LinkBitmaps()
+                bitmaps.add_links(conn.execute(text("SELECT standort_id, service_id FROM standorteservices")).all())
+            else:
+                bitmaps = self._bitmaps
+                bitmaps.add_links((standort_id, service_id) for _, standort_id, service_id in added)
+            self._bitmaps, self._last_rowid, self._fingerprint = bitmaps, fingerprint[1], fingerprint
+        self._bitmaps.set_services(online)
+
+
+def _advance(fingerprint, added):
+    """The fingerprint of the link table after appending the `added` (rowid, standort_id, service_id) rows."""
+    count, last_rowid, standort_sum, service_sum, checksum = fingerprint
+    for rowid, standort_id, service_id in added:
+        count += 1
+        last_rowid = max(last_rowid, rowid)
+        standort_sum += standort_id
+        service_sum += service_id
+        checksum += standort_id * service_id % CHECKSUM_MODULUS
+    return count, last_rowid, standort_sum, service_sum, checksum
+
+
+link_bitmaps = BitmapCache()
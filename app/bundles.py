@@ -0,0 +1,55 @@
+import json
+
+from fastapi import HTTPException
+
+from . import settings
+from .pagination import public
+
+INCLUDES = ("detail", "formulare", "standorte")
+
+
+def parse_include(include):
+    if not include:
+        return ()
+    requested = tuple(dict.fromkeys(name.strip() for name in include.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in INCLUDES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include {unknown}, available: {', '.join(INCLUDES)}")
+    return requested
+
+
+def parse_ids(ids):
+    try:
+        parsed = tuple(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma separated list of integers")
+    if not parsed or len(parsed) > settings.MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"ids must list between 1 and {settings.MAX_PAGE_SIZE} ids")
+    return parsed
+
+
+def _detail(detail):
+    if detail is None:
+        return None
+    data = public(detail)
+    data["sections"] = json.loads(detail.sections) if detail.sections else None
+    return data
+
+
+def assemble(services, details, formulare, standorte, include):
+    """One dict per service, in the order of `services`, with the requested related records.
+
+    `details`, `formulare` and `standorte` map service ids to what the batched queries returned
+    for them; services without related records get None or an empty list.
+    """
+    bundles = []
+    for service in services:
+        bundle = public(service)
+        if "detail" in include:
+            bundle["detail"] = _detail(details.get(service.id))
+        if "formulare" in include:
+            bundle["formulare"] = [public(formular) for formular in formulare.get(service.id, ())]
+        if "standorte" in include:
+            bundle["standorte"] = [public(standort) for standort in standorte.get(service.id, ())]
+        bundles.append(bundle)
+    return bundles
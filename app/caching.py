@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+
+from fastapi import Request, Response
+
+from . import dataset_version, read_model, settings
+from .db_executor import run_db
+from .models import engine
+
+# route family -> path prefixes; the Cache-Control value of each family comes from settings
+ROUTE_FAMILIES = {
+    "api": ("/api/services/", "/api/standorte/", "/api/formulare/", "/api/search", "/api/suggest"),
+    "pages": ("/services/", "/standorte/", "/formulare/"),
+}
+
+
+class VersionCache:
+    """The database's dataset version, re-read at most once per `ttl` seconds."""
+
+    def __init__(self, engine, ttl):
+        self.engine = engine
+        self.ttl = ttl
+        self._version = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def fresh(self):
+        return time.monotonic() - self._checked_at < self.ttl
+
+    def get(self):
+        if self.fresh:
+            return self._version
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.ttl:
+                with self.engine.connect() as conn:
+                    self._version = dataset_version.read(conn)
+                self._checked_at = time.monotonic()
+        return self._version
+
+
+versions = VersionCache(engine, settings.VERSION_TTL)
+
+
+class IndexCache:
+    """An in-memory index of the stored data for the current dataset version, rebuilt when it changes.
+
+    `build` turns what `load()` returns into the index, e.g. a GridIndex of Standort coordinates.
+    A database that was never stamped has the version None, which is cached like any other; every
+    writer stamps a new version, see app/dataset_version.py.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._version = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self, version, load):
+        with self._lock:
+            if self._index is None or version != self._version:
+                self._index = self.build(load())
+                self._version = version
+            return self._index
+
+
+async def current_version():
+    # the read model serves the snapshot it loaded, so its version is the one that describes the response
+    model = read_model.current()
+    if model is not None:
+        return model.version
+    if versions.fresh:
+        return versions.get()
+    return await run_db(versions.get)
+
+
+def route_family(path):
+    for family, prefixes in ROUTE_FAMILIES.items():
+        if path.startswith(prefixes):
+            return family
+    return None
+
+
+def make_etag(version, request):
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha256(f"{version}\n{request.url.path}\n{query}".encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _opaque_tag(etag):
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match, etag):
+    """Whether `If-None-Match` lists `etag` or is `*`, with the weak comparison RFC 9110 requires for it.
+
+    Proxies may weaken the tags they pass on, so `W/"abc"` matches `"abc"`.
+    """
+    if not if_none_match:
+        return False
+    candidates = [_opaque_tag(value) for value in if_none_match.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in candidates
+
+
+async def conditional_get(request: Request, call_next):
+    """Set ETag and Cache-Control on dataset responses and answer matching If-None-Match with a 304.
+
+    The ETag is derived from the dataset version and the route parameters, so a revalidation is
+    answered before the route runs and without reading any data. `If-None-Match: *` only matches
+    a resource that exists, so it is answered once the route has found it.
+    """
+    family = route_family(request.url.path)
+    if family is None or request.method not in ("GET", "HEAD"):
+        return await call_next(request)
+
+    if_none_match = request.headers.get("if-none-match")
+    wildcard = if_none_match is not None and if_none_match.strip() == "*"
+    headers = {"Cache-Control": settings.CACHE_CONTROL[family]}
+    version = await current_version()
+    if version is not None:
+        headers["ETag"] = make_etag(version, request)
+        if not wildcard and etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        if wildcard:
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return response
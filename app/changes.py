@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import time
+
+from sqlalchemy import text
+
+from .search_index import SPACE_RE
+
+TABLE = "change_log"
+
+CREATE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    related_id INTEGER,
+    op TEXT NOT NULL,
+    content_hash TEXT,
+    changed_at REAL NOT NULL
+)
+"""
+
+# entity -> (table, key column, related column); a link is keyed by its Standort and related to its service
+ENTITIES = {
+    "service": ("service", "id", None),
+    "servicedetail": ("servicedetail", "service_id", None),
+    "formular": ("formular", "id", "service_id"),
+    "standort": ("standorte", "id", None),
+    "link": ("standorteservices", "standort_id", "service_id"),
+}
+# columns that identify a stored row, where the key column alone does not
+ROW_KEYS = {"link": ("standort_id", "service_id")}
+# columns whose values make up the content hash, per entity; the normalized description columns are
+# derived from the description (see app/normalize.py), so they are left out
+HASHED_COLUMNS = {
+    "service": ("service_name", "link", "can_be_done_online"),
+    "servicedetail": ("title", "description"),
+    "formular": ("service_id", "title", "url"),
+    "standort": ("name", "link", "address", "phone", "fax", "email", "homepage", "lat", "lon"),
+    "link": ("standort_id", "service_id"),
+}
+# coordinates are compared with about 1 cm precision, float noise is not a change
+COORDINATE_DIGITS = 7
+
+
+def _normalize(value):
+    if isinstance(value, bool):
+        # SQLite hands booleans back as 0 and 1
+        return int(value)
+    if isinstance(value, str):
+        return SPACE_RE.sub(" ", value).strip()
+    if isinstance(value, float):
+        return round(value, COORDINATE_DIGITS)
+    return value
+
+
+def content_hash(entity, row):
+    """Hash of the HASHED_COLUMNS of `row` (a mapping), insensitive to whitespace differences in text."""
+    values = [_normalize(row[column]) for column in HASHED_COLUMNS[entity]]
+    return hashlib.sha256(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()[:32]
+
+
+def event(entity, op, row):
+    """A change log entry for the `row` of `entity`, whose content hash is already set."""
+    _, key, related = ENTITIES[entity]
+    return {
+        "entity": entity,
+        "entity_id": row[key],
+        "related_id": row[related] if related else None,
+        "op": op,
+        "content_hash": row.get("content_hash") if op != "deleted" else None,
+    }
+
+
+def exists(conn):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": TABLE}
+    ).first() is not None
+
+
+def create(conn):
+    conn.exec_driver_sql(CREATE_SQL)
+
+
+def record(conn, events, changed_at=None):
+    """Append `events` to the change log inside the caller's transaction."""
+    if not events:
+        return
+    changed_at = changed_at or time.time()
+    conn.execute(
+        text(f"""
+            INSERT INTO {TABLE} (entity, entity_id, related_id, op, content_hash, changed_at)
+            VALUES (:entity, :entity_id, :related_id, :op, :content_hash, :changed_at)
+        """),
+        [{**change, "changed_at": changed_at} for change in events],
+    )
+
+
+def rehash(conn, entity, keys=None, emit=True):
+    """Recompute the stored hashes of `entity` rows (all of them, or those with `keys`) after an edit outside the scraper.
+
+    Rows whose hash changes are stamped with the current time and, with `emit`, get an updated
+    event; returns the number of such rows.
+    """
+    table, key, _ = ENTITIES[entity]
+    row_key = ROW_KEYS.get(entity, (key,))
+    columns = tuple(dict.fromkeys((*row_key, *HASHED_COLUMNS[entity])))
+    query = f"SELECT {', '.join(columns)}, content_hash FROM {table}"
+    params = {}
+    if keys is not None:
+        keys = list(keys)
+        if not keys:
+            return 0
+        query += f" WHERE {key} IN ({', '.join(f':key{i}' for i in range(len(keys)))})"
+        params = {f"key{i}": value for i, value in enumerate(keys)}
+    now = time.time()
+    changed = []
+    for row in conn.execute(text(query), params).mappings():
+        row = dict(row)
+        digest = content_hash(entity, row)
+        if digest != row["content_hash"]:
+            changed.append({**row, "content_hash": digest})
+    if changed:
+        where = " AND ".join(f"{column} = :{column}" for column in row_key)
+        conn.execute(
+            text(f"UPDATE {table} SET content_hash = :content_hash, changed_at = :changed_at WHERE {where}"),
+            [{**{column: row[column] for column in row_key}, "content_hash": row["content_hash"], "changed_at": now if emit else None}
+             for row in changed],
+        )
+        if emit:
+            record(conn, [event(entity, "updated", row) for row in changed], now)
+    return len(changed)
+
+
+def bounds(conn):
+    """(first, last) cursor of the retained log: `first` is the cursor before its oldest event."""
+    first, last = conn.execute(text(f"SELECT min(seq) - 1, max(seq) FROM {TABLE}")).one()
+    if last is None:
+        # an empty log continues after the last sequence number ever handed out
+        last = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :name"), {"name": TABLE}).scalar() or 0
+        first = last
+    return first, last
+
+
+def window(engine, since, limit=None):
+    """(first, last, upto) for a read of the events after cursor `since`: at most `limit` of them, none after the last one now.
+
+    Returns None when the database has no change log.
+    """
+    with engine.connect() as conn:
+        if not exists(conn):
+            return None
+        first, last = bounds(conn)
+        upto = last
+        if limit is not None:
+            end = conn.execute(
+                text(f"SELECT seq FROM {TABLE} WHERE seq > :since ORDER BY seq LIMIT 1 OFFSET :offset"),
+                {"since": since, "offset": limit - 1},
+            ).scalar()
+            if end is not None:
+                upto = end
+        return first, last, upto
+
+
+def fetch_chunk(engine, after, upto, chunk_size):
+    """Up to `chunk_size` events with a cursor in (after, upto], oldest first, as dicts."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(f"""
+                SELECT seq AS cursor, entity, entity_id AS id, related_id, op, content_hash, changed_at
+                FROM {TABLE} WHERE seq > :after AND seq <= :upto ORDER BY seq LIMIT :limit
+            """),
+            {"after": after, "upto": upto, "limit": chunk_size},
+        ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def prune(conn, before):
+    """Drop the events older than the `before` timestamp; readers behind them have to resync from a full export."""
+    return conn.execute(text(f"DELETE FROM {TABLE} WHERE changed_at < :before"), {"before": before}).rowcount
+
+
+if __name__ == "__main__":
+    from .database import make_engine
+
+    engine = make_engine("scraper")
+
+    parser = argparse.ArgumentParser(description="Inspect and trim the change log")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("status", help="show the cursor range and the events per entity and operation")
+    prune_parser = subcommands.add_parser("prune", help="drop old events")
+    prune_parser.add_argument("--keep-days", type=float, default=90)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        with engine.connect() as conn:
+            first, last = bounds(conn)
+            counts = conn.execute(text(f"SELECT entity, op, count(*) FROM {TABLE} GROUP BY entity, op ORDER BY entity, op")).all()
+        print(f"Cursors {first} to {last}")
+        for entity, op, count in counts:
+            print(f"{entity:<14} {op:<8} {count}")
+    else:
+        with engine.begin() as conn:
+            removed = prune(conn, time.time() - args.keep_days * 86400)
+        print(f"Removed {removed} events older than {args.keep_days:g} days.")
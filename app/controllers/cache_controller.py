@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from ..templating import render_cache
+
+router = APIRouter()
+
+@router.get("/api/render-cache/stats")
+async def render_cache_stats():
+    return render_cache.stats()
@@ -0,0 +1,34 @@
+from typing import Optional
+import orjson
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from .. import changes
+from ..db_executor import run_db
+from ..models import engine
+from ..schemas import Change
+
+router = APIRouter()
+
+CHUNK_SIZE = 1000
+
+@router.get("/api/changes", responses={200: {"model": Change, "description": "NDJSON, one change per line, oldest first"}})
+async def list_changes(since: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    window = await run_db(changes.window, engine, since, limit)
+    if window is None:
+        raise HTTPException(status_code=503, detail="The database has no change log, run: python -m app.migrations migrate")
+    first, last, upto = window
+    if not first <= since <= last:
+        # pruned events, or a cursor of another database: the client has to start over from a full export
+        raise HTTPException(status_code=410, detail=f"Cursor {since} is not in the change log, which covers {first} to {last}; resync and continue from {last}")
+
+    async def body():
+        # the window is fixed up front, so X-Next-Cursor holds even while the scraper appends events
+        after = since
+        while after < upto:
+            rows = await run_db(changes.fetch_chunk, engine, after, upto, CHUNK_SIZE)
+            if not rows:
+                return
+            after = rows[-1]["cursor"]
+            yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers={"X-Next-Cursor": str(upto)})
@@ -0,0 +1,27 @@
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from .. import export
+from ..db_executor import run_db
+from ..models import engine
+
+router = APIRouter()
+
+@router.get("/api/export")
+async def export_table(table: str, format: Literal["ndjson", "csv"] = "ndjson", chunk_size: int = Query(export.DEFAULT_CHUNK_SIZE, ge=1, le=10000)):
+    if table not in export.TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table, available: {', '.join(export.TABLES)}")
+    names = await run_db(export.columns, engine, table)
+
+    async def body():
+        # each chunk is read on the DB executor with a connection of its own, while the previous one is sent
+        yield export.header(format, names)
+        after = None
+        while True:
+            after, rows = await run_db(export.fetch_chunk, engine, table, after, chunk_size)
+            if not rows:
+                return
+            yield export.encode(format, names, rows)
+
+    headers = {"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    return StreamingResponse(body(), media_type=export.MEDIA_TYPES[format], headers=headers)
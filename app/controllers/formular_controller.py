@@ -1,25 +1,30 @@
-from fastapi import APIRouter, HTTPException, Query, Request
-from sqlalchemy.orm import selectinload
-from sqlmodel import Session, select
-from ..models import Formular, engine
-from fastapi.templating import Jinja2Templates
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from .. import settings
+from ..pagination import page_request
+from ..repository import call, get_repository
+from ..responses import page_response
+from ..schemas import FormularOut
+from ..templating import render
+from ..models import Formular
+from ..instrumentation import query_budget
+from ..query_plans import full_scan
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
-@router.get("/api/formulare/")
-def get_formulare(search: str = Query("")):
-    with Session(engine) as session:
-        query = select(Formular)
-        if search:
-            query = query.where(Formular.title.contains(search))
-        formulare = session.exec(query).all()
-        return formulare
+@router.get("/api/formulare/", response_model=List[FormularOut])
+@query_budget(2)
+@full_scan("formular")
+async def get_formulare(request: Request, search: str = Query(""), limit: Optional[int] = Query(None, ge=1, le=settings.MAX_PAGE_SIZE), cursor: Optional[str] = None, order: Literal["id", "name"] = "id", fields: Optional[str] = None, repo=Depends(get_repository)):
+    page = page_request(Formular, order, cursor, limit, fields)
+    return await page_response(request, page, lambda: call(repo.formulare_page, page, search), cacheable=not search)
 
 @router.get("/api/formulare/{formular_id}")
-async def formular_detail(request: Request, formular_id: int):
-    with Session(engine) as session:
-        formular = session.exec(select(Formular).where(Formular.id == formular_id).options(selectinload(Formular.service))).first()
+@query_budget(2)
+async def formular_detail(request: Request, formular_id: int, repo=Depends(get_repository)):
+    def context():
+        formular = repo.formular(formular_id)
         if not formular:
             raise HTTPException(status_code=404, detail="Formular not found")
-    return templates.TemplateResponse("formular_detail.html", {"request": request, "formular": formular})
+        return {"formular": formular, "service": repo.service(formular.service_id)}
+    return await render(request, "formular_detail.html", context)
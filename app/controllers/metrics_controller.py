@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Response
+from .. import metrics, settings
+from ..templating import render_cache
+
+router = APIRouter()
+
+def render_cache_families():
+    stats = render_cache.stats()
+    return [
+        ("render_cache_lookups_total", "counter", "Render cache lookups by result.",
+         [("", {"result": "hit"}, stats["hits"]), ("", {"result": "miss"}, stats["misses"])]),
+        ("render_cache_evictions_total", "counter", "Entries evicted to stay within the size bound.", [("", {}, stats["evictions"])]),
+        ("render_cache_entries", "gauge", "Entries in the render cache.", [("", {}, stats["entries"])]),
+        ("render_cache_size_bytes", "gauge", "Bytes held by the render cache.", [("", {}, stats["size_bytes"])]),
+    ]
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.METRICS:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.exposition(render_cache_families()), media_type=metrics.CONTENT_TYPE)
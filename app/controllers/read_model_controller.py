@@ -0,0 +1,17 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from .. import read_model, settings
+from ..db_executor import run_db
+from ..models import engine
+
+router = APIRouter()
+
+@router.post("/api/read-model/reload")
+async def reload_read_model(x_reload_token: Optional[str] = Header(None)):
+    if read_model.current() is None or not settings.RELOAD_TOKEN:
+        raise HTTPException(status_code=404, detail="Read model is not enabled")
+    if not x_reload_token or not secrets.compare_digest(x_reload_token, settings.RELOAD_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid reload token")
+    model = await run_db(read_model.reload, engine)
+    return {"loaded_at": model.loaded_at, "counts": model.counts()}
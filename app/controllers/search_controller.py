@@ -0,0 +1,30 @@
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from .. import search_index
+from ..db_executor import run_db
+from ..repository import call, get_repository
+from ..responses import json_response
+from ..schemas import SearchHit, Suggestion
+from ..suggest import KINDS
+from ..models import engine
+from ..instrumentation import query_budget
+from ..query_plans import full_scan
+
+router = APIRouter()
+
+@router.get("/api/search", response_model=List[SearchHit])
+@query_budget(2)
+async def search(q: str = Query(..., min_length=1), kind: Optional[List[str]] = Query(None), limit: int = Query(20, ge=1, le=100)):
+    def run():
+        with engine.connect() as conn:
+            if not search_index.exists(conn):
+                raise HTTPException(status_code=503, detail="Search index has not been built, run: python -m app.search_index rebuild")
+            return search_index.search(conn, q, kinds=kind, limit=limit)
+    return json_response(await run_db(run))
+
+@router.get("/api/suggest", response_model=List[Suggestion])
+@query_budget(1)
+@full_scan("service", "formular", "standorte")
+async def suggest(q: str = Query(..., min_length=1), kind: Optional[List[Literal[KINDS]]] = Query(None), limit: int = Query(10, ge=1, le=50), repo=Depends(get_repository)):
+    # the index is built in memory once per dataset version, a keystroke reads no rows
+    return json_response(await call(repo.suggest, q, limit, kind))
@@ -1,56 +1,41 @@
-from fastapi import APIRouter, HTTPException, Query, Request
-from sqlalchemy.orm import selectinload
-from sqlmodel import Session, select
-from ..models import Service, ServiceDetail, engine
-from fastapi.templating import Jinja2Templates
-import re
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from .. import settings
+from ..bundles import parse_ids, parse_include
+from ..pagination import page_request
+from ..repository import call, get_repository
+from ..responses import json_response, page_response
+from ..schemas import ServiceBundle
+from ..templating import render
+from ..models import Service
+from ..instrumentation import query_budget
+from ..query_plans import full_scan
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
-def clean_description(description: str) -> str:
-    unwanted_phrases = [
-        "MAIN CONTENT",
-        "Bitte wählen Sie zuerst einen Standort aus.",
-        "Zu den verfügbaren Standorten",
-        "An diesem Standort einen Termin buchen",
-        "Download",
-        "Seite als PDF herunterladen",
-        "Chat",
-        "Stellen Sie unserem Chatbot Bobbi Ihre Fragen.",
-        "Stellen Sie unserem bot Bobbi Ihre Fragen.",
-        "Jetzt mit Bobbi in 11 Sprachen chatten",
-        "Für Sie zuständig",
-        "Bitte wählen Sie für eine Terminvereinbarung einen Standort aus"
-    ]
-
-    for phrase in unwanted_phrases:
-        description = description.replace(phrase, "")
-
-    description = re.sub(r'<form[^>]*>.*?</form>', '', description, flags=re.DOTALL)
-    
-    cleaned_description = description.strip()
-    
-    return cleaned_description
-
-
-@router.get("/api/services/")
-def get_services(search: str = Query(""), can_be_done_online: bool = Query(None)):
-    with Session(engine) as session:
-        query = select(Service)
-        if search:
-            query = query.where(Service.service_name.contains(search))
-        if can_be_done_online is not None:
-            query = query.where(Service.can_be_done_online == can_be_done_online)
-        services = session.exec(query).all()
-        return services
+@router.get("/api/services/", response_model=List[ServiceBundle])
+@query_budget(3)
+@full_scan("service")
+async def get_services(request: Request, search: str = Query(""), can_be_done_online: bool = Query(None), limit: Optional[int] = Query(None, ge=1, le=settings.MAX_PAGE_SIZE), cursor: Optional[str] = None, order: Literal["id", "name"] = "id", fields: Optional[str] = None, ids: Optional[str] = None, include: Optional[str] = None, repo=Depends(get_repository)):
+    if ids is not None:
+        # bundle of several services in one round trip, in the order of `ids`
+        return json_response(await call(repo.service_bundles, parse_ids(ids), parse_include(include)))
+    if include is not None:
+        raise HTTPException(status_code=400, detail="include requires ids, or use /api/services/{service_id}?include=...")
+    page = page_request(Service, order, cursor, limit, fields)
+    return await page_response(request, page, lambda: call(repo.services_page, page, search, can_be_done_online), cacheable=not search and can_be_done_online is None)
 
 @router.get("/api/services/{service_id}")
-async def service_detail(request: Request, service_id: int):
-    with Session(engine) as session:
-        service = session.exec(select(Service).where(Service.id == service_id)).first()
+@query_budget(3)
+async def service_detail(request: Request, service_id: int, include: Optional[str] = None, repo=Depends(get_repository)):
+    if include is not None:
+        bundle = await call(repo.service_bundles, (service_id,), parse_include(include))
+        if not bundle:
+            raise HTTPException(status_code=404, detail="Service not found")
+        return json_response(bundle[0])
+    def context():
+        service = repo.service(service_id)
         if not service:
             raise HTTPException(status_code=404, detail="Service not found")
-        service_detail = session.exec(select(ServiceDetail).where(ServiceDetail.service_id == service_id)).first()
-        service_detail.description = clean_description(service_detail.description)
-        return templates.TemplateResponse("service_detail.html", {"request": request, "service": service, "service_detail": service_detail})
\ No newline at end of file
+        return {"service": service, "service_detail": repo.service_detail(service_id), "standorte": repo.standorte_of_service(service_id)}
+    return await render(request, "service_detail.html", context)
@@ -1,25 +1,51 @@
-from fastapi import APIRouter, HTTPException, Query, Request
-from sqlalchemy.orm import selectinload
-from sqlmodel import Session, select
-from ..models import Standorte, engine
-from fastapi.templating import Jinja2Templates
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from .. import settings
+from ..bitmaps import parse_offers
+from ..pagination import page_request, public
+from ..repository import call, get_repository
+from ..responses import json_response, page_response
+from ..schemas import NearestStandort, StandortFacets, StandortOut
+from ..templating import render
+from ..models import Standorte
+from ..instrumentation import query_budget
+from ..query_plans import full_scan
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
-@router.get("/api/standorte/")
-def get_standorte(search: str = Query("")):
-    with Session(engine) as session:
-        query = select(Standorte)
-        if search:
-            query = query.where(Standorte.name.contains(search))
-        standorte = session.exec(query).all()
-        return standorte
+# with `offers`, up to three more statements bring the link bitmaps up to a new dataset version
+@router.get("/api/standorte/", response_model=List[StandortOut])
+@query_budget(5)
+@full_scan("standorte", "standorteservices", "service")
+async def get_standorte(request: Request, search: str = Query(""), offers: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=settings.MAX_PAGE_SIZE), cursor: Optional[str] = None, order: Literal["id", "name"] = "id", fields: Optional[str] = None, repo=Depends(get_repository)):
+    page = page_request(Standorte, order, cursor, limit, fields)
+    offered = parse_offers(offers)
+    return await page_response(request, page, lambda: call(repo.standorte_page, page, search, offered), cacheable=not search)
+
+@router.get("/api/standorte/facets", response_model=List[StandortFacets])
+@query_budget(3)
+@full_scan("standorteservices", "service")
+async def standort_facets(offers: Optional[str] = None, repo=Depends(get_repository)):
+    facets = await call(repo.standort_facets, parse_offers(offers))
+    return json_response([
+        {"standort_id": standort_id, "services": services, "online": online, "offline": services - online}
+        for standort_id, services, online in facets
+    ])
+
+@router.get("/api/standorte/nearest", response_model=List[NearestStandort])
+@query_budget(3)
+@full_scan("standorte")
+async def nearest_standorte(lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=180), service_id: Optional[int] = None, k: int = Query(5, ge=1, le=settings.MAX_NEAREST), repo=Depends(get_repository)):
+    # the scan of standorte only happens when the grid index is rebuilt for a new dataset version
+    results = await call(repo.nearest_standorte, lat, lon, k, service_id)
+    return json_response([{**public(standort), "distance_m": round(distance, 1)} for standort, distance in results])
 
 @router.get("/api/standorte/{standort_id}")
-async def standort_detail(request: Request, standort_id: int):
-    with Session(engine) as session:
-        standort = session.exec(select(Standorte).where(Standorte.id == standort_id).options(selectinload(Standorte.services))).first()
+@query_budget(2)
+async def standort_detail(request: Request, standort_id: int, repo=Depends(get_repository)):
+    def context():
+        standort = repo.standort(standort_id)
         if not standort:
             raise HTTPException(status_code=404, detail="Standort not found")
-    return templates.TemplateResponse("standort_detail.html", {"request": request, "standort": standort})
+        return {"standort": standort, "services": repo.services_of_standort(standort_id)}
+    return await render(request, "standort_detail.html", context)
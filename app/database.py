@@ -0,0 +1,72 @@
+import urllib.parse
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from . import settings
+
+
+def _pragmas(profile):
+    pragmas = [
+        f"mmap_size = {settings.DB_MMAP_BYTES}",
+        f"cache_size = -{settings.DB_CACHE_KIB}",
+        "temp_store = MEMORY",
+    ]
+    if profile == "api":
+        pragmas.append("query_only = ON")
+    else:
+        # WAL is persistent in the database file: once the scraper has opened it, readers never
+        # block on its writes
+        pragmas += ["journal_mode = WAL", "synchronous = NORMAL"]
+    return pragmas
+
+
+def _url(profile, path):
+    if profile == "api":
+        # read-only URI, so a bug in the API can never write to the scraped data
+        params = {"mode": "ro"}
+        if settings.DB_IMMUTABLE:
+            params["immutable"] = "1"
+        return f"sqlite:///file:{urllib.parse.quote(path)}?{urllib.parse.urlencode(params)}&uri=true"
+    return f"sqlite:///{path}"
+
+
+def make_engine(profile="api", path=None):
+    """Engine for the API ("api": read-only, pooled to the DB executor size) or for writers ("scraper").
+
+    Both profiles set mmap_size, cache_size and temp_store on every connection; the scraper profile
+    also switches the database to WAL.
+    """
+    if profile not in ("api", "scraper"):
+        raise ValueError(f"Unknown engine profile {profile!r}")
+    path = path or settings.DB_PATH
+    options = {"connect_args": {"timeout": settings.DB_BUSY_TIMEOUT, "check_same_thread": False}}
+    if profile == "api":
+        # one pooled connection per DB executor thread plus a few for startup and maintenance work
+        options.update(poolclass=QueuePool, pool_size=settings.DB_WORKERS, max_overflow=4)
+    engine = create_engine(_url(profile, path), **options)
+
+    pragmas = _pragmas(profile)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+    return engine
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the effective connection settings of an engine profile")
+    parser.add_argument("profile", nargs="?", default="api", choices=("api", "scraper"))
+    args = parser.parse_args()
+
+    engine = make_engine(args.profile)
+    print(f"{args.profile}: {engine.url}")
+    with engine.connect() as conn:
+        for name in ("journal_mode", "mmap_size", "cache_size", "temp_store", "query_only", "synchronous"):
+            print(f"  {name} = {conn.exec_driver_sql(f'PRAGMA {name}').scalar()}")
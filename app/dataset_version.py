@@ -0,0 +1,55 @@
+import time
+import uuid
+
+from sqlalchemy import text
+
+TABLE = "dataset_version"
+
+CREATE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def create(conn):
+    conn.exec_driver_sql(CREATE_SQL)
+
+
+def bump(conn):
+    """Stamp the dataset with a new random version inside the caller's transaction and return it.
+
+    A random token rather than a counter, so a database scraped from scratch never reuses the
+    version of the one it replaces.
+    """
+    version = uuid.uuid4().hex
+    create(conn)
+    conn.execute(
+        text(f"""
+            INSERT INTO {TABLE} (id, version, updated_at) VALUES (1, :version, :updated_at)
+            ON CONFLICT(id) DO UPDATE SET version = excluded.version, updated_at = excluded.updated_at
+        """),
+        {"version": version, "updated_at": time.time()},
+    )
+    return version
+
+
+def read(conn):
+    """The current version, or None for a database that has never been stamped."""
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": TABLE}
+    ).first()
+    if not exists:
+        return None
+    return conn.execute(text(f"SELECT version FROM {TABLE} WHERE id = 1")).scalar()
+
+
+if __name__ == "__main__":
+    from .database import make_engine
+
+    engine = make_engine("scraper")
+
+    with engine.begin() as conn:
+        print(f"Dataset version is now {bump(conn)}.")
@@ -0,0 +1,15 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from . import settings
+
+# bounded pool for blocking database work, so slow statements never run on the event loop and
+# never queue behind unrelated blocking work in the default thread pool
+executor = ThreadPoolExecutor(max_workers=settings.DB_WORKERS, thread_name_prefix="db")
+
+
+async def run_db(func, *args):
+    """Run `func(*args)` on the database executor with the caller's context variables."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(executor, context.run, func, *args)
@@ -0,0 +1,170 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import orjson
+from sqlalchemy import text
+
+# exported tables and their sheet names in the workbook
+TABLES = {
+    "service": "Services",
+    "servicedetail": "ServiceDetails",
+    "formular": "Formulare",
+    "standorte": "Standorte",
+    "standorteservices": "StandorteServices",
+}
+FORMATS = ("ndjson", "csv", "xlsx")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+# service details can be hundreds of KB each, a chunk of 100 keeps memory flat at full speed
+DEFAULT_CHUNK_SIZE = 100
+# Excel rejects longer cell values
+XLSX_MAX_CELL_CHARS = 32767
+
+
+@dataclass
+class ExportStats:
+    table: str
+    rows: int = 0
+    seconds: float = 0.0
+    truncated: int = 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def columns(engine, table):
+    with engine.connect() as conn:
+        return [row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')]
+
+
+def fetch_chunk(engine, table, after=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Up to `chunk_size` rows of `table` after rowid `after`, as (last rowid, rows).
+
+    Every chunk is read on a short connection of its own with a rowid keyset, so a long export never
+    holds a connection or a read transaction while the rows are written out.
+    """
+    query = f'SELECT rowid, * FROM "{table}" {"WHERE rowid > :after" if after is not None else ""} ORDER BY rowid LIMIT :limit'
+    with engine.connect() as conn:
+        rows = conn.execute(text(query), {"after": after, "limit": chunk_size}).all()
+    if not rows:
+        return None, []
+    return rows[-1][0], [tuple(row[1:]) for row in rows]
+
+
+def iter_chunks(engine, table, chunk_size=DEFAULT_CHUNK_SIZE):
+    after = None
+    while True:
+        after, rows = fetch_chunk(engine, table, after, chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def ndjson_chunk(names, rows):
+    return b"".join(orjson.dumps(dict(zip(names, row))) + b"\n" for row in rows)
+
+
+def csv_chunk(names, rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(names)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def header(fmt, names):
+    return csv_chunk(names, [], header=True) if fmt == "csv" else b""
+
+
+def encode(fmt, names, rows):
+    return ndjson_chunk(names, rows) if fmt == "ndjson" else csv_chunk(names, rows)
+
+
+def export_stream(engine, table, fmt, out, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write one table as NDJSON or CSV to the binary file `out`."""
+    stats = ExportStats(table)
+    start = time.perf_counter()
+    names = columns(engine, table)
+    out.write(header(fmt, names))
+    for rows in iter_chunks(engine, table, chunk_size):
+        out.write(encode(fmt, names, rows))
+        stats.rows += len(rows)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def export_xlsx(engine, tables, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write the tables to one workbook, one sheet each, with openpyxl's write-only mode.
+
+    Write-only sheets stream their rows to temporary files instead of building cell objects in
+    memory, so memory use stays bounded by the chunk size. Values longer than an Excel cell can
+    hold are cut and counted in `truncated`; NDJSON and CSV keep them whole.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    all_stats = []
+    for table in tables:
+        stats = ExportStats(table)
+        start = time.perf_counter()
+        sheet = workbook.create_sheet(TABLES[table])
+        sheet.append(columns(engine, table))
+        for rows in iter_chunks(engine, table, chunk_size):
+            for row in rows:
+                if any(isinstance(value, str) and len(value) > XLSX_MAX_CELL_CHARS for value in row):
+                    stats.truncated += 1
+                    row = [value[:XLSX_MAX_CELL_CHARS] if isinstance(value, str) else value for value in row]
+                sheet.append(row)
+            stats.rows += len(rows)
+        stats.seconds = time.perf_counter() - start
+        all_stats.append(stats)
+    workbook.save(path)
+    return all_stats
+
+
+def export(engine, fmt, output, tables=tuple(TABLES), chunk_size=DEFAULT_CHUNK_SIZE):
+    """Export `tables` to `output` and return an ExportStats per table.
+
+    XLSX goes to one workbook. NDJSON and CSV go to `output/<table>.<format>`, or with a single
+    table to the file `output` ("-" for stdout).
+    """
+    if fmt == "xlsx":
+        return export_xlsx(engine, tables, output, chunk_size)
+    if len(tables) == 1 and not os.path.isdir(output):
+        if output == "-":
+            return [export_stream(engine, tables[0], fmt, sys.stdout.buffer, chunk_size)]
+        with open(output, "wb") as out:
+            return [export_stream(engine, tables[0], fmt, out, chunk_size)]
+    os.makedirs(output, exist_ok=True)
+    all_stats = []
+    for table in tables:
+        with open(os.path.join(output, f"{table}.{fmt}"), "wb") as out:
+            all_stats.append(export_stream(engine, table, fmt, out, chunk_size))
+    return all_stats
+
+
+if __name__ == "__main__":
+    from .database import make_engine
+
+    engine = make_engine("api")
+
+    parser = argparse.ArgumentParser(description="Export the dataset table by table, reading it in chunks")
+    parser.add_argument("--format", choices=FORMATS, default="xlsx")
+    parser.add_argument("--output", help="workbook, directory, or with one --table a file or - for stdout (default: services_export.xlsx or export/)")
+    parser.add_argument("--table", action="append", choices=list(TABLES), help="table to export, can be repeated (default: all)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    output = args.output or ("services_export.xlsx" if args.format == "xlsx" else "export")
+    results = export(engine, args.format, output, tuple(args.table or TABLES), args.chunk_size)
+    # stdout may carry the data itself, so the report goes to stderr
+    for stats in results:
+        truncated = f"  ({stats.truncated} rows with values cut to {XLSX_MAX_CELL_CHARS} characters)" if stats.truncated else ""
+        print(f"{stats.table:<18} {stats.rows:>9} rows  {stats.seconds:7.2f} s  {stats.rows_per_second:>10.0f} rows/s{truncated}", file=sys.stderr)
+    print(f"Exported {sum(stats.rows for stats in results)} rows to {output}.", file=sys.stderr)
@@ -0,0 +1,224 @@
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import text
+
+from . import settings
+from .search_index import fold
+
+POSTCODE_RE = re.compile(r"\b(\d{5})\b")
+SEPARATOR_RE = re.compile(r"[\s,]+")
+
+
+def normalize_address(address):
+    """Lookup key of an address: folded, lower-case, commas and runs of spaces as one space."""
+    return SEPARATOR_RE.sub(" ", fold(address or "")).strip().lower()
+
+
+class GazetteerMissing(FileNotFoundError):
+    pass
+
+
+def _check_gazetteer(path):
+    if not os.path.exists(path):
+        raise GazetteerMissing(
+            f"Gazetteer {path} does not exist: put a CSV file with address,lat,lon rows there (SERVICES_GAZETTEER "
+            "sets another path), or choose another geocoder with SERVICES_GEOCODER=nominatim or SERVICES_GEOCODER=none"
+        )
+
+
+class NullGeocoder:
+    name = "none"
+
+    def geocode(self, address):
+        return None
+
+
+class GazetteerGeocoder:
+    """Offline geocoder backed by a CSV file with `address,lat,lon` rows.
+
+    Addresses are matched after `normalize_address`. A row whose address is a bare postcode is the
+    fallback for every address with that postcode, so a file of postcode centroids is enough to
+    place each Standort in its neighbourhood. A missing file raises GazetteerMissing rather than
+    leaving every Standort without coordinates.
+    """
+
+    name = "gazetteer"
+
+    def __init__(self, path):
+        self.path = path
+        self._addresses = {}
+        self._postcodes = {}
+        _check_gazetteer(path)
+        with open(path, newline="", encoding="utf-8") as gazetteer:
+            for row in csv.DictReader(gazetteer):
+                point = (float(row["lat"]), float(row["lon"]))
+                key = normalize_address(row["address"])
+                if POSTCODE_RE.fullmatch(key):
+                    self._postcodes[key] = point
+                else:
+                    self._addresses[key] = point
+
+    def geocode(self, address):
+        key = normalize_address(address)
+        if key in self._addresses:
+            return self._addresses[key]
+        postcode = POSTCODE_RE.search(key)
+        return self._postcodes.get(postcode.group(1)) if postcode else None
+
+
+class NominatimGeocoder:
+    """Online geocoder using an OpenStreetMap Nominatim instance, at most one request per `min_interval` seconds."""
+
+    name = "nominatim"
+
+    def __init__(self, url, user_agent, min_interval=1.0):
+        self.url = url
+        self.user_agent = user_agent
+        self.min_interval = min_interval
+        self._last_request = 0.0
+        self._lock = threading.Lock()
+
+    def geocode(self, address):
+        import requests
+
+        with self._lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+        response = requests.get(
+            self.url,
+            params={"format": "json", "limit": 1, "q": (address or "").replace(",", ", ")},
+            headers={"User-Agent": self.user_agent},
+            timeout=30,
+        )
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return float(results[0]["lat"]), float(results[0]["lon"])
+
+
+class CachedGeocoder:
+    """Remembers the coordinates `inner` found per normalized address in an SQLite file.
+
+    Addresses are only geocoded once across scrapes, and coordinates found by an online geocoder
+    remain available to later offline runs. Misses are not stored, so they are retried.
+    """
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.name = inner.name
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                address TEXT PRIMARY KEY,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                geocoder TEXT NOT NULL,
+                geocoded_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def geocode(self, address):
+        key = normalize_address(address)
+        if not key:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT lat, lon FROM geocode_cache WHERE address = ?", (key,)).fetchone()
+        if row:
+            self.hits += 1
+            return row
+        self.misses += 1
+        point = self.inner.geocode(address)
+        if point is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO geocode_cache (address, lat, lon, geocoder, geocoded_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, point[0], point[1], self.inner.name, time.time()),
+                )
+                self._conn.commit()
+        return point
+
+
+def ensure_available(name=None):
+    """Raise GazetteerMissing up front when the selected geocoder is the gazetteer and its file does not exist."""
+    if (name or settings.GEOCODER) == "gazetteer":
+        _check_gazetteer(settings.GAZETTEER_PATH)
+
+
+def make_geocoder(name=None):
+    """The geocoder selected by SERVICES_GEOCODER (gazetteer, nominatim or none), behind the geocode cache."""
+    name = name or settings.GEOCODER
+    if name == "none":
+        return NullGeocoder()
+    if name == "gazetteer":
+        inner = GazetteerGeocoder(settings.GAZETTEER_PATH)
+    elif name == "nominatim":
+        inner = NominatimGeocoder(settings.NOMINATIM_URL, settings.NOMINATIM_USER_AGENT)
+    else:
+        raise ValueError(f"Unknown geocoder {name!r}, use gazetteer, nominatim or none")
+    return CachedGeocoder(inner, settings.GEOCODE_CACHE_PATH)
+
+
+def backfill(engine, geocoder, only_missing=True):
+    """Geocode the stored Standorte; returns (geocoded, not found)."""
+    from . import changes, dataset_version
+
+    query = "SELECT id, address FROM standorte WHERE address IS NOT NULL"
+    if only_missing:
+        query += " AND (lat IS NULL OR lon IS NULL)"
+    with engine.connect() as conn:
+        rows = conn.execute(text(query)).all()
+    updates = []
+    for standort_id, address in rows:
+        point = geocoder.geocode(address)
+        if point is not None:
+            updates.append({"id": standort_id, "lat": point[0], "lon": point[1]})
+    if updates:
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE standorte SET lat = :lat, lon = :lon WHERE id = :id"), updates)
+            # new coordinates are a change of the Standort for the change feed
+            changes.rehash(conn, "standort", [update["id"] for update in updates])
+            dataset_version.bump(conn)
+    return len(updates), len(rows) - len(updates)
+
+
+if __name__ == "__main__":
+    from .database import make_engine
+    from .migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Geocode Standort addresses")
+    parser.add_argument("--geocoder", choices=("gazetteer", "nominatim", "none"), default=None,
+                        help="default: SERVICES_GEOCODER")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subcommands.add_parser("backfill", help="store coordinates for Standorte that have none")
+    backfill_parser.add_argument("--all", action="store_true", help="geocode Standorte that already have coordinates, too")
+    lookup_parser = subcommands.add_parser("lookup", help="geocode one address")
+    lookup_parser.add_argument("address")
+    args = parser.parse_args()
+
+    geocoder = make_geocoder(args.geocoder)
+    if args.command == "lookup":
+        print(geocoder.geocode(args.address) or "not found")
+    else:
+        engine = make_engine("scraper")
+        migrate(engine)
+        geocoded, missing = backfill(engine, geocoder, only_missing=not args.all)
+        print(f"Geocoded {geocoded} Standorte with the {geocoder.name} geocoder, {missing} addresses not found.")
@@ -0,0 +1,160 @@
+import argparse
+import contextvars
+import logging
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from fastapi import Request
+from sqlalchemy import event
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    @property
+    def max_repeats(self):
+        """How often the most frequent statement ran; more than once usually means an N+1 pattern."""
+        return max(self.statements.values(), default=0)
+
+
+_current = contextvars.ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+
+
+def install(engine):
+    """Count and time every statement `engine` runs into the QueryStats of the current request."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def query_budget(max_queries):
+    """Declare how many statements a route may run, checked by the middleware and `check_budgets`."""
+    def decorate(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorate
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+async def count_queries(request: Request, call_next):
+    """Collect the statements run while handling a request.
+
+    Routes that run more statements than their declared budget are logged; with
+    SERVICES_QUERY_HEADERS the counts are also returned in X-Query-Count, X-Query-Time-Ms,
+    X-Query-Repeats and a Server-Timing entry.
+    """
+    stats = QueryStats()
+    # for app.metrics, which attributes the statements to the route
+    request.state.query_stats = stats
+    token = _current.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+
+    budget = getattr(request.scope.get("endpoint"), "query_budget", None)
+    if budget is not None and stats.count > budget:
+        logger.warning("%s %s ran %d queries, its budget is %d", request.method, request.url.path, stats.count, budget)
+    if settings.QUERY_HEADERS:
+        milliseconds = stats.seconds * 1000
+        response.headers["X-Query-Count"] = str(stats.count)
+        response.headers["X-Query-Time-Ms"] = f"{milliseconds:.2f}"
+        response.headers["X-Query-Repeats"] = str(stats.max_repeats)
+        if budget is not None:
+            response.headers["X-Query-Budget"] = str(budget)
+        response.headers.append("Server-Timing", f'db;dur={milliseconds:.2f};desc="{stats.count} queries"')
+    return response
+
+
+def assert_query_budget(client, url, max_queries=None):
+    """Request `url` with a TestClient and fail if it ran more statements than allowed.
+
+    `max_queries` defaults to the budget the route declares. No statement may run more than once.
+    """
+    previous = settings.QUERY_HEADERS
+    settings.QUERY_HEADERS = True
+    try:
+        response = client.get(url)
+    finally:
+        settings.QUERY_HEADERS = previous
+    count = int(response.headers["X-Query-Count"])
+    repeats = int(response.headers["X-Query-Repeats"])
+    if max_queries is None:
+        max_queries = int(response.headers["X-Query-Budget"])
+    if count > max_queries:
+        raise QueryBudgetExceeded(f"{url} ran {count} queries, its budget is {max_queries}")
+    if repeats > 1:
+        raise QueryBudgetExceeded(f"{url} ran the same statement {repeats} times")
+    return response
+
+
+def sample_urls(engine):
+    """One URL per read route, using ids that exist in the database."""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        service_id = conn.execute(text("SELECT service_id FROM standorteservices LIMIT 1")).scalar() or 0
+        standort_id = conn.execute(text("SELECT standort_id FROM standorteservices LIMIT 1")).scalar() or 0
+        formular_id = conn.execute(text("SELECT id FROM formular LIMIT 1")).scalar() or 0
+    return [
+        "/api/services/", "/api/services/?limit=10&order=name&fields=id", f"/api/services/{service_id}",
+        f"/api/services/{service_id}?include=detail,formulare,standorte",
+        f"/api/services/?ids={service_id},{service_id + 1},0&include=detail,formulare,standorte",
+        "/api/standorte/", f"/api/standorte/?offers=all:{service_id}&limit=10", f"/api/standorte/facets?offers=any:{service_id}",
+        f"/api/standorte/{standort_id}",
+        f"/api/standorte/nearest?lat=52.52&lon=13.405&service_id={service_id}&k=5",
+        "/api/formulare/", f"/api/formulare/{formular_id}",
+        "/api/search?q=antrag", "/api/suggest?q=personalauswies",
+        "/services/", f"/services/{service_id}",
+        "/standorte/", f"/standorte/{standort_id}",
+        "/formulare/", f"/formulare/{formular_id}",
+    ]
+
+
+if __name__ == "__main__":
+    from fastapi.testclient import TestClient
+
+    from . import templating
+    from .main import app
+    from .models import engine
+
+    parser = argparse.ArgumentParser(description="Check every read route against its declared query budget")
+    parser.parse_args()
+
+    failures = 0
+    with TestClient(app) as client:
+        for url in sample_urls(engine):
+            # rendered pages would be served from the cache without running any statement
+            templating.render_cache.clear()
+            try:
+                response = assert_query_budget(client, url)
+                print(f"ok    {url}: {response.headers['X-Query-Count']}/{response.headers['X-Query-Budget']} queries")
+            except QueryBudgetExceeded as exc:
+                failures += 1
+                print(f"FAIL  {exc}")
+    sys.exit(1 if failures else 0)
@@ -1,16 +1,40 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from app.controllers import service_controller, standorte_controller, formular_controller
+from app import caching, instrumentation, metrics, migrations, read_model, settings
+from app.models import engine
+from app.controllers import service_controller, standorte_controller, formular_controller, search_controller, read_model_controller, cache_controller, export_controller, changes_controller, metrics_controller
 from app.views import service_view, standorte_view, formular_view
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the models select columns that only migrated databases have, fail at startup instead of on every request
+    migrations.ensure_current(engine)
+    if settings.READ_MODEL:
+        read_model.reload(engine)
+    yield
+
+instrumentation.install(engine)
+
+app = FastAPI(lifespan=lifespan)
+# registered first so it runs inside conditional_get and only counts the statements of the route
+app.middleware("http")(instrumentation.count_queries)
+app.middleware("http")(caching.conditional_get)
+# outermost, so it also times the 304 answers of conditional_get
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
 
 app.include_router(service_controller.router)
 app.include_router(standorte_controller.router)
 app.include_router(formular_controller.router)
+app.include_router(search_controller.router)
+app.include_router(read_model_controller.router)
+app.include_router(cache_controller.router)
+app.include_router(export_controller.router)
+app.include_router(changes_controller.router)
+app.include_router(metrics_controller.router)
 
 app.include_router(service_view.router)
 app.include_router(standorte_view.router)
@@ -0,0 +1,150 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from starlette.routing import Match
+
+from . import settings
+from .prometheus import Histogram, histogram_samples, render
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# label of requests no route matched, so unknown paths do not create new series
+UNMATCHED = "unmatched"
+
+
+class RequestTimings:
+    __slots__ = ("render_seconds",)
+
+    def __init__(self):
+        self.render_seconds = 0.0
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class Registry:
+    """Per-route request counts, latency histograms, DB and template render time, kept in process.
+
+    Series are keyed by the route template (`/api/services/{service_id}`), not the path, so their
+    number is bounded by the routes of the app. Updates take an uncontended lock and a bisect.
+    """
+
+    def __init__(self):
+        self.in_progress = 0
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(Histogram)
+        self.db_seconds = defaultdict(float)
+        self.db_statements = defaultdict(int)
+        self.render_seconds = defaultdict(float)
+        self.templates = defaultdict(Histogram)
+        self._lock = threading.Lock()
+
+    def observe_request(self, method, route, status, seconds, query_stats, render_seconds):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            self.latency[key].observe(seconds)
+            if query_stats is not None:
+                self.db_seconds[key] += query_stats.seconds
+                self.db_statements[key] += query_stats.count
+            self.render_seconds[key] += render_seconds
+
+    def observe_render(self, template, seconds):
+        with self._lock:
+            self.templates[template].observe(seconds)
+
+    def families(self):
+        with self._lock:
+            def labels(key):
+                return {"method": key[0], "route": key[1]}
+
+            families = [
+                ("http_requests_in_progress", "gauge", "Requests being handled.", [("", {}, self.in_progress)]),
+                ("http_requests_total", "counter", "Requests per route and status code.",
+                 [("", {"method": method, "route": route, "status": str(status)}, count)
+                  for (method, route, status), count in sorted(self.requests.items())]),
+                ("http_request_duration_seconds", "histogram", "Time from receiving a request to sending the end of its response.",
+                 [sample for key, histogram in sorted(self.latency.items()) for sample in histogram_samples(histogram, labels(key))]),
+                ("http_request_db_seconds_total", "counter", "Time spent in database statements per route.",
+                 [("", labels(key), seconds) for key, seconds in sorted(self.db_seconds.items())]),
+                ("http_request_db_statements_total", "counter", "Database statements run per route.",
+                 [("", labels(key), count) for key, count in sorted(self.db_statements.items())]),
+                ("http_request_render_seconds_total", "counter", "Time spent rendering templates per route.",
+                 [("", labels(key), seconds) for key, seconds in sorted(self.render_seconds.items())]),
+                ("template_render_duration_seconds", "histogram", "Time to render a template, render cache hits excluded.",
+                 [sample for name, histogram in sorted(self.templates.items()) for sample in histogram_samples(histogram, {"template": name})]),
+            ]
+        return families
+
+
+registry = Registry()
+
+
+def route_label(scope):
+    """The route template of the request in `scope` (the mount path for mounted apps), or UNMATCHED.
+
+    Requests answered before routing, like the 304s of conditional_get, are matched here.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope and scope.get("root_path"):
+        return scope["root_path"]
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED
+
+
+def record_render(template, seconds):
+    """Count a template render towards its template and the route of the current request."""
+    registry.observe_render(template, seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.render_seconds += seconds
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times every HTTP request and records it in the registry.
+
+    A plain ASGI middleware rather than an `http` function middleware, so it adds no task or body
+    stream of its own. It must be the outermost middleware, to measure 304 answers and the
+    statements that `instrumentation.count_queries` collects in the request state.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        registry.in_progress += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - start
+            registry.in_progress -= 1
+            _current.reset(token)
+            state = scope.get("state") or {}
+            registry.observe_request(
+                scope["method"], route_label(scope), status, seconds, state.get("query_stats"), timings.render_seconds
+            )
+
+
+def exposition(extra_families=()):
+    return render(registry.families() + list(extra_families))
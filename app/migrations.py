@@ -0,0 +1,205 @@
+import argparse
+import time
+
+from sqlalchemy import text
+
+from . import changes, dataset_version, search_index
+
+TABLE = "schema_migrations"
+
+CREATE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at REAL NOT NULL
+)
+"""
+
+
+def _tables(conn):
+    return {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+
+
+def add_normalized_description_columns(conn):
+    if "servicedetail" not in _tables(conn):
+        return
+    existing = _columns(conn, "servicedetail")
+    for column in ("description_clean", "sections"):
+        if column not in existing:
+            conn.exec_driver_sql(f'ALTER TABLE servicedetail ADD COLUMN "{column}" VARCHAR')
+
+
+def add_lookup_indexes(conn):
+    """Index the foreign keys the detail routes filter on.
+
+    Older scrapers could store a service's detail twice; only the newest row is kept so the
+    detail index can be unique, which the scraper's upsert relies on.
+    """
+    tables = _tables(conn)
+    if "servicedetail" in tables:
+        conn.exec_driver_sql(
+            "DELETE FROM servicedetail WHERE id NOT IN (SELECT MAX(id) FROM servicedetail GROUP BY service_id)"
+        )
+        conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ix_servicedetail_service_id ON servicedetail (service_id)")
+    if "formular" in tables:
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_formular_service_id ON formular (service_id)")
+    if "standorteservices" in tables:
+        # the primary key starts with standort_id; this covers the reverse direction of the link
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_standorteservices_service_id ON standorteservices (service_id, standort_id)"
+        )
+
+
+def add_name_order_indexes(conn):
+    """Index the keyset of `order=name` pages, so they are read in index order instead of sorted per request."""
+    tables = _tables(conn)
+    for table, column in (("service", "service_name"), ("standorte", "name"), ("formular", "title")):
+        if table in tables:
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_id ON {table} ({column}, id)")
+
+
+def add_standort_coordinates(conn):
+    if "standorte" not in _tables(conn):
+        return
+    existing = _columns(conn, "standorte")
+    for column in ("lat", "lon"):
+        if column not in existing:
+            conn.exec_driver_sql(f'ALTER TABLE standorte ADD COLUMN "{column}" FLOAT')
+
+
+def add_change_tracking(conn):
+    """Content hash and last change time per row, and the change log.
+
+    The hashes of the rows already stored are filled in without events, so the next scrape only
+    logs what it actually changes; their change time stays unknown.
+    """
+    tables = _tables(conn)
+    changes.create(conn)
+    for entity, (table, _, _) in changes.ENTITIES.items():
+        if table not in tables:
+            continue
+        existing = _columns(conn, table)
+        for column, column_type in (("content_hash", "VARCHAR"), ("changed_at", "FLOAT")):
+            if column not in existing:
+                conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN "{column}" {column_type}')
+        changes.rehash(conn, entity, emit=False)
+
+
+def rebuild_search_index_over_original_text(conn):
+    """The search index used to store the folded text, which its snippets showed; rebuild an existing one."""
+    if search_index.TABLE in _tables(conn):
+        search_index.rebuild(conn)
+
+
+# (version, name, function); append new migrations, never change or reorder applied ones
+MIGRATIONS = [
+    (1, "normalized description columns", add_normalized_description_columns),
+    (2, "lookup indexes", add_lookup_indexes),
+    (3, "name order indexes", add_name_order_indexes),
+    (4, "standort coordinates", add_standort_coordinates),
+    (5, "change tracking", add_change_tracking),
+    (6, "search index over original text", rebuild_search_index_over_original_text),
+]
+
+
+def applied(conn):
+    """{version: applied_at} of the migrations recorded in the database."""
+    if TABLE not in _tables(conn):
+        return {}
+    return dict(conn.execute(text(f"SELECT version, applied_at FROM {TABLE}")).all())
+
+
+def pending(engine):
+    with engine.connect() as conn:
+        done = applied(conn)
+    return [migration for migration in MIGRATIONS if migration[0] not in done]
+
+
+class PendingMigrations(RuntimeError):
+    pass
+
+
+def ensure_current(engine):
+    """Raise PendingMigrations when the database lacks migrations; the read-only API can not apply them itself."""
+    missing = pending(engine)
+    if missing:
+        names = ", ".join(f"{version:04d} {name}" for version, name, _ in missing)
+        raise PendingMigrations(
+            f"The database {engine.url.database.removeprefix('file:')} needs {len(missing)} schema migrations ({names}), "
+            "run: python -m app.migrations migrate"
+        )
+
+
+def migrate(engine):
+    """Apply the pending migrations in order, each in its own transaction; returns the applied (version, name) pairs.
+
+    A database without a dataset version is stamped with one, so the API can cache its indexes and
+    answer revalidations before the first scrape.
+    """
+    done = []
+    for version, name, upgrade in pending(engine):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(CREATE_SQL)
+            upgrade(conn)
+            conn.execute(
+                text(f"INSERT INTO {TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": time.time()},
+            )
+        done.append((version, name))
+    with engine.begin() as conn:
+        if dataset_version.read(conn) is None:
+            dataset_version.bump(conn)
+    return done
+
+
+def analyze(engine):
+    """Refresh the planner statistics in sqlite_stat1, e.g. after a full scrape."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def vacuum(engine):
+    """Rebuild the database file to drop free pages left by deleted rows, then truncate the WAL."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+if __name__ == "__main__":
+    import os
+
+    from . import settings
+    from .database import make_engine
+
+    engine = make_engine("scraper")
+
+    parser = argparse.ArgumentParser(description="Evolve services.db in place and maintain it")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("migrate", help="apply the pending schema migrations")
+    subcommands.add_parser("status", help="list the migrations and whether they are applied")
+    subcommands.add_parser("analyze", help="update the query planner statistics")
+    subcommands.add_parser("vacuum", help="compact the database file")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        done = migrate(engine)
+        for version, name in done:
+            print(f"Applied {version:04d} {name}")
+        print(f"{len(done)} migrations applied." if done else "Schema is up to date.")
+    elif args.command == "status":
+        with engine.connect() as conn:
+            done = applied(conn)
+        for version, name, _ in MIGRATIONS:
+            state = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(done[version])) if version in done else "pending"
+            print(f"{version:04d} {name:<40} {state}")
+    elif args.command == "analyze":
+        analyze(engine)
+        print("Statistics updated.")
+    else:
+        before = os.path.getsize(settings.DB_PATH)
+        vacuum(engine)
+        print(f"Vacuumed {settings.DB_PATH}: {before / 1024:.0f} KiB -> {os.path.getsize(settings.DB_PATH) / 1024:.0f} KiB")
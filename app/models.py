@@ -1,23 +1,31 @@
-from sqlmodel import SQLModel, Field, create_engine, Session, select, Relationship
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field, Session, select, Relationship
 from typing import List, Optional
-import os
+from . import settings
+from .database import make_engine
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "../Scraper Build/services.db")
+DB_PATH = settings.DB_PATH
 
 class StandorteServices(SQLModel, table=True):
+    __table_args__ = (Index("ix_standorteservices_service_id", "service_id", "standort_id"),)
     standort_id: int = Field(foreign_key="standorte.id", primary_key=True)
     service_id: int = Field(foreign_key="service.id", primary_key=True)
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
 
 class Service(SQLModel, table=True):
+    __table_args__ = (Index("ix_service_service_name_id", "service_name", "id"),)
     id: int = Field(default=None, primary_key=True)
     service_name: str
     link: str
     can_be_done_online: bool = Field(default=False)
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
     standorte: List["Standorte"] = Relationship(back_populates="services", link_model=StandorteServices)
     formulars: Optional[List["Formular"]] = Relationship(back_populates="service")
 
 class Standorte(SQLModel, table=True):
+    __table_args__ = (Index("ix_standorte_name_id", "name", "id"),)
     id: int = Field(default=None, primary_key=True)
     name: str
     link: str
@@ -26,20 +34,31 @@ class Standorte(SQLModel, table=True):
     fax: Optional[str] = None
     email: Optional[str] = None
     homepage: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
     services: List[Service] = Relationship(back_populates="standorte", link_model=StandorteServices)
 
 class ServiceDetail(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
-    service_id: int = Field(foreign_key="service.id")
+    service_id: int = Field(foreign_key="service.id", index=True, unique=True)
     title: str
     description: Optional[str] 
+    description_clean: Optional[str] = None
+    sections: Optional[str] = None
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
 
 class Formular(SQLModel, table=True):
+    __table_args__ = (Index("ix_formular_title_id", "title", "id"),)
     id: int = Field(default=None, primary_key=True)
-    service_id: int = Field(foreign_key="service.id")
+    service_id: int = Field(foreign_key="service.id", index=True)
     service: Optional[Service] = Relationship(back_populates="formulars")
     title: str
     url: str
+    content_hash: Optional[str] = None
+    changed_at: Optional[float] = None
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -48,10 +67,11 @@ class User(SQLModel, table=True):
     disabled: bool = False
 
 
-engine = create_engine(f"sqlite:///{DB_PATH}")
+engine = make_engine("api")
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    # the API engine is read-only
+    SQLModel.metadata.create_all(make_engine("scraper"))
 
 def get_session():
     with Session(engine) as session:
@@ -0,0 +1,107 @@
+import argparse
+import json
+import re
+
+from bs4 import BeautifulSoup
+from sqlalchemy import text
+
+from . import dataset_version
+
+UNWANTED_PHRASES = [
+    "MAIN CONTENT",
+    "Bitte wählen Sie zuerst einen Standort aus.",
+    "Zu den verfügbaren Standorten",
+    "An diesem Standort einen Termin buchen",
+    "Download",
+    "Seite als PDF herunterladen",
+    "Chat",
+    "Stellen Sie unserem Chatbot Bobbi Ihre Fragen.",
+    "Stellen Sie unserem bot Bobbi Ihre Fragen.",
+    "Jetzt mit Bobbi in 11 Sprachen chatten",
+    "Für Sie zuständig",
+    "Bitte wählen Sie für eine Terminvereinbarung einen Standort aus"
+]
+
+FORM_RE = re.compile(r'<form[^>]*>.*?</form>', flags=re.DOTALL)
+SECTION_HEADINGS = ("h2",)
+
+
+def clean_description(description: str) -> str:
+    for phrase in UNWANTED_PHRASES:
+        description = description.replace(phrase, "")
+
+    description = FORM_RE.sub('', description)
+
+    return description.strip()
+
+
+def split_sections(description: str) -> list:
+    """Split cleaned description HTML into [{"heading": ..., "html": ...}].
+
+    A section starts at every top-level h2 and at every top-level block that contains one (the
+    portal wraps each section in a div.block); the heading is taken out of the section HTML.
+    Content before the first heading becomes a section with an empty heading.
+    """
+    soup = BeautifulSoup(description, "html.parser")
+    sections = []
+    heading, parts = "", []
+
+    def close_section():
+        html = "".join(parts).strip()
+        if heading or html:
+            sections.append({"heading": heading, "html": html})
+
+    for node in list(soup.contents):
+        name = getattr(node, "name", None)
+        if name in SECTION_HEADINGS:
+            close_section()
+            heading, parts = node.get_text(" ", strip=True), []
+            continue
+        nested_heading = node.find(SECTION_HEADINGS) if name else None
+        if nested_heading is not None:
+            close_section()
+            heading, parts = nested_heading.get_text(" ", strip=True), []
+            nested_heading.extract()
+        parts.append(str(node))
+    close_section()
+    return sections
+
+
+def normalize_description(description):
+    """Return (cleaned HTML, sections as JSON) for a raw scraped service description."""
+    cleaned = clean_description(description or "")
+    return cleaned, json.dumps(split_sections(cleaned), ensure_ascii=False)
+
+
+def normalize_service_details(engine, only_missing=True):
+    """Backfill the normalized columns of servicedetail; returns the number of rows updated."""
+    query = "SELECT id, description FROM servicedetail"
+    if only_missing:
+        query += " WHERE description_clean IS NULL OR sections IS NULL"
+    with engine.begin() as conn:
+        rows = conn.execute(text(query)).all()
+        updates = []
+        for detail_id, description in rows:
+            cleaned, sections = normalize_description(description)
+            updates.append({"id": detail_id, "description_clean": cleaned, "sections": sections})
+        if updates:
+            conn.execute(
+                text("UPDATE servicedetail SET description_clean = :description_clean, sections = :sections WHERE id = :id"),
+                updates,
+            )
+            dataset_version.bump(conn)
+    return len(updates)
+
+
+if __name__ == "__main__":
+    from .database import make_engine
+    from .migrations import migrate
+
+    engine = make_engine("scraper")
+
+    parser = argparse.ArgumentParser(description="Store normalized service descriptions and sections")
+    parser.add_argument("--all", action="store_true", help="recompute rows that are already normalized")
+    args = parser.parse_args()
+
+    migrate(engine)
+    print(f"Normalized {normalize_service_details(engine, only_missing=not args.all)} service descriptions.")
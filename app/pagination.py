@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException
+
+# column the "name" order sorts by, per model
+NAME_COLUMNS = {"service": "service_name", "standorte": "name", "formular": "title"}
+# change tracking columns; clients get them from /api/changes, not from the records themselves
+INTERNAL_COLUMNS = ("content_hash", "changed_at")
+
+
+@dataclass(frozen=True)
+class PageRequest:
+    """One page of a list endpoint: columns to return, keyset order, position and size."""
+
+    model: type
+    fields: tuple
+    order: str = "id"
+    after: Optional[tuple] = None
+    limit: Optional[int] = None
+
+    @property
+    def key_columns(self):
+        if self.order == "name":
+            return (NAME_COLUMNS[self.model.__tablename__], "id")
+        return ("id",)
+
+    def key(self, row):
+        return tuple(row[column] for column in self.key_columns)
+
+
+def columns_of(model):
+    return tuple(column for column in model.__table__.columns.keys() if column not in INTERNAL_COLUMNS)
+
+
+def public(record):
+    """The record as a dict without its internal columns."""
+    return record.model_dump(exclude=set(INTERNAL_COLUMNS))
+
+
+def parse_fields(model, fields):
+    available = columns_of(model)
+    if not fields:
+        return available
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in available]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}, available: {', '.join(available)}")
+    return requested
+
+
+def encode_cursor(order, key):
+    return base64.urlsafe_b64encode(json.dumps([order, *key], ensure_ascii=False).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, order):
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(value, list) or not value or value[0] != order:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this order")
+    return tuple(value[1:])
+
+
+def page_request(model, order="id", cursor=None, limit=None, fields=None):
+    after = decode_cursor(cursor, order) if cursor else None
+    page = PageRequest(model, parse_fields(model, fields), order, after, limit)
+    if after is not None and len(after) != len(page.key_columns):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page
+
+
+def paginate(request, headers, page, rows, total):
+    """Project `rows` (dicts with at least the requested and key columns) to the page's fields.
+
+    `rows` holds up to `limit + 1` rows; the extra row only tells that there is a next page, whose
+    cursor is added to `headers` in X-Next-Cursor and a Link header next to X-Total-Count. The Link
+    target is relative to the request, so the headers can be cached and served to any host name.
+    """
+    headers["X-Total-Count"] = str(total)
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        cursor = encode_cursor(page.order, page.key(rows[-1]))
+        headers["X-Next-Cursor"] = cursor
+        next_url = request.url.include_query_params(cursor=cursor)
+        headers["Link"] = f'<{next_url.path}?{next_url.query}>; rel="next"'
+    return [{field: row[field] for field in page.fields} for row in rows]
@@ -0,0 +1,128 @@
+import bisect
+import math
+import os
+import tempfile
+
+# upper bounds in seconds, from a cached page read to a slow remote request
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum; an observation is a bisect and two additions.
+
+    Counts are kept per bucket and only made cumulative when rendered, so histograms of several
+    processes can be merged by adding them up.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merge(self, other):
+        if other.bounds != self.bounds:
+            raise ValueError("Histograms with different buckets can not be merged")
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+
+    def cumulative(self):
+        """(upper bound, observations up to it) per bucket, the last one with bound +Inf."""
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def quantile(self, q):
+        """Estimate of the `q` quantile by linear interpolation within its bucket, as histogram_quantile() does."""
+        count = self.count
+        if not count:
+            return None
+        rank = q * count
+        lower = previous = 0
+        for bound, total in self.cumulative():
+            if total >= rank:
+                if math.isinf(bound):
+                    return self.bounds[-1] if self.bounds else None
+                return lower + (bound - lower) * (rank - previous) / max(total - previous, 1)
+            lower, previous = bound, total
+        return None
+
+    def to_dict(self):
+        quantiles = {f"p{round(q * 100)}": self.quantile(q) for q in (0.5, 0.95, 0.99)}
+        return {
+            "buckets": {_format_value(bound): total for bound, total in self.cumulative()},
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            **{name: round(value, 6) if value is not None else None for name, value in quantiles.items()},
+        }
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def histogram_samples(histogram, labels=None):
+    """Samples of a histogram family: cumulative _bucket per bound, _sum and _count."""
+    labels = labels or {}
+    samples = [("_bucket", {**labels, "le": _format_value(bound)}, total) for bound, total in histogram.cumulative()]
+    samples.append(("_sum", labels, histogram.sum))
+    samples.append(("_count", labels, histogram.count))
+    return samples
+
+
+def render(families):
+    """Prometheus text exposition (format 0.0.4) of (name, type, help, samples) families.
+
+    A sample is (suffix, labels, value), where the suffix is appended to the family name, e.g.
+    "_bucket" for histograms and "" for counters and gauges.
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, text):
+    """Replace `path` atomically, so the node_exporter textfile collector never reads a half-written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as textfile:
+            textfile.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,127 @@
+import argparse
+import re
+import sys
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+# SQLite's own catalog is read to check for optional tables, scanning it is expected
+ALWAYS_SCANNED = {"sqlite_master"}
+# `SCAN CONSTANT ROW` is the one-row source of an empty or constant IN list, not a table; plan
+# lines like `USE TEMP B-TREE FOR ORDER BY` or `SEARCH ...` do not start with SCAN
+SCAN_RE = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)(?!.*VIRTUAL TABLE)")
+
+
+def full_scan(*tables):
+    """Declare the tables a route reads in full on purpose (list routes), so `check` accepts their scans."""
+    def decorate(endpoint):
+        endpoint.full_scans = frozenset(tables)
+        return endpoint
+    return decorate
+
+
+class StatementRecorder:
+    """Collects (statement, parameters) of everything an engine runs between `start` and `stop`."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            self.statements.append((statement, parameters))
+
+    def start(self):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+
+    def stop(self):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return self.statements
+
+
+def explain(engine, statement, parameters):
+    """The detail lines of SQLite's EXPLAIN QUERY PLAN for one statement."""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+
+def full_scans(plan, allowed=frozenset()):
+    """Tables the plan reads in full, apart from `allowed` ones; FTS5 lookups and covering index searches pass."""
+    scanned = []
+    for line in plan:
+        match = SCAN_RE.match(line)
+        if match and match.group(1) not in allowed | ALWAYS_SCANNED:
+            scanned.append(match.group(1))
+    return scanned
+
+
+def endpoint_of(app, path):
+    for route in app.routes:
+        match, child_scope = route.matches({"type": "http", "path": path, "method": "GET"})
+        if match == Match.FULL:
+            return child_scope.get("endpoint")
+    return None
+
+
+def check(client, engine, url):
+    """Request `url` and return (plans, failures) for the statements it ran.
+
+    `plans` maps each statement to its plan lines; `failures` lists (statement, tables) for
+    statements that scan a table the route has not declared with `full_scan`.
+    """
+    endpoint = endpoint_of(client.app, url.split("?")[0])
+    allowed = getattr(endpoint, "full_scans", frozenset())
+    recorder = StatementRecorder(engine)
+    recorder.start()
+    try:
+        client.get(url)
+    finally:
+        statements = recorder.stop()
+
+    plans, failures = {}, []
+    for statement, parameters in statements:
+        plan = explain(engine, statement, parameters)
+        plans[statement] = plan
+        scanned = full_scans(plan, allowed)
+        if scanned:
+            failures.append((statement, scanned))
+    return plans, failures
+
+
+if __name__ == "__main__":
+    from fastapi.testclient import TestClient
+
+    from . import settings, templating
+    from .instrumentation import sample_urls
+    from .main import app
+    from .models import engine
+
+    parser = argparse.ArgumentParser(description="Run EXPLAIN QUERY PLAN for the statements of every read route and fail on full scans")
+    parser.add_argument("--verbose", action="store_true", help="print the plan of every statement")
+    args = parser.parse_args()
+
+    # the read model answers without SQL, the plans are only visible on the SQL path
+    settings.READ_MODEL = False
+    failures = 0
+    with TestClient(app) as client:
+        for url in sample_urls(engine):
+            templating.render_cache.clear()
+            plans, scans = check(client, engine, url)
+            if scans:
+                failures += 1
+                for statement, tables in scans:
+                    print(f"FAIL  {url}: full scan of {', '.join(tables)} in {' '.join(statement.split())}")
+            else:
+                print(f"ok    {url}: {len(plans)} statements")
+            if args.verbose:
+                for statement, plan in plans.items():
+                    print(f"      {' '.join(statement.split())}")
+                    for line in plan:
+                        print(f"        {line}")
+    sys.exit(1 if failures else 0)
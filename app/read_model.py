@@ -0,0 +1,209 @@
+import bisect
+import string
+import threading
+import time
+from collections import defaultdict
+
+from sqlmodel import Session, select
+
+from . import bundles, dataset_version
+from .bitmaps import LinkBitmaps
+from .spatial import GridIndex
+from .suggest import SuggestIndex
+from .pagination import NAME_COLUMNS
+from .models import Formular, Service, ServiceDetail, Standorte, StandorteServices
+
+
+# SQLite's LIKE only folds the case of ASCII letters, "Ä" and "ä" stay different
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _search_keys(rows, column):
+    return {row.id: (getattr(row, column) or "").translate(ASCII_LOWER) for row in rows}
+
+
+def _matcher(keys, search):
+    # same result as the LIKE '%search%' of the SQL repository
+    search = search.translate(ASCII_LOWER)
+    return lambda row: search in keys[row.id]
+
+
+class ReadModel:
+    """Immutable in-memory snapshot of the dataset with the same read methods as SqlRepository.
+
+    All rows are loaded once, together with the dataset version they belong to, and indexed by id,
+    by service_id and in both directions of the Standort/service link table, which is also kept as
+    LinkBitmaps for the `offers` filter and the facet counts. Service names, Formular titles and
+    Standort names are indexed for `suggest`. The records are detached model instances and must
+    not be modified; a reload builds a new ReadModel instead of changing this one.
+    """
+
+    def __init__(self, services, details, formulare, standorte, links, version=None):
+        self.loaded_at = time.time()
+        self.version = version
+        self._services = {service.id: service for service in sorted(services, key=lambda row: row.id)}
+        self._service_list = tuple(self._services.values())
+        self._details = {detail.service_id: detail for detail in details}
+        self._formulare = {formular.id: formular for formular in sorted(formulare, key=lambda row: row.id)}
+        self._formular_list = tuple(self._formulare.values())
+        self._standorte = {standort.id: standort for standort in sorted(standorte, key=lambda row: row.id)}
+        self._standort_list = tuple(self._standorte.values())
+        # per model: rows in id and in name order, and the lower-cased name used by `search`
+        self._ordered = {}
+        self._search_keys = {}
+        for model, rows in ((Service, self._service_list), (Formular, self._formular_list), (Standorte, self._standort_list)):
+            name = NAME_COLUMNS[model.__tablename__]
+            by_name = tuple(sorted(rows, key=lambda row: (getattr(row, name), row.id)))
+            self._ordered[model] = {"id": rows, "name": by_name}
+            self._search_keys[model] = _search_keys(rows, name)
+
+        formulare_by_service = defaultdict(list)
+        for formular in self._formular_list:
+            formulare_by_service[formular.service_id].append(formular)
+        standorte_by_service = defaultdict(list)
+        services_by_standort = defaultdict(list)
+        known_links = []
+        for standort_id, service_id in sorted(links):
+            if standort_id in self._standorte and service_id in self._services:
+                standorte_by_service[service_id].append(self._standorte[standort_id])
+                services_by_standort[standort_id].append(self._services[service_id])
+                known_links.append((standort_id, service_id))
+        self._formulare_by_service = {key: tuple(value) for key, value in formulare_by_service.items()}
+        self._standorte_by_service = {key: tuple(value) for key, value in standorte_by_service.items()}
+        self._services_by_standort = {key: tuple(value) for key, value in services_by_standort.items()}
+        self._link_bitmaps = LinkBitmaps.build(known_links, {service.id: service.can_be_done_online for service in self._service_list})
+        self._suggest_index = SuggestIndex(
+            [("service", service.id, service.id, service.service_name) for service in self._service_list]
+            + [("formular", formular.id, formular.service_id, formular.title) for formular in self._formular_list]
+            + [("standort", standort.id, None, standort.name) for standort in self._standort_list]
+        )
+        self._standort_index = GridIndex(
+            (standort.id, standort.lat, standort.lon)
+            for standort in self._standort_list
+            if standort.lat is not None and standort.lon is not None
+        )
+
+    @classmethod
+    def load(cls, engine):
+        with Session(engine) as session:
+            links = session.exec(select(StandorteServices.standort_id, StandorteServices.service_id)).all()
+            return cls(
+                session.exec(select(Service)).all(),
+                session.exec(select(ServiceDetail)).all(),
+                session.exec(select(Formular)).all(),
+                session.exec(select(Standorte)).all(),
+                [tuple(link) for link in links],
+                dataset_version.read(session.connection()),
+            )
+
+    def counts(self):
+        return {
+            "services": len(self._service_list),
+            "service_details": len(self._details),
+            "formulare": len(self._formular_list),
+            "standorte": len(self._standort_list),
+            "links": sum(len(services) for services in self._services_by_standort.values()),
+        }
+
+    def _filter(self, rows, model, search):
+        if search:
+            return list(filter(_matcher(self._search_keys[model], search), rows))
+        return list(rows)
+
+    def _page(self, page, search="", predicate=None):
+        rows = self._filter(self._ordered[page.model][page.order], page.model, search)
+        if predicate is not None:
+            rows = [row for row in rows if predicate(row)]
+        total = len(rows)
+        if page.after is not None:
+            key_columns = page.key_columns
+            start = bisect.bisect_right(rows, page.after, key=lambda row: tuple(getattr(row, column) for column in key_columns))
+            rows = rows[start:]
+        if page.limit is not None:
+            rows = rows[:page.limit + 1]
+        columns = tuple(dict.fromkeys(page.fields + page.key_columns))
+        return [{column: getattr(row, column) for column in columns} for row in rows], total
+
+    def services(self, search="", can_be_done_online=None):
+        services = self._filter(self._service_list, Service, search)
+        if can_be_done_online is not None:
+            services = [service for service in services if service.can_be_done_online == can_be_done_online]
+        return services
+
+    def services_page(self, page, search="", can_be_done_online=None):
+        predicate = None
+        if can_be_done_online is not None:
+            predicate = lambda service: service.can_be_done_online == can_be_done_online
+        return self._page(page, search, predicate)
+
+    def service(self, service_id):
+        return self._services.get(service_id)
+
+    def service_detail(self, service_id):
+        return self._details.get(service_id)
+
+    def formulare_of_service(self, service_id):
+        return list(self._formulare_by_service.get(service_id, ()))
+
+    def standorte_of_service(self, service_id):
+        return list(self._standorte_by_service.get(service_id, ()))
+
+    def service_bundles(self, service_ids, include=()):
+        services = [self._services[service_id] for service_id in service_ids if service_id in self._services]
+        return bundles.assemble(services, self._details, self._formulare_by_service, self._standorte_by_service, include)
+
+    def standorte(self, search=""):
+        return self._filter(self._standort_list, Standorte, search)
+
+    def standorte_page(self, page, search="", offers=None):
+        predicate = None
+        if offers is not None:
+            offering = set(self._link_bitmaps.offering(*offers))
+            predicate = lambda standort: standort.id in offering
+        return self._page(page, search, predicate)
+
+    def standort_facets(self, offers=None):
+        return self._link_bitmaps.facets(self._link_bitmaps.offering(*offers) if offers is not None else None)
+
+    def nearest_standorte(self, lat, lon, k=5, service_id=None):
+        accept = None
+        if service_id is not None:
+            offering = {standort.id for standort in self._standorte_by_service.get(service_id, ())}
+            accept = offering.__contains__
+        return [(self._standorte[standort_id], distance) for standort_id, distance in self._standort_index.nearest(lat, lon, k, accept)]
+
+    def suggest(self, query, limit=10, kinds=None):
+        return self._suggest_index.suggest(query, limit, kinds)
+
+    def standort(self, standort_id):
+        return self._standorte.get(standort_id)
+
+    def services_of_standort(self, standort_id):
+        return list(self._services_by_standort.get(standort_id, ()))
+
+    def formulare(self, search=""):
+        return self._filter(self._formular_list, Formular, search)
+
+    def formulare_page(self, page, search=""):
+        return self._page(page, search)
+
+    def formular(self, formular_id):
+        return self._formulare.get(formular_id)
+
+
+_current = None
+_reload_lock = threading.Lock()
+
+
+def current():
+    """The read model requests are served from, or None when the app reads from the database."""
+    return _current
+
+
+def reload(engine):
+    """Load a new snapshot and swap it in; requests in flight keep the snapshot they started with."""
+    global _current
+    with _reload_lock:
+        model = ReadModel.load(engine)
+        _current = model
+    return model
@@ -0,0 +1,213 @@
+from collections import defaultdict
+
+from sqlalchemy import func, literal, null, tuple_, union_all
+from sqlmodel import Session, select
+
+from . import bundles, caching, read_model
+from .bitmaps import link_bitmaps
+from .spatial import GridIndex
+from .suggest import SuggestIndex
+from .db_executor import run_db
+from .models import Formular, Service, ServiceDetail, Standorte, StandorteServices, engine
+
+# in-memory indexes over the database, rebuilt once per dataset version
+standort_index = caching.IndexCache(GridIndex)
+suggest_index = caching.IndexCache(SuggestIndex)
+
+
+class SqlRepository:
+    """Read access to the dataset through short sessions, one per call.
+
+    A connection is only checked out while a call runs on the DB executor and never while the
+    request waits for its next call, so concurrent requests cannot exhaust the pool.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _all(self, query):
+        with Session(self.engine) as session:
+            return session.exec(query).all()
+
+    def _first(self, query):
+        with Session(self.engine) as session:
+            return session.exec(query).first()
+
+    def _get(self, model, key):
+        with Session(self.engine) as session:
+            return session.get(model, key)
+
+    def _page(self, page, conditions):
+        """Select only the requested and keyset columns of one page, plus one row to detect the next page."""
+        model = page.model
+        names = tuple(dict.fromkeys(page.fields + page.key_columns))
+        key = [getattr(model, column) for column in page.key_columns]
+        query = select(*(getattr(model, column) for column in names)).where(*conditions).order_by(*key)
+        if page.after is not None:
+            query = query.where(tuple_(*key) > tuple_(*page.after))
+        if page.limit is not None:
+            query = query.limit(page.limit + 1)
+        with self.engine.connect() as conn:
+            total = conn.execute(select(func.count()).select_from(model).where(*conditions)).scalar_one()
+            return [dict(zip(names, row)) for row in conn.execute(query).all()], total
+
+    def _service_conditions(self, search, can_be_done_online):
+        conditions = []
+        if search:
+            conditions.append(Service.service_name.contains(search))
+        if can_be_done_online is not None:
+            conditions.append(Service.can_be_done_online == can_be_done_online)
+        return conditions
+
+    def services(self, search="", can_be_done_online=None):
+        return self._all(select(Service).where(*self._service_conditions(search, can_be_done_online)))
+
+    def services_page(self, page, search="", can_be_done_online=None):
+        return self._page(page, self._service_conditions(search, can_be_done_online))
+
+    def service(self, service_id):
+        return self._get(Service, service_id)
+
+    def service_detail(self, service_id):
+        return self._first(select(ServiceDetail).where(ServiceDetail.service_id == service_id))
+
+    def formulare_of_service(self, service_id):
+        return self._all(select(Formular).where(Formular.service_id == service_id))
+
+    def standorte_of_service(self, service_id):
+        return self._all(
+            select(Standorte)
+            .join(StandorteServices, StandorteServices.standort_id == Standorte.id)
+            .where(StandorteServices.service_id == service_id)
+            .order_by(Standorte.id)
+        )
+
+    def service_bundles(self, service_ids, include=()):
+        """Services in the order of `service_ids` with their related records, in at most three statements.
+
+        Details come from a LEFT JOIN with the services, Formulare and Standorte from one IN query
+        each, however many ids are requested.
+        """
+        with Session(self.engine) as session:
+            if "detail" in include:
+                rows = session.exec(
+                    select(Service, ServiceDetail)
+                    .outerjoin(ServiceDetail, ServiceDetail.service_id == Service.id)
+                    .where(Service.id.in_(service_ids))
+                ).all()
+                found = {service.id: service for service, _ in rows}
+                details = {service.id: detail for service, detail in rows if detail is not None}
+            else:
+                found = {service.id: service for service in session.exec(select(Service).where(Service.id.in_(service_ids))).all()}
+                details = {}
+            services = [found[service_id] for service_id in service_ids if service_id in found]
+            formulare = defaultdict(list)
+            if "formulare" in include and found:
+                for formular in session.exec(select(Formular).where(Formular.service_id.in_(found)).order_by(Formular.id)).all():
+                    formulare[formular.service_id].append(formular)
+            standorte = defaultdict(list)
+            if "standorte" in include and found:
+                rows = session.exec(
+                    select(StandorteServices.service_id, Standorte)
+                    .join(Standorte, Standorte.id == StandorteServices.standort_id)
+                    .where(StandorteServices.service_id.in_(found))
+                    .order_by(Standorte.id)
+                ).all()
+                for service_id, standort in rows:
+                    standorte[service_id].append(standort)
+            return bundles.assemble(services, details, formulare, standorte, include)
+
+    def standorte(self, search=""):
+        query = select(Standorte)
+        if search:
+            query = query.where(Standorte.name.contains(search))
+        return self._all(query)
+
+    def _link_bitmaps(self):
+        return link_bitmaps.get(caching.versions.get(), self.engine)
+
+    def standorte_page(self, page, search="", offers=None):
+        conditions = [Standorte.name.contains(search)] if search else []
+        if offers is not None:
+            conditions.append(Standorte.id.in_(self._link_bitmaps().offering(*offers)))
+        return self._page(page, conditions)
+
+    def standort_facets(self, offers=None):
+        bitmaps = self._link_bitmaps()
+        return bitmaps.facets(bitmaps.offering(*offers) if offers is not None else None)
+
+    def _standort_points(self):
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(Standorte.id, Standorte.lat, Standorte.lon)
+                .where(Standorte.lat.is_not(None), Standorte.lon.is_not(None))
+            ).all()
+
+    def nearest_standorte(self, lat, lon, k=5, service_id=None):
+        """The `k` nearest Standorte (offering `service_id`) as (Standort, distance in metres).
+
+        The grid index of all coordinates is built once per dataset version; a query then only
+        reads the Standorte offering the service and the rows of the ones it returns.
+        """
+        index = standort_index.get(caching.versions.get(), self._standort_points)
+        accept = None
+        if service_id is not None:
+            with self.engine.connect() as conn:
+                offering = set(conn.execute(
+                    select(StandorteServices.standort_id).where(StandorteServices.service_id == service_id)
+                ).scalars())
+            accept = offering.__contains__
+        found = index.nearest(lat, lon, k, accept)
+        if not found:
+            return []
+        rows = {standort.id: standort for standort in self._all(select(Standorte).where(Standorte.id.in_([standort_id for standort_id, _ in found])))}
+        return [(rows[standort_id], distance) for standort_id, distance in found if standort_id in rows]
+
+    def _suggest_entries(self):
+        with self.engine.connect() as conn:
+            return conn.execute(union_all(
+                select(literal("service"), Service.id, Service.id, Service.service_name),
+                select(literal("formular"), Formular.id, Formular.service_id, Formular.title),
+                select(literal("standort"), Standorte.id, null(), Standorte.name),
+            )).all()
+
+    def suggest(self, query, limit=10, kinds=None):
+        return suggest_index.get(caching.versions.get(), self._suggest_entries).suggest(query, limit, kinds)
+
+    def standort(self, standort_id):
+        return self._get(Standorte, standort_id)
+
+    def services_of_standort(self, standort_id):
+        return self._all(
+            select(Service)
+            .join(StandorteServices, StandorteServices.service_id == Service.id)
+            .where(StandorteServices.standort_id == standort_id)
+            .order_by(Service.id)
+        )
+
+    def formulare(self, search=""):
+        query = select(Formular)
+        if search:
+            query = query.where(Formular.title.contains(search))
+        return self._all(query)
+
+    def formulare_page(self, page, search=""):
+        return self._page(page, [Formular.title.contains(search)] if search else [])
+
+    def formular(self, formular_id):
+        return self._get(Formular, formular_id)
+
+
+async def get_repository():
+    """FastAPI dependency: the loaded read model if there is one, otherwise a SQL repository."""
+    model = read_model.current()
+    if model is not None:
+        return model
+    return SqlRepository(engine)
+
+
+async def call(method, *args):
+    """Call a repository method from an async route: read model lookups inline, SQL on the DB executor."""
+    if isinstance(method.__self__, read_model.ReadModel):
+        return method(*args)
+    return await run_db(method, *args)
@@ -0,0 +1,36 @@
+import orjson
+from fastapi import Response
+
+from . import caching
+from .pagination import paginate
+from .templating import render_cache
+
+MEDIA_TYPE = "application/json"
+
+
+def json_response(content, headers=None):
+    """Serialize plain dicts and lists with orjson, skipping FastAPI's jsonable_encoder and response validation."""
+    return Response(orjson.dumps(content), media_type=MEDIA_TYPE, headers=headers)
+
+
+async def page_response(request, page, load, cacheable=True):
+    """One page of a list route as JSON, with its pagination headers.
+
+    `load()` is awaited for the (rows, total) of the page. Pages of unfiltered lists (`cacheable`)
+    are kept as serialized bytes together with their headers for the current dataset version, so
+    a repeated request neither reads nor serializes any row.
+    """
+    version = await caching.current_version() if cacheable else None
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    if version is not None:
+        cached = render_cache.get(version, key)
+        if cached is not None:
+            body, headers = cached
+            return Response(body, media_type=MEDIA_TYPE, headers=headers)
+
+    rows, total = await load()
+    headers = {}
+    body = orjson.dumps(paginate(request, headers, page, rows, total))
+    if version is not None:
+        render_cache.put(version, key, (body, headers), size=len(body))
+    return Response(body, media_type=MEDIA_TYPE, headers=headers)
@@ -0,0 +1,92 @@
+from typing import List, Optional
+
+from sqlmodel import SQLModel
+
+# Response shapes of the JSON routes. The routes serialize plain dicts themselves (see
+# responses.py), so these only document the responses in OpenAPI; with `fields=` a list row only
+# carries the requested keys.
+
+
+class ServiceOut(SQLModel):
+    id: int
+    service_name: str
+    link: str
+    can_be_done_online: bool
+
+
+class StandortOut(SQLModel):
+    id: int
+    name: str
+    link: str
+    address: Optional[str] = None
+    phone: Optional[str] = None
+    fax: Optional[str] = None
+    email: Optional[str] = None
+    homepage: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+class NearestStandort(StandortOut):
+    distance_m: float
+
+
+class StandortFacets(SQLModel):
+    standort_id: int
+    services: int
+    online: int
+    offline: int
+
+
+class FormularOut(SQLModel):
+    id: int
+    service_id: int
+    title: str
+    url: str
+
+
+class Section(SQLModel):
+    heading: str
+    html: str
+
+
+class ServiceDetailOut(SQLModel):
+    id: int
+    service_id: int
+    title: str
+    description: Optional[str] = None
+    description_clean: Optional[str] = None
+    sections: Optional[List[Section]] = None
+
+
+class ServiceBundle(ServiceOut):
+    detail: Optional[ServiceDetailOut] = None
+    formulare: Optional[List[FormularOut]] = None
+    standorte: Optional[List[StandortOut]] = None
+
+
+class SearchHit(SQLModel):
+    kind: str
+    id: int
+    service_id: Optional[int] = None
+    title: str
+    snippet: str
+    score: float
+
+
+class Change(SQLModel):
+    cursor: int
+    entity: str
+    id: int
+    related_id: Optional[int] = None
+    op: str
+    content_hash: Optional[str] = None
+    changed_at: float
+
+
+class Suggestion(SQLModel):
+    kind: str
+    id: int
+    service_id: Optional[int] = None
+    title: str
+    edits: int
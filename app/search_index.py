@@ -0,0 +1,216 @@
+import argparse
+import html
+import re
+
+from sqlalchemy import text
+
+TABLE = "search_index"
+# the original text of the indexed rows; the FTS table indexes its folded text, and snippet() reads and
+# highlights the original, which folding leaves with the same tokens
+DOCUMENTS = "search_document"
+FOLDING = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss", "Ä": "Ae", "Ö": "Oe", "Ü": "Ue", "ẞ": "SS"})
+TAG_RE = re.compile(r"<[^>]+>")
+SPACE_RE = re.compile(r"\s+")
+WORD_RE = re.compile(r"\w+")
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {DOCUMENTS} (
+        id INTEGER PRIMARY KEY,
+        kind VARCHAR NOT NULL,
+        ref_id INTEGER NOT NULL,
+        service_id INTEGER,
+        label VARCHAR,
+        title VARCHAR,
+        body VARCHAR
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{DOCUMENTS}_kind_ref_id ON {DOCUMENTS} (kind, ref_id)",
+    f"CREATE INDEX IF NOT EXISTS ix_{DOCUMENTS}_kind_service_id ON {DOCUMENTS} (kind, service_id)",
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        kind UNINDEXED,
+        ref_id UNINDEXED,
+        service_id UNINDEXED,
+        label UNINDEXED,
+        title,
+        body,
+        content = '{DOCUMENTS}',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+]
+
+# (kind, ref_id, service_id, label, title, body) per indexed row; `ids` restricts a query to some rows
+DOCUMENT_QUERIES = {
+    "service": """
+        SELECT 'service', s.id, s.id, s.service_name, s.service_name,
+               COALESCE(d.title, '') || ' ' || COALESCE(d.description_clean, d.description, '')
+        FROM service s LEFT JOIN servicedetail d ON d.service_id = s.id
+        {where}
+    """,
+    "formular": """
+        SELECT 'formular', f.id, f.service_id, f.title, f.title, COALESCE(s.service_name, '')
+        FROM formular f LEFT JOIN service s ON s.id = f.service_id
+        {where}
+    """,
+    "standort": """
+        SELECT 'standort', st.id, NULL, st.name, st.name, COALESCE(st.address, '')
+        FROM standorte st
+        {where}
+    """,
+}
+# column of each document query that `ids` refers to
+ID_COLUMNS = {"service": "s.id", "formular": "f.service_id", "standort": "st.id"}
+INDEX_ID_COLUMNS = {"service": "ref_id", "formular": "service_id", "standort": "ref_id"}
+
+
+def fold(value):
+    """German-friendly folding applied to indexed text and to queries alike: ä→ae, ö→oe, ü→ue, ß→ss.
+
+    Every folded letter stays a letter, so the folded text splits into the same tokens as the original.
+    """
+    return value.translate(FOLDING)
+
+
+def html_to_text(value):
+    return SPACE_RE.sub(" ", html.unescape(TAG_RE.sub(" ", value or ""))).strip()
+
+
+def exists(conn):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": TABLE}
+    ).first() is not None
+
+
+def create(conn):
+    for statement in CREATE_SQL:
+        conn.exec_driver_sql(statement)
+
+
+def drop(conn):
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {TABLE}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {DOCUMENTS}")
+
+
+def _insert_documents(conn, kind, ids=None):
+    where = ""
+    params = {}
+    if ids is not None:
+        where = f"WHERE {ID_COLUMNS[kind]} IN ({', '.join(f':id{i}' for i in range(len(ids)))})"
+        params = {f"id{i}": value for i, value in enumerate(ids)}
+    rows = conn.execute(text(DOCUMENT_QUERIES[kind].format(where=where)), params).all()
+    first_id = conn.execute(text(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {DOCUMENTS}")).scalar_one()
+    documents = [
+        {"id": first_id + i, "kind": kind, "ref_id": ref_id, "service_id": service_id, "label": label,
+         "title": title or "", "body": html_to_text(body)}
+        for i, (kind, ref_id, service_id, label, title, body) in enumerate(rows)
+    ]
+    if documents:
+        conn.execute(
+            text(f"INSERT INTO {DOCUMENTS} (id, kind, ref_id, service_id, label, title, body) "
+                 "VALUES (:id, :kind, :ref_id, :service_id, :label, :title, :body)"),
+            documents,
+        )
+        conn.execute(
+            text(f"INSERT INTO {TABLE} (rowid, title, body) VALUES (:id, :title, :body)"),
+            [{"id": document["id"], "title": fold(document["title"]), "body": fold(document["body"])}
+             for document in documents],
+        )
+    return len(documents)
+
+
+def reindex(conn, kind, ids):
+    """Refresh the documents of `kind` for the given ids (service ids for Formulare) inside the caller's transaction."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ", ".join(f":id{i}" for i in range(len(chunk)))
+        params = {"kind": kind, **{f"id{i}": value for i, value in enumerate(chunk)}}
+        stale = conn.execute(
+            text(f"SELECT id, title, body FROM {DOCUMENTS} "
+                 f"WHERE kind = :kind AND {INDEX_ID_COLUMNS[kind]} IN ({placeholders})"),
+            params,
+        ).all()
+        if stale:
+            # an external content index forgets a row only when given the text it indexed for it
+            conn.execute(
+                text(f"INSERT INTO {TABLE} ({TABLE}, rowid, title, body) VALUES ('delete', :id, :title, :body)"),
+                [{"id": id, "title": fold(title), "body": fold(body)} for id, title, body in stale],
+            )
+            conn.execute(
+                text(f"DELETE FROM {DOCUMENTS} WHERE kind = :kind AND {INDEX_ID_COLUMNS[kind]} IN ({placeholders})"),
+                params,
+            )
+        _insert_documents(conn, kind, chunk)
+    return len(ids)
+
+
+def rebuild(conn):
+    drop(conn)
+    create(conn)
+    counts = {kind: _insert_documents(conn, kind) for kind in DOCUMENT_QUERIES}
+    conn.exec_driver_sql(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every folded word must match, as a prefix."""
+    words = WORD_RE.findall(fold(query))
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(conn, query, kinds=None, limit=20):
+    expression = match_expression(query)
+    if not expression:
+        return []
+    kind_filter = ""
+    params = {"expression": expression, "limit": limit}
+    if kinds:
+        kind_filter = f"AND kind IN ({', '.join(f':kind{i}' for i in range(len(kinds)))})"
+        params.update({f"kind{i}": kind for i, kind in enumerate(kinds)})
+    rows = conn.execute(
+        text(f"""
+            SELECT kind, ref_id, service_id, label,
+                   snippet({TABLE}, 5, '<mark>', '</mark>', '…', 12) AS snippet,
+                   bm25({TABLE}, 0, 0, 0, 0, 10.0, 1.0) AS score
+            FROM {TABLE}
+            WHERE {TABLE} MATCH :expression {kind_filter}
+            ORDER BY score
+            LIMIT :limit
+        """),
+        params,
+    ).all()
+    return [
+        {"kind": kind, "id": ref_id, "service_id": service_id, "title": label, "snippet": snippet, "score": -score}
+        for kind, ref_id, service_id, label, snippet, score in rows
+    ]
+
+
+if __name__ == "__main__":
+    from .database import make_engine
+    from .migrations import migrate
+
+    engine = make_engine("scraper")
+
+    parser = argparse.ArgumentParser(description="Manage the full-text search index")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("rebuild", help="rebuild the index from the services, Formulare and Standorte tables")
+    query_parser = subcommands.add_parser("query", help="run a search against the index")
+    query_parser.add_argument("q")
+    query_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        migrate(engine)
+        with engine.begin() as conn:
+            counts = rebuild(conn)
+        print("Indexed " + ", ".join(f"{count} {kind} documents" for kind, count in counts.items()) + ".")
+    else:
+        with engine.connect() as conn:
+            for hit in search(conn, args.q, limit=args.limit):
+                print(f"{hit['score']:7.2f}  {hit['kind']:<9} {hit['id']:<8} {hit['title']}  | {hit['snippet']}")
@@ -0,0 +1,74 @@
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _read_settings_file(path):
+    """KEY=VALUE lines; blank lines and lines starting with # are ignored."""
+    values = {}
+    if not path or not os.path.exists(path):
+        return values
+    with open(path, encoding="utf-8") as settings_file:
+        for line in settings_file:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+# environment variables win over the settings file
+_file = _read_settings_file(os.environ.get("SERVICES_SETTINGS_FILE", os.path.join(REPO_ROOT, "services.env")))
+
+
+def _env(name, default=None):
+    return os.environ.get(name, _file.get(name, default))
+
+
+def _flag(name, default=False):
+    value = _env(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# serve all read endpoints from an in-memory copy of the dataset loaded at startup
+READ_MODEL = _flag("SERVICES_READ_MODEL")
+# shared secret for POST /api/read-model/reload; the endpoint is disabled while unset
+RELOAD_TOKEN = _env("SERVICES_RELOAD_TOKEN")
+# seconds the dataset version read from the database is reused for ETags before it is checked again
+VERSION_TTL = float(_env("SERVICES_VERSION_TTL", "2"))
+# Cache-Control per route family (see app/caching.py)
+CACHE_CONTROL = {
+    "api": _env("SERVICES_CACHE_CONTROL_API", "public, max-age=60, stale-while-revalidate=300"),
+    "pages": _env("SERVICES_CACHE_CONTROL_PAGES", "public, max-age=0, must-revalidate"),
+}
+# upper bound for the `limit` parameter of the list APIs
+MAX_PAGE_SIZE = int(_env("SERVICES_MAX_PAGE_SIZE", "1000"))
+# memory budget of the rendered page cache (see app/templating.py)
+RENDER_CACHE_BYTES = int(float(_env("SERVICES_RENDER_CACHE_MB", "32")) * 1024 * 1024)
+# return per-request query counts and timings in X-Query-* and Server-Timing headers
+QUERY_HEADERS = _flag("SERVICES_QUERY_HEADERS")
+# per-route request, latency, DB and render metrics served at /metrics (see app/metrics.py)
+METRICS = _flag("SERVICES_METRICS", True)
+# threads of the executor that runs blocking database work for the async routes
+DB_WORKERS = int(_env("SERVICES_DB_WORKERS", "8"))
+
+# database shared by the scraper and the API (see app/database.py for the connection profiles)
+DB_PATH = os.path.abspath(_env("SERVICES_DB_PATH", os.path.join(REPO_ROOT, "Scraper Build", "services.db")))
+# open the API connections with immutable=1: only for a database file that is never written while served
+DB_IMMUTABLE = _flag("SERVICES_DB_IMMUTABLE")
+# per-connection PRAGMAs of both profiles
+DB_MMAP_BYTES = int(float(_env("SERVICES_DB_MMAP_MB", "256")) * 1024 * 1024)
+DB_CACHE_KIB = int(_env("SERVICES_DB_CACHE_KIB", "65536"))
+DB_BUSY_TIMEOUT = float(_env("SERVICES_DB_BUSY_TIMEOUT", "30"))
+
+# geocoder used at ingest: gazetteer (offline CSV of address,lat,lon rows), nominatim or none
+GEOCODER = _env("SERVICES_GEOCODER", "gazetteer")
+GAZETTEER_PATH = os.path.abspath(_env("SERVICES_GAZETTEER", os.path.join(REPO_ROOT, "Scraper Build", "gazetteer.csv")))
+GEOCODE_CACHE_PATH = os.path.abspath(_env("SERVICES_GEOCODE_CACHE", os.path.join(REPO_ROOT, "Scraper Build", "geocode_cache.sqlite")))
+NOMINATIM_URL = _env("SERVICES_NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+NOMINATIM_USER_AGENT = _env("SERVICES_NOMINATIM_USER_AGENT", "berlin-services-api")
+# largest k of the nearest-Standort query
+MAX_NEAREST = int(_env("SERVICES_MAX_NEAREST", "50"))
@@ -0,0 +1,101 @@
+import heapq
+import math
+from collections import defaultdict
+
+EARTH_RADIUS_M = 6371008.8
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON = 111.320
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    """Uniform grid over (id, lat, lon) points for k-nearest-neighbour queries.
+
+    Points are projected onto a local plane around their mean latitude (accurate to well below a
+    percent over a city) and bucketed into square cells of `cell_km`. A query walks rings of cells
+    outwards from the query cell and stops once no unvisited cell can hold a point closer than the
+    k-th best one found, so it only touches the cells around the answer.
+    """
+
+    def __init__(self, points, cell_km=1.0):
+        self.cell_km = cell_km
+        self._points = {point_id: (lat, lon) for point_id, lat, lon in points}
+        lats = [lat for lat, _ in self._points.values()]
+        self._lon_scale = KM_PER_DEGREE_LON * math.cos(math.radians(sum(lats) / len(lats))) if lats else KM_PER_DEGREE_LON
+        self._cells = defaultdict(list)
+        for point_id, (lat, lon) in self._points.items():
+            x, y = self._project(lat, lon)
+            self._cells[self._cell(x, y)].append((point_id, x, y))
+        if self._cells:
+            columns = [cell[0] for cell in self._cells]
+            rows = [cell[1] for cell in self._cells]
+            self._bounds = (min(columns), max(columns), min(rows), max(rows))
+
+    def __len__(self):
+        return len(self._points)
+
+    def _project(self, lat, lon):
+        return lon * self._lon_scale, lat * KM_PER_DEGREE_LAT
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_km), math.floor(y / self.cell_km)
+
+    def _ring(self, cx, cy, radius):
+        if radius == 0:
+            yield cx, cy
+            return
+        for dx in range(-radius, radius + 1):
+            yield cx + dx, cy - radius
+            yield cx + dx, cy + radius
+        for dy in range(-radius + 1, radius):
+            yield cx - radius, cy + dy
+            yield cx + radius, cy + dy
+
+    def _max_radius(self, cx, cy):
+        min_x, max_x, min_y, max_y = self._bounds
+        return max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+
+    def nearest(self, lat, lon, k=5, accept=None):
+        """The `k` nearest points as (id, distance in metres), closest first.
+
+        `accept(id)` restricts the search to some points, e.g. the Standorte offering a service.
+        """
+        if not self._cells or k <= 0:
+            return []
+        x, y = self._project(lat, lon)
+        cx, cy = self._cell(x, y)
+        max_radius = self._max_radius(cx, cy)
+        if max_radius ** 2 > 4 * len(self._cells):
+            # far outside the covered area the rings would mostly visit empty cells
+            return self._scan(lat, lon, x, y, k, accept)
+        best = []  # max-heap of (-squared plane distance, id)
+        for radius in range(max_radius + 1):
+            # every point in this ring or beyond is at least (radius - 1) cells away
+            if len(best) == k and ((radius - 1) * self.cell_km) ** 2 > -best[0][0]:
+                break
+            for cell in self._ring(cx, cy, radius):
+                for point_id, px, py in self._cells.get(cell, ()):
+                    if accept is not None and not accept(point_id):
+                        continue
+                    distance = (px - x) ** 2 + (py - y) ** 2
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, point_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, point_id))
+        found = sorted((-distance, point_id) for distance, point_id in best)
+        return [(point_id, haversine_m(lat, lon, *self._points[point_id])) for _, point_id in found]
+
+    def _scan(self, lat, lon, x, y, k, accept):
+        candidates = (
+            ((px - x) ** 2 + (py - y) ** 2, point_id)
+            for cell in self._cells.values()
+            for point_id, px, py in cell
+            if accept is None or accept(point_id)
+        )
+        return [(point_id, haversine_m(lat, lon, *self._points[point_id])) for _, point_id in heapq.nsmallest(k, candidates)]
+
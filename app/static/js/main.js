@@ -71,21 +71,18 @@ document.addEventListener('DOMContentLoaded', function () {
         const mapElement = document.getElementById('map' + standortId);
         if (mapElement) {
             const address = mapElement.getAttribute('data-address');
+            // coordinates geocoded at ingest; only Standorte without them are looked up here
+            if (mapElement.hasAttribute('data-lat')) {
+                showMap(mapElement, mapElement.getAttribute('data-lat'), mapElement.getAttribute('data-lon'), address);
+                return;
+            }
             const url = `https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(address)}`;
 
             fetch(url)
                 .then(response => response.json())
                 .then(data => {
                     if (data.length > 0) {
-                        const lat = data[0].lat;
-                        const lon = data[0].lon;
-
-                        const map = L.map(mapElement).setView([lat, lon], 15);
-                        L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
-                            attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-                        }).addTo(map);
-                        L.marker([lat, lon]).addTo(map)
-                            .bindPopup('<b>' + mapElement.getAttribute('data-name') + '</b><br />' + address).openPopup();
+                        showMap(mapElement, data[0].lat, data[0].lon, address);
                     } else {
                         mapElement.innerHTML = "Address not found!";
                     }
@@ -94,6 +91,15 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    function showMap(mapElement, lat, lon, address) {
+        const map = L.map(mapElement).setView([lat, lon], 15);
+        L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+            attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+        }).addTo(map);
+        L.marker([lat, lon]).addTo(map)
+            .bindPopup('<b>' + mapElement.getAttribute('data-name') + '</b><br />' + address).openPopup();
+    }
+
     // Function to fetch and display formular details
     document.querySelectorAll('.view-formular').forEach(function(button) {
         button.addEventListener('click', function() {
@@ -131,9 +137,35 @@ document.addEventListener('DOMContentLoaded', function () {
     const serviceSearchInput = document.getElementById('service-search');
     const onlineAvailableCheckbox = document.getElementById('online-available');
 
-    serviceSearchInput.addEventListener('input', filterServices);
+    serviceSearchInput.addEventListener('input', fetchSuggestions);
     onlineAvailableCheckbox.addEventListener('change', filterServices);
 
+    // services the suggest endpoint matched for the current input, typos included
+    let suggestedIds = new Set();
+    let suggestTimer = null;
+
+    function fetchSuggestions() {
+        suggestedIds = new Set();
+        filterServices();
+        clearTimeout(suggestTimer);
+        const query = serviceSearchInput.value.trim();
+        if (query.length < 4) {
+            return;
+        }
+        suggestTimer = setTimeout(function() {
+            fetch(`/api/suggest?kind=service&limit=50&q=${encodeURIComponent(query)}`)
+                .then(response => response.json())
+                .then(suggestions => {
+                    if (serviceSearchInput.value.trim() !== query) {
+                        return;
+                    }
+                    suggestedIds = new Set(suggestions.map(suggestion => String(suggestion.id)));
+                    filterServices();
+                })
+                .catch(error => console.error('Error fetching suggestions:', error));
+        }, 150);
+    }
+
     function filterServices() {
         const searchValue = serviceSearchInput.value.toLowerCase();
         const isOnlineAvailable = onlineAvailableCheckbox.checked;
@@ -141,9 +173,10 @@ document.addEventListener('DOMContentLoaded', function () {
         document.querySelectorAll('#service-list > div').forEach(function(service) {
             const serviceName = service.querySelector('h2').textContent.toLowerCase();
             const canBeDoneOnline = service.querySelector('p').textContent.includes('Yes');
+            const serviceId = service.querySelector('.view-service').getAttribute('data-service-id');
 
             if (
-                serviceName.includes(searchValue) &&
+                (serviceName.includes(searchValue) || suggestedIds.has(serviceId)) &&
                 (!isOnlineAvailable || canBeDoneOnline)
             ) {
                 service.classList.remove('hidden');
@@ -0,0 +1,260 @@
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import product
+
+from .search_index import WORD_RE, fold
+
+KINDS = ("service", "formular", "standort")
+# labels a trie node lists in rank order; nodes with more labels keep them as a bitset instead
+TOP_K = 64
+# vocabulary words compared with a misspelled query word, those sharing the most trigrams first
+MAX_FUZZY_WORDS = 32
+# misspelled query words whose matches are remembered per index
+FUZZY_CACHE_SIZE = 4096
+# an edit changes at most this many of the padded trigrams of a word (a transposition touches four)
+GRAMS_PER_EDIT = 4
+
+
+def normalize(value):
+    return fold(value or "").lower()
+
+
+def words(value):
+    return WORD_RE.findall(normalize(value))
+
+
+def max_edits(token):
+    """Typos tolerated in a query word: none up to three letters, one up to seven, two beyond."""
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 7 else 2
+
+
+def _grams(word):
+    padded = "  " + word
+    return {padded[i:i + 3] for i in range(len(word))}
+
+
+def _bitset(ranks, size):
+    buffer = bytearray(size // 8 + 1)
+    for rank in ranks:
+        buffer[rank >> 3] |= 1 << (rank & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance of `a` and `b` (an adjacent transposition counts once), or limit + 1 beyond `limit`.
+
+    Only the diagonal band of width 2 * limit + 1 is computed, cells outside it can not be within the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    beyond = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else beyond for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char, before = a[i - 1], a[i - 2] if i > 1 else None
+        current = [beyond] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            other = b[j - 1]
+            value = previous[j - 1] if char == other else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if before == other and j > 1 and char == b[j - 2] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return beyond
+        previous2, previous = previous, current
+    return min(previous[-1], beyond)
+
+
+class _Node:
+    __slots__ = ("children", "top", "count", "last", "bits", "word")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+        self.count = 0
+        self.last = -1
+        self.bits = None
+        self.word = None
+
+
+class SuggestIndex:
+    """Typo-tolerant autocomplete over labels (service names, Formular titles, Standort names).
+
+    Labels are ranked once, shortest first, and their folded words are put in a prefix trie. A
+    node lists the first TOP_K labels having a word with its prefix, or keeps all of them as a
+    bitset over the ranks when there are more. A query matches a label when every query word is
+    the prefix of one of its words, so a keystroke is one trie walk per word and an AND of their
+    bitsets, whose lowest bits are the best ranked labels. Query words of four letters and more
+    that match no word, or that leave fewer than `limit` labels, are matched with one or two typos:
+    a trigram index over the vocabulary picks the words to compare, the edit distance decides.
+    """
+
+    def __init__(self, entries):
+        unique = {}
+        for kind, ref_id, service_id, label in entries:
+            key = (kind, normalize(label))
+            if label and (key not in unique or ref_id < unique[key][1]):
+                unique[key] = (kind, ref_id, service_id, label)
+        # rank: shortest label first, then services before Formulare before Standorte
+        self._entries = sorted(unique.values(), key=lambda entry: (len(entry[3]), KINDS.index(entry[0]), normalize(entry[3]), entry[1]))
+        self._labels = [normalize(entry[3]) for entry in self._entries]
+        size = len(self._entries)
+        self._all = (1 << size) - 1
+        self._kinds = {kind: _bitset((rank for rank, entry in enumerate(self._entries) if entry[0] == kind), size) for kind in KINDS}
+        self._vocabulary = []
+        self._postings = []
+        self._root = _Node()
+        entry_words = [tuple(dict.fromkeys(words(entry[3]))) for entry in self._entries]
+        for rank, labels_words in enumerate(entry_words):
+            for word in labels_words:
+                node = self._root
+                for char in word:
+                    child = node.children.get(char)
+                    if child is None:
+                        child = node.children[char] = _Node()
+                    node = child
+                    if node.last != rank:
+                        node.last = rank
+                        node.count += 1
+                        if len(node.top) < TOP_K:
+                            node.top.append(rank)
+                if node.word is None:
+                    node.word = len(self._vocabulary)
+                    self._vocabulary.append(word)
+                    self._postings.append([])
+                self._postings[node.word].append(rank)
+        # second pass: the complete rank sets of the nodes whose list is cut at TOP_K
+        full = defaultdict(list)
+        for rank, labels_words in enumerate(entry_words):
+            for word in labels_words:
+                node = self._root
+                for char in word:
+                    node = node.children[char]
+                    if node.count > TOP_K and (not full[node] or full[node][-1] != rank):
+                        full[node].append(rank)
+        for node, ranks in full.items():
+            node.bits = _bitset(ranks, size)
+        self._posting_bits = {word_id: _bitset(ranks, size) for word_id, ranks in enumerate(self._postings) if len(ranks) > TOP_K}
+        # a query word is typed one letter at a time, its earlier words are looked up again and again
+        self._fuzzy_words = lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._fuzzy_words)
+        self._grams = {}
+        for word_id, word in enumerate(self._vocabulary):
+            for gram in _grams(word):
+                self._grams.setdefault(gram, []).append(word_id)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _node(self, token):
+        node = self._root
+        for char in token:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _node_bits(self, node):
+        if node.bits is not None:
+            return node.bits
+        bits = 0
+        for rank in node.top:
+            bits |= 1 << rank
+        return bits
+
+    def _fuzzy_words(self, token):
+        """{word id: edits} of up to MAX_FUZZY_WORDS vocabulary words within `max_edits(token)` of `token` or of their prefix.
+
+        The first letter has to match, typos there are rare and it keeps the words to compare few.
+        """
+        limit = max_edits(token)
+        grams = _grams(token)
+        shared = Counter(word_id for gram in grams for word_id in self._grams.get(gram, ()))
+        needed = max(1, len(grams) - GRAMS_PER_EDIT * limit)
+        candidates = [
+            word_id for word_id, count in shared.most_common()
+            if count >= needed and self._vocabulary[word_id][0] == token[0] and len(self._vocabulary[word_id]) >= len(token) - limit
+        ]
+        matches = {}
+        for word_id in candidates[:MAX_FUZZY_WORDS]:
+            word = self._vocabulary[word_id]
+            distance = edit_distance(token, word, limit)
+            if distance and len(word) > len(token):
+                distance = min(distance, edit_distance(token, word[:len(token)], limit))
+            if 0 < distance <= limit:
+                matches[word_id] = distance
+        return matches
+
+    def _fuzzy_alternatives(self, token):
+        """(edits, bitset of the labels) per number of typos with which `token` matches a word."""
+        if not max_edits(token):
+            return []
+        by_edits = defaultdict(int)
+        for word_id, edits in self._fuzzy_words(token).items():
+            bits = self._posting_bits.get(word_id)
+            if bits is None:
+                bits = 0
+                for rank in self._postings[word_id]:
+                    bits |= 1 << rank
+            by_edits[edits] |= bits
+        return sorted(by_edits.items())
+
+    def _collect(self, per_token, mask, limit, found):
+        # combinations with the fewest typos first; within one, labels in rank order
+        for combination in sorted(product(*per_token), key=lambda alternatives: sum(edits for edits, _ in alternatives)):
+            bits = mask
+            for _, alternative in combination:
+                bits &= alternative
+            edits = sum(edits for edits, _ in combination)
+            while bits and len(found) < limit:
+                low = bits & -bits
+                rank = low.bit_length() - 1
+                bits ^= low
+                found.setdefault(rank, edits)
+            if len(found) == limit:
+                break
+
+    def suggest(self, query, limit=10, kinds=None):
+        """Up to `limit` labels for what has been typed so far, exact word-prefix matches first, then those with typos."""
+        tokens = words(query)
+        if not tokens:
+            return []
+        mask = self._all
+        if kinds:
+            mask = 0
+            for kind in kinds:
+                mask |= self._kinds[kind]
+        found = {}
+        nodes = [self._node(token) for token in tokens]
+        # words that are the prefix of no word can only be typos
+        per_token = [
+            [(0, self._node_bits(node))] if node is not None else self._fuzzy_alternatives(token)
+            for token, node in zip(tokens, nodes)
+        ]
+        if all(per_token):
+            self._collect(per_token, mask, limit, found)
+        if len(found) < limit and any(node is not None and max_edits(token) for token, node in zip(tokens, nodes)):
+            # too few labels: correctly spelled words may still be typos of other words
+            per_token = [
+                alternatives + self._fuzzy_alternatives(token) if node is not None else alternatives
+                for token, node, alternatives in zip(tokens, nodes, per_token)
+            ]
+            if all(per_token):
+                self._collect(per_token, mask, limit, found)
+        # labels that start with the query itself go before those matching further in
+        start = normalize(query).strip()
+        ranked = sorted(found.items(), key=lambda item: (item[1], not self._labels[item[0]].startswith(start), item[0]))
+        return [
+            {"kind": kind, "id": ref_id, "service_id": service_id, "title": label, "edits": edits}
+            for (kind, ref_id, service_id, label), edits in ((self._entries[rank], edits) for rank, edits in ranked)
+        ]
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+
+from . import caching, metrics, read_model, settings
+from .db_executor import run_db
+
+templates = Jinja2Templates(directory="app/templates")
+
+
+class RenderCache:
+    """LRU cache of rendered pages and serialized lists for one dataset version, bounded by the total size of the bodies.
+
+    Entries are only valid for the version they were rendered for: the first lookup or store with a
+    different version drops everything.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _use_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.size = 0
+            self.version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._use_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, version, key, value, size=None):
+        """Store `value`, which counts as `size` bytes (default: its length) against the bound."""
+        size = len(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._use_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version": self.version,
+            }
+
+
+render_cache = RenderCache(settings.RENDER_CACHE_BYTES)
+
+
+async def render(request, name, build_context):
+    """Render template `name` with the context returned by `build_context()`, through the render cache.
+
+    A cached page is returned as stored bytes, without calling `build_context` or Jinja. Pages are
+    keyed by path and query parameters and only cached while the dataset has a version. Without a
+    read model, the context is loaded and rendered on the database executor.
+    """
+    version = await caching.current_version()
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    if version is not None:
+        body = render_cache.get(version, key)
+        if body is not None:
+            return HTMLResponse(body)
+
+    def render_body():
+        context = build_context()
+        start = time.perf_counter()
+        body = templates.get_template(name).render({"request": request, **context}).encode("utf-8")
+        metrics.record_render(name, time.perf_counter() - start)
+        return body
+
+    body = render_body() if read_model.current() is not None else await run_db(render_body)
+    if version is not None:
+        render_cache.put(version, key, body)
+    return HTMLResponse(body)
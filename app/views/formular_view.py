@@ -1,22 +1,23 @@
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from ..models import Formular, engine
+from fastapi import APIRouter, Depends, Request, HTTPException
+from ..repository import get_repository
+from ..templating import render
+from ..instrumentation import query_budget
+from ..query_plans import full_scan
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/formulare/")
-async def formulare(request: Request):
-    with Session(engine) as session:
-        formulare = session.exec(select(Formular)).all()
-    return templates.TemplateResponse("formulare.html", {"request": request, "formulare": formulare})
+@query_budget(1)
+@full_scan("formular")
+async def formulare(request: Request, repo=Depends(get_repository)):
+    return await render(request, "formulare.html", lambda: {"formulare": repo.formulare()})
 
 @router.get("/formulare/{formular_id}")
-def formular_detail(request: Request, formular_id: int):
-    with Session(engine) as session:
-        formular = session.get(Formular, formular_id)
+@query_budget(2)
+async def formular_detail(request: Request, formular_id: int, repo=Depends(get_repository)):
+    def context():
+        formular = repo.formular(formular_id)
         if not formular:
             raise HTTPException(status_code=404, detail="Formular not found")
-        return templates.TemplateResponse("formular_detail.html", {"request": request, "formular": formular})
-
+        return {"formular": formular, "service": repo.service(formular.service_id)}
+    return await render(request, "formular_detail.html", context)
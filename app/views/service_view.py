@@ -1,35 +1,26 @@
-from fastapi import APIRouter, Request, Query, HTTPException
-from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from sqlalchemy.orm import joinedload
-from ..models import Service, ServiceDetail, engine
+from fastapi import APIRouter, Depends, Request, Query, HTTPException
+from ..repository import get_repository
+from ..templating import render
+from ..instrumentation import query_budget
+from ..query_plans import full_scan
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/services/")
-async def services(request: Request, search: str = "", can_be_done_online: bool = None):
-    with Session(engine) as session:
-        query = select(Service).options(joinedload(Service.standorte))
-        
-        if search:
-            query = query.where(Service.service_name.contains(search))
-        
-        if can_be_done_online is not None:
-            query = query.where(Service.can_be_done_online == can_be_done_online)
-        
-        services = session.exec(query).unique().all()
-    
-    return templates.TemplateResponse("services.html", {"request": request, "services": services, "search": search, "can_be_done_online": can_be_done_online})
+@query_budget(1)
+@full_scan("service")
+async def services(request: Request, search: str = "", can_be_done_online: bool = None, repo=Depends(get_repository)):
+    def context():
+        return {"services": repo.services(search, can_be_done_online), "search": search, "can_be_done_online": can_be_done_online}
+    return await render(request, "services.html", context)
 
 @router.get("/services/{service_id}")
-async def service_detail(request: Request, service_id: int):
-    with Session(engine) as session:
-        service = session.exec(select(Service).where(Service.id == service_id)).first()
+@query_budget(3)
+async def service_detail(request: Request, service_id: int, repo=Depends(get_repository)):
+    def context():
+        service = repo.service(service_id)
         if not service:
             raise HTTPException(status_code=404, detail="Service not found")
-        service_detail = session.exec(select(ServiceDetail).where(ServiceDetail.service_id == service_id)).first()
-        return templates.TemplateResponse("service_detail.html", {"request": request, "service": service, "service_detail": service_detail})
-
-
+        return {"service": service, "service_detail": repo.service_detail(service_id), "standorte": repo.standorte_of_service(service_id)}
+    return await render(request, "service_detail.html", context)
@@ -1,24 +1,23 @@
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from sqlalchemy.orm import joinedload
-from ..models import Standorte, engine
+from fastapi import APIRouter, Depends, Request, HTTPException
+from ..repository import get_repository
+from ..templating import render
+from ..instrumentation import query_budget
+from ..query_plans import full_scan
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/standorte/")
-async def standorte(request: Request):
-    with Session(engine) as session:
-        standorte = session.exec(
-            select(Standorte).options(joinedload(Standorte.services))
-        ).unique().all()
-    return templates.TemplateResponse("standorte.html", {"request": request, "standorte": standorte})
+@query_budget(1)
+@full_scan("standorte")
+async def standorte(request: Request, repo=Depends(get_repository)):
+    return await render(request, "standorte.html", lambda: {"standorte": repo.standorte()})
 
 @router.get("/standorte/{standort_id}")
-def standort_detail(request: Request, standort_id: int):
-    with Session(engine) as session:
-        standort = session.get(Standorte, standort_id)
+@query_budget(2)
+async def standort_detail(request: Request, standort_id: int, repo=Depends(get_repository)):
+    def context():
+        standort = repo.standort(standort_id)
         if not standort:
             raise HTTPException(status_code=404, detail="Standort not found")
-        return templates.TemplateResponse("standort_detail.html", {"request": request, "standort": standort})
+        return {"standort": standort, "services": repo.services_of_standort(standort_id)}
+    return await render(request, "standort_detail.html", context)
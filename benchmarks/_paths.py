@@ -0,0 +1,11 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPER_DIR = os.path.join(REPO_ROOT, "Scraper Build")
+
+
+def add_scraper_to_path():
+    """The scraper modules live in a plain script directory, make them importable."""
+    if SCRAPER_DIR not in sys.path:
+        sys.path.insert(0, SCRAPER_DIR)
@@ -0,0 +1,95 @@
+"""Latency of the link bitmaps against the equivalent SQL over standorteservices, on a scaled dataset.
+
+    python -m benchmarks.bitmap_bench --scale 10 --repeat 200 --source path/to/services.db
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.bitmaps import BitmapCache
+
+from .fixtures import REPO_DB, build_scaled_db
+
+OFFERS_ALL_SQL = """
+SELECT standort_id FROM standorteservices WHERE service_id IN ({ids})
+GROUP BY standort_id HAVING count(*) = {count} ORDER BY standort_id
+"""
+OFFERS_ANY_SQL = "SELECT DISTINCT standort_id FROM standorteservices WHERE service_id IN ({ids}) ORDER BY standort_id"
+FACETS_SQL = """
+SELECT l.standort_id, count(*), total(s.can_be_done_online)
+FROM standorteservices l JOIN service s ON s.id = l.service_id
+GROUP BY l.standort_id ORDER BY l.standort_id
+"""
+
+
+def measure(run, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--services", type=int, default=3, help="services per offers query")
+    parser.add_argument("--source", default=REPO_DB, help="database to scale up (default: the snapshot in the repo root)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{build_scaled_db(os.path.join(tmp, 'services.db'), args.scale, args.source)}")
+        with engine.connect() as conn:
+            # offers queries pick from the busiest services, so intersections are not empty
+            popular = conn.execute(text(
+                "SELECT service_id FROM standorteservices GROUP BY service_id ORDER BY count(*) DESC LIMIT 50"
+            )).scalars().all()
+        if not popular:
+            parser.error(f"{args.source} has no Standort links to index")
+
+        cache = BitmapCache()
+        start = time.perf_counter()
+        bitmaps = cache.get(1, engine)
+        build_ms = (time.perf_counter() - start) * 1000
+        with engine.begin() as conn:
+            conn.execute(text("INSERT OR IGNORE INTO standorteservices (standort_id, service_id) SELECT standort_id, :service_id FROM standorteservices LIMIT 100"), {"service_id": popular[-1]})
+        start = time.perf_counter()
+        cache.get(2, engine)
+        update_ms = (time.perf_counter() - start) * 1000
+
+        def pick():
+            return random.sample(popular, min(args.services, len(popular)))
+
+        with engine.connect() as conn:
+            def sql_offers(statement):
+                def run():
+                    service_ids = pick()
+                    conn.execute(text(statement.format(ids=",".join(map(str, service_ids)), count=len(service_ids)))).all()
+                return run
+
+            results = [
+                ("offers=all  SQL GROUP BY/HAVING", measure(sql_offers(OFFERS_ALL_SQL), args.repeat)),
+                ("offers=all  bitmap AND", measure(lambda: bitmaps.offering("all", pick()), args.repeat)),
+                ("offers=any  SQL DISTINCT", measure(sql_offers(OFFERS_ANY_SQL), args.repeat)),
+                ("offers=any  bitmap OR", measure(lambda: bitmaps.offering("any", pick()), args.repeat)),
+                ("facets      SQL JOIN/GROUP BY", measure(lambda: conn.execute(text(FACETS_SQL)).all(), max(args.repeat // 10, 1))),
+                ("facets      bitmap popcount", measure(bitmaps.facets, max(args.repeat // 10, 1))),
+            ]
+        engine.dispose()
+
+    print(f"scale {args.scale}x: {bitmaps.links} links, built in {build_ms:.1f} ms, 100 new links applied in {update_ms:.1f} ms")
+    print(f"{'':<32} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, (mean, p50, p95) in results:
+        print(f"{label:<32} {mean:8.3f} {p50:8.3f} {p95:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
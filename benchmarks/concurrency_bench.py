@@ -0,0 +1,62 @@
+"""Shows that slow statements no longer serialize the worker: fires parallel requests at a route
+whose statements each take `--delay` seconds, while timing a route that does no database work.
+Runs in-process against the app's database; the delay is only added to this process' engine.
+
+    python -m benchmarks.concurrency_bench --requests 32 --delay 0.05
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import event, text
+
+
+async def run(requests, delay, probes):
+    from app import settings
+    from app.main import app
+    from app.models import engine
+
+    def slow_statement(*_):
+        time.sleep(delay)
+
+    event.listen(engine, "before_cursor_execute", slow_statement)
+    with engine.connect() as conn:
+        service_id = conn.execute(text("SELECT id FROM service LIMIT 1")).scalar()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def probe_latencies():
+            latencies = []
+            for _ in range(probes):
+                start = time.perf_counter()
+                await client.get("/")
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+            return latencies
+
+        start = time.perf_counter()
+        slow = [client.get(f"/api/services/{service_id}", params={"n": i}) for i in range(requests)]
+        responses, latencies = await asyncio.gather(asyncio.gather(*slow), probe_latencies())
+        elapsed = time.perf_counter() - start
+
+    assert all(response.status_code == 200 for response in responses)
+    statements = 3  # budget of the service detail route
+    print(f"{requests} parallel requests with {statements} statements of {delay * 1000:.0f} ms each, "
+          f"{settings.DB_WORKERS} DB workers")
+    print(f"  wall time {elapsed:.2f} s, fully serialized would be {requests * statements * delay:.2f} s")
+    print(f"  no-DB route latency while they ran: max {max(latencies) * 1000:.1f} ms, "
+          f"mean {sum(latencies) / len(latencies) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds added to every statement")
+    parser.add_argument("--probes", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.delay, args.probes))
+
+
+if __name__ == "__main__":
+    main()
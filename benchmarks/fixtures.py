@@ -0,0 +1,59 @@
+"""Scaled copies of services.db for benchmarks.
+
+Every row of the data tables is copied `scale - 1` more times with its ids shifted by a fixed
+offset per copy, so a 10x database has 10x services, details, Formulare, Standorte and links
+with the same shape as the original. The copy is first brought up to the current schema
+(migrations applied, descriptions normalized), so it looks like a freshly scraped database.
+"""
+import os
+import shutil
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from app.migrations import migrate
+from app.normalize import normalize_service_details
+
+ID_OFFSET = 10_000_000
+# table -> columns that hold ids and have to be shifted in each copy
+ID_COLUMNS = {
+    "service": ("id",),
+    "servicedetail": ("id", "service_id"),
+    "formular": ("id", "service_id"),
+    "standorte": ("id",),
+    "standorteservices": ("standort_id", "service_id"),
+}
+REPO_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services.db")
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def build_scaled_db(target, scale=1, source=REPO_DB):
+    """Copy `source` to `target` and multiply its rows by `scale`; returns `target`."""
+    shutil.copyfile(source, target)
+    engine = create_engine(f"sqlite:///{target}")
+    migrate(engine)
+    normalize_service_details(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(target)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table, id_columns in ID_COLUMNS.items():
+            if table not in existing:
+                continue
+            columns = _columns(conn, table)
+            quoted = ", ".join(f'"{column}"' for column in columns)
+            first_copy = " AND ".join(f'"{column}" < {ID_OFFSET}' for column in id_columns)
+            for copy in range(1, scale):
+                values = ", ".join(
+                    f'"{column}" + {copy * ID_OFFSET}' if column in id_columns else f'"{column}"'
+                    for column in columns
+                )
+                conn.execute(f'INSERT INTO "{table}" ({quoted}) SELECT {values} FROM "{table}" WHERE {first_copy}')
+        conn.commit()
+    finally:
+        conn.close()
+    return target
@@ -0,0 +1,270 @@
+"""Throughput and p50/p95/p99 latency of every API and page route, against scaled copies of services.db.
+
+Each scale runs in its own process with SERVICES_DB_PATH pointing at a fixture copy (see
+fixtures.py), so module caches and the engine start cold. Within it a concurrent async load
+generator drives the app in-process through httpx's ASGI transport: per URL, `--concurrency`
+clients issue `--requests` requests after a warm-up, stopping early after `--max-seconds`.
+The render cache is off unless `--render-cache` is given, so pages are rendered every time.
+
+Results are written as JSON and compared with a saved baseline; a route whose latency or
+throughput got worse by more than `--threshold` is reported and makes the run exit with 1.
+
+    python -m benchmarks.load_bench --scale 1 10 100 --save-baseline
+    python -m benchmarks.load_bench --scale 1 10 100 --threshold 0.15
+    python -m benchmarks.load_bench --compare benchmarks/results/load-20260101-120000.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ._paths import REPO_ROOT
+from .fixtures import REPO_DB, build_scaled_db
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+COUNTED_TABLES = ("service", "formular", "standorte", "standorteservices")
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+# routes that are not driven: FastAPI's docs, static files and the reload endpoint, which swaps the read model
+SKIPPED_ROUTES = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc", "/static", "/api/read-model/reload"}
+# URLs of the routes instrumentation.sample_urls leaves out, because they read no application tables
+EXTRA_URLS = [
+    "/", "/api/export?table=service&format=ndjson", "/api/changes?since=0&limit=100",
+    "/api/render-cache/stats", "/metrics",
+]
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of sorted `samples`."""
+    return samples[max(math.ceil(q * len(samples)) - 1, 0)]
+
+
+def summarize(samples, errors, elapsed):
+    samples = sorted(samples)
+    milliseconds = lambda seconds: round(seconds * 1000, 3)  # noqa: E731
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+        "mean_ms": milliseconds(statistics.mean(samples)),
+        "p50_ms": milliseconds(percentile(samples, 0.5)),
+        "p95_ms": milliseconds(percentile(samples, 0.95)),
+        "p99_ms": milliseconds(percentile(samples, 0.99)),
+    }
+
+
+async def drive(client, url, requests, concurrency, max_seconds):
+    """Keep `concurrency` requests to `url` in flight until `requests` were sent or `max_seconds` passed."""
+    samples = []
+    errors = 0
+    sent = 0
+    start = time.perf_counter()
+
+    async def worker():
+        nonlocal errors, sent
+        while sent < requests and (sent < concurrency or time.perf_counter() - start < max_seconds):
+            sent += 1
+            request_start = time.perf_counter()
+            response = await client.get(url)
+            samples.append(time.perf_counter() - request_start)
+            if response.status_code != 200:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+def route_urls(app, engine):
+    """A URL per driven route, and the GET routes that no URL covers."""
+    from starlette.routing import Match
+
+    from app.instrumentation import sample_urls
+
+    urls = sample_urls(engine) + EXTRA_URLS
+    covered = set()
+    for url in urls:
+        path = url.split("?")[0]
+        scope = {"type": "http", "method": "GET", "path": path, "root_path": ""}
+        for route in app.router.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                covered.add(route.path)
+                break
+    missing = [route.path for route in app.router.routes if route.path not in covered and route.path not in SKIPPED_ROUTES]
+    return urls, missing
+
+
+async def run_worker(args):
+    """Benchmark the app against the database in SERVICES_DB_PATH; runs in the per-scale process."""
+    import httpx
+    from sqlalchemy import text
+
+    from app import templating
+    from app.main import app
+    from app.models import engine
+
+    if not args.render_cache:
+        # entries larger than the bound are never stored
+        templating.render_cache.max_bytes = 0
+    urls, missing = route_urls(app, engine)
+    with engine.connect() as conn:
+        counts = {table: conn.execute(text(f"SELECT count(*) FROM {table}")).scalar() for table in COUNTED_TABLES}
+
+    routes = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for url in urls:
+                for _ in range(args.warmup):
+                    await client.get(url)
+                routes[url] = await drive(client, url, args.requests, args.concurrency, args.max_seconds)
+                print(f"  {url}: {routes[url]['throughput_rps']} req/s", file=sys.stderr)
+    return {"rows": counts, "uncovered_routes": missing, "routes": routes}
+
+
+def run_scale(args, scale, fixture_dir):
+    """Build the `scale` fixture and benchmark it in a fresh process."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    target = os.path.join(fixture_dir, f"services-{scale}x.db")
+    if not os.path.exists(target):
+        print(f"building {scale}x fixture", file=sys.stderr)
+        build_scaled_db(target, scale, args.source)
+    env = {**os.environ, "SERVICES_DB_PATH": target, "SERVICES_READ_MODEL": "1" if args.read_model else "0"}
+    command = [
+        sys.executable, "-m", "benchmarks.load_bench", "--worker",
+        "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+        "--warmup", str(args.warmup), "--max-seconds", str(args.max_seconds),
+    ]
+    if args.render_cache:
+        command.append("--render-cache")
+    print(f"scale {scale}x", file=sys.stderr)
+    output = subprocess.run(command, env=env, cwd=REPO_ROOT, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, metric, threshold, min_delta_ms):
+    """Routes of `results` that are slower than in `baseline`, as printable lines.
+
+    A route regressed when its `metric` grew by more than `threshold` (a fraction) and at least
+    `min_delta_ms`, or its throughput dropped by more than `threshold`; the absolute floor keeps
+    sub-millisecond routes from flapping on noise.
+    """
+    regressions = []
+    for scale, result in results["scales"].items():
+        base_routes = baseline["scales"].get(scale, {}).get("routes", {})
+        for url, current in result["routes"].items():
+            base = base_routes.get(url)
+            if base is None:
+                continue
+            if current[metric] > base[metric] * (1 + threshold) and current[metric] - base[metric] >= min_delta_ms:
+                regressions.append(f"{scale}x {url}: {metric} {base[metric]:.2f} -> {current[metric]:.2f} ms "
+                                   f"(+{(current[metric] / base[metric] - 1) * 100:.0f}%)")
+            if base["throughput_rps"] and current["throughput_rps"] < base["throughput_rps"] / (1 + threshold):
+                regressions.append(f"{scale}x {url}: throughput {base['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s "
+                                   f"({(current['throughput_rps'] / base['throughput_rps'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_results(results):
+    for scale, result in results["scales"].items():
+        print(f"scale {scale}: " + ", ".join(f"{count} {name}" for name, count in result["rows"].items()))
+        if result["uncovered_routes"]:
+            print(f"  routes without a benchmark URL: {', '.join(result['uncovered_routes'])}")
+        print(f"  {'':<60} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for url, route in result["routes"].items():
+            print(f"  {url[:60]:<60} {route['throughput_rps']:8.1f} {route['p50_ms']:8.2f} {route['p95_ms']:8.2f} "
+                  f"{route['p99_ms']:8.2f} {route['errors']:6d}")
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as results_file:
+        json.dump(data, results_file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per URL")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per URL")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per URL before measuring")
+    parser.add_argument("--max-seconds", type=float, default=10, help="stop sending requests to a URL after this long")
+    parser.add_argument("--render-cache", action="store_true", help="keep the render cache on, so repeated pages are cache hits")
+    parser.add_argument("--read-model", action="store_true", help="serve reads from the in-memory read model")
+    parser.add_argument("--source", default=REPO_DB, help="database to scale up (default: the snapshot in the repo root)")
+    parser.add_argument("--fixture-dir", help="keep the scaled fixtures here and reuse them in later runs (delete them after changing --source)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/load-<UTC time>.json)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results to compare with, if the file exists")
+    parser.add_argument("--save-baseline", action="store_true", help="also store the results as the new baseline")
+    parser.add_argument("--compare", metavar="RESULTS", help="compare a stored results file with the baseline instead of running")
+    parser.add_argument("--metric", choices=METRICS, default="p95_ms", help="latency compared with the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="latency increases below this never count as a regression")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_worker(args))))
+        return
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as results_file:
+            results = json.load(results_file)
+    else:
+        started_at = time.time()
+        results = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started_at)),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {
+                name: getattr(args, name)
+                for name in ("requests", "concurrency", "warmup", "max_seconds", "render_cache", "read_model")
+            },
+            "scales": {},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            for scale in args.scale:
+                results["scales"][f"{scale}"] = run_scale(args, scale, args.fixture_dir or tmp)
+        output = args.output or os.path.join(RESULTS_DIR, time.strftime("load-%Y%m%d-%H%M%S.json", time.gmtime(started_at)))
+        write_json(output, results)
+        print_results(results)
+        print(f"results written to {output}")
+
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save-baseline to store one")
+        return
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("settings") != results.get("settings"):
+        print(f"warning: the baseline was measured with other settings: {baseline.get('settings')}")
+    regressions = compare(results, baseline, args.metric, args.threshold, args.min_delta_ms)
+    for line in regressions:
+        print(f"REGRESSION  {line}")
+    print(f"{len(regressions)} regressions against the baseline from {baseline.get('created_at')} "
+          f"({args.metric}, threshold {args.threshold:.0%}, at least {args.min_delta_ms:g} ms)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compare parse throughput of the scraper's strained lxml parse stage against the old full html.parser tree.
+
+Pages are read from the scraper's HTTP cache (every cached URL keeps its last body) or from a
+directory of saved .html files:
+
+    python -m benchmarks.parse_bench
+    python -m benchmarks.parse_bench --pages ./saved_pages --repeat 5 --workers 4
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import time
+import zlib
+
+from bs4 import BeautifulSoup
+
+from ._paths import add_scraper_to_path
+
+add_scraper_to_path()
+
+import parsers  # noqa: E402
+from http_cache import DEFAULT_CACHE_PATH  # noqa: E402
+from parse_pool import make_parse_pool  # noqa: E402
+
+
+def load_pages(cache_path=DEFAULT_CACHE_PATH, pages_dir=None):
+    """Return (kind, html) pairs, kind being 'service' or 'standort'."""
+    if pages_dir:
+        rows = []
+        for path in sorted(glob.glob(os.path.join(pages_dir, "**", "*.html"), recursive=True)):
+            with open(path, encoding="utf-8") as f:
+                rows.append((path, f.read()))
+    elif os.path.exists(cache_path):
+        with sqlite3.connect(cache_path) as conn:
+            rows = [(url, zlib.decompress(body).decode("utf-8"))
+                    for url, body in conn.execute("SELECT url, body FROM http_cache")]
+    else:
+        rows = []
+    pages = []
+    for name, html in rows:
+        if "/dienstleistung/" in name:
+            pages.append(("service", html))
+        elif "/standort/" in name:
+            pages.append(("standort", html))
+    return pages
+
+
+def legacy_parse(kind, html):
+    soup = BeautifulSoup(html, "html.parser")
+    if kind == "service":
+        return parsers.extract_service_detail(soup)
+    return parsers.extract_standorte_details(soup)
+
+
+def strained_parse(kind, html):
+    if kind == "service":
+        return parsers.parse_service_detail(html)
+    return parsers.parse_standorte_details(html)
+
+
+def _kinds_and_pages(pages):
+    return [kind for kind, _ in pages], [html for _, html in pages]
+
+
+def time_serial(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kind, html in pages:
+            parse(kind, html)
+    return time.perf_counter() - start
+
+
+def time_pool(parse, pages, repeat, workers):
+    kinds, htmls = _kinds_and_pages(pages)
+    with make_parse_pool(workers) as pool:
+        list(pool.map(parse, kinds[:workers], htmls[:workers]))  # warm up the workers
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(pool.map(parse, kinds, htmls, chunksize=8))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--pages", help="directory of saved .html pages instead of the HTTP cache")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pages = load_pages(args.cache_path, args.pages)
+    if not pages:
+        raise SystemExit("No stored service or Standort pages found, run the scraper with the cache enabled first.")
+
+    mismatches = sum(1 for kind, html in pages if legacy_parse(kind, html) != strained_parse(kind, html))
+    total = len(pages) * args.repeat
+    mb = sum(len(html) for _, html in pages) * args.repeat / 1e6
+
+    results = [
+        ("html.parser, full tree", time_serial(legacy_parse, pages, args.repeat)),
+        ("lxml + strainers", time_serial(strained_parse, pages, args.repeat)),
+        (f"lxml + strainers, {args.workers} processes", time_pool(strained_parse, pages, args.repeat, args.workers)),
+    ]
+
+    print(f"{len(pages)} pages x {args.repeat} ({mb:.1f} MB), {mismatches} pages with differing results")
+    baseline = results[0][1]
+    for label, seconds in results:
+        print(f"{label:<36} {total / seconds:8.1f} pages/s  {mb / seconds:6.2f} MB/s  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Per-request cost of the read endpoints served from SQLite (SqlRepository) and from the in-memory ReadModel.
+
+    python -m benchmarks.read_model_bench --scale 10 --requests 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from app.read_model import ReadModel
+from app.repository import SqlRepository
+
+from .fixtures import REPO_DB, build_scaled_db
+
+
+def operations(model):
+    service_ids = [service.id for service in model.services()]
+    standort_ids = [standort.id for standort in model.standorte()] or [0]
+    formular_ids = [formular.id for formular in model.formulare()]
+    return [
+        ("service list", lambda repo: repo.services()),
+        ("service search", lambda repo: repo.services("antrag")),
+        ("service detail", lambda repo: (
+            lambda service_id: (repo.service(service_id), repo.service_detail(service_id), repo.standorte_of_service(service_id))
+        )(random.choice(service_ids))),
+        ("standort detail", lambda repo: (
+            lambda standort_id: (repo.standort(standort_id), repo.services_of_standort(standort_id))
+        )(random.choice(standort_ids))),
+        ("formular detail", lambda repo: repo.formular(random.choice(formular_ids))),
+    ]
+
+
+def measure(run, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="requests per operation and backend")
+    parser.add_argument("--source", default=REPO_DB, help="database to scale up (default: the snapshot in the repo root)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{build_scaled_db(os.path.join(tmp, 'services.db'), args.scale, args.source)}")
+        start = time.perf_counter()
+        model = ReadModel.load(engine)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        sql = SqlRepository(engine)
+
+        print(f"scale {args.scale}x: " + ", ".join(f"{count} {name}" for name, count in model.counts().items()))
+        print(f"read model loaded in {load_ms:.0f} ms")
+        print(f"{'':<18} {'SQL mean':>9} {'SQL p99':>9} {'mem mean':>9} {'mem p99':>9}  (ms)")
+        for label, operation in operations(model):
+            sql_mean, sql_p99 = measure(lambda: operation(sql), args.requests)
+            mem_mean, mem_p99 = measure(lambda: operation(model), args.requests)
+            print(f"{label:<18} {sql_mean:9.3f} {sql_p99:9.3f} {mem_mean:9.3f} {mem_p99:9.3f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
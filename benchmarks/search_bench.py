@@ -0,0 +1,74 @@
+"""Latency of the FTS5 search index against the LIKE '%x%' filters of the list routes, on a scaled dataset.
+
+    python -m benchmarks.search_bench --scale 10 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from app import search_index
+
+from .fixtures import REPO_DB, build_scaled_db
+
+QUERIES = ["Personalausweis", "Wohnung", "Anmeldung", "Gebühren", "Bürgeramt", "Führungszeugnis", "Antrag Kind"]
+
+# what the list routes run today: a substring match on the name columns
+LIKE_NAMES = [
+    "SELECT id FROM service WHERE service_name LIKE :pattern",
+    "SELECT id FROM formular WHERE title LIKE :pattern",
+    "SELECT id FROM standorte WHERE name LIKE :pattern",
+]
+# the same coverage as the index, which also looks at the service descriptions
+LIKE_FULL = LIKE_NAMES + ["SELECT service_id FROM servicedetail WHERE description LIKE :pattern"]
+
+
+def time_queries(run, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            run(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--source", default=REPO_DB, help="database to scale up (default: the snapshot in the repo root)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_scaled_db(os.path.join(tmp, "services.db"), args.scale, args.source)
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.begin() as conn:
+            counts = search_index.rebuild(conn)
+
+        with engine.connect() as conn:
+            def like(statements):
+                def run(query):
+                    for statement in statements:
+                        conn.execute(text(statement), {"pattern": f"%{query}%"}).all()
+                return run
+
+            results = [
+                ("LIKE on names (current routes)", time_queries(like(LIKE_NAMES), args.repeat)),
+                ("LIKE on names + descriptions", time_queries(like(LIKE_FULL), args.repeat)),
+                ("FTS5 bm25 top 20 with snippets", time_queries(lambda q: search_index.search(conn, q), args.repeat)),
+            ]
+        engine.dispose()
+
+    print(f"scale {args.scale}x: " + ", ".join(f"{count} {kind}" for kind, count in counts.items()))
+    print(f"{'':<34} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, (mean, p50, p95) in results:
+        print(f"{label:<34} {mean:8.2f} {p50:8.2f} {p95:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Serialization cost per row of the list responses, before and after the orjson fast path.
+
+    python -m benchmarks.serialization_bench --scale 10 --repeat 20
+
+Compares, per list route, model instances through jsonable_encoder (the original routes), row
+dicts through jsonable_encoder (FastAPI's default for plain return values), row dicts through
+orjson (responses.page_response) and a hit in the pre-serialized page cache.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+
+from app.models import Formular, Service, Standorte
+from app.pagination import PageRequest, columns_of
+from app.read_model import ReadModel
+from app.templating import RenderCache
+
+from .fixtures import REPO_DB, build_scaled_db
+
+
+def measure(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per variant, the fastest one counts")
+    parser.add_argument("--source", default=REPO_DB, help="database to scale up (default: the snapshot in the repo root)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{build_scaled_db(os.path.join(tmp, 'services.db'), args.scale, args.source)}")
+        model = ReadModel.load(engine)
+        engine.dispose()
+
+    lists = [
+        ("/api/services/", Service, model.services(), model.services_page),
+        ("/api/standorte/", Standorte, model.standorte(), model.standorte_page),
+        ("/api/formulare/", Formular, model.formulare(), model.formulare_page),
+    ]
+    print(f"scale {args.scale}x, best of {args.repeat} runs, µs per row")
+    print(f"{'':<17} {'rows':>7} {'objects':>9} {'dicts':>9} {'orjson':>9} {'cached':>9}")
+    for path, table, objects, page in lists:
+        rows, _ = page(PageRequest(table, columns_of(table)))
+        if not rows:
+            print(f"{path:<17} {0:>7}   (no rows in this database)")
+            continue
+        body = orjson.dumps(rows)
+        cache = RenderCache(max_bytes=1 << 30)
+        cache.put("bench", path, (body, {}), size=len(body))
+
+        def cached():
+            body, headers = cache.get("bench", path)
+            return Response(body, media_type="application/json", headers=headers)
+
+        variants = (
+            lambda: JSONResponse(jsonable_encoder(objects)),
+            lambda: JSONResponse(jsonable_encoder(rows)),
+            lambda: Response(orjson.dumps(rows), media_type="application/json"),
+            cached,
+        )
+        per_row = [measure(variant, args.repeat) / len(rows) * 1e6 for variant in variants]
+        print(f"{path:<17} {len(rows):>7} " + " ".join(f"{value:9.3f}" for value in per_row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Per-keystroke latency of the suggest index, on a scaled dataset.
+
+Every copy of the scaled database gets its copy number appended to its labels, so labels stay
+distinct instead of collapsing into the originals. Queries replay typing the first words of random
+labels one letter at a time, as typed and with two adjacent letters swapped.
+
+    python -m benchmarks.suggest_bench --scale 100 --labels 200 --source path/to/services.db
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from app.repository import SqlRepository
+from app.suggest import SuggestIndex
+
+from .fixtures import ID_OFFSET, REPO_DB, build_scaled_db
+
+
+def keystrokes(label, typo):
+    text = " ".join(label.split()[:2])
+    if typo:
+        words = text.split(" ")
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        word = words[longest]
+        if len(word) < 5:
+            return []
+        i = random.randrange(1, len(word) - 2)
+        words[longest] = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        text = " ".join(words)
+    return [text[:end] for end in range(1, len(text) + 1) if not text[:end].endswith(" ")]
+
+
+def measure(index, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.suggest(query, 10)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return len(samples), statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--labels", type=int, default=200, help="labels whose typing is replayed")
+    parser.add_argument("--source", default=REPO_DB, help="database to scale up (default: the snapshot in the repo root)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{build_scaled_db(os.path.join(tmp, 'services.db'), args.scale, args.source)}")
+        entries = [
+            (kind, ref_id, service_id, f"{label} {ref_id // ID_OFFSET}" if ref_id >= ID_OFFSET else label)
+            for kind, ref_id, service_id, label in SqlRepository(engine)._suggest_entries()
+        ]
+        engine.dispose()
+
+    start = time.perf_counter()
+    index = SuggestIndex(entries)
+    build_ms = (time.perf_counter() - start) * 1000
+    labels = random.sample([entry[3] for entry in entries if entry[3]], min(args.labels, len(entries)))
+
+    print(f"scale {args.scale}x: {len(entries)} labels, {len(index)} distinct, index built in {build_ms:.0f} ms")
+    print(f"{'':<22} {'queries':>8} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, typo in (("typed", False), ("with a swapped pair", True)):
+        count, mean, p50, p99 = measure(index, [query for text in labels for query in keystrokes(text, typo)])
+        print(f"{label:<22} {count:8d} {mean:8.3f} {p50:8.3f} {p99:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
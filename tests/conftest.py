@@ -0,0 +1,90 @@
+"""Runs the tests against a migrated copy of the repo's services.db, with its search index built.
+
+The app reads its settings when it is imported, so the environment has to point at the fixture
+before any test module imports it; conftest.py is imported first.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+
+FIXTURE_DIR = tempfile.mkdtemp(prefix="services-tests-")
+FIXTURE_DB = os.path.join(FIXTURE_DIR, "services.db")
+os.environ["SERVICES_DB_PATH"] = FIXTURE_DB
+os.environ["SERVICES_READ_MODEL"] = "0"
+os.environ["SERVICES_QUERY_HEADERS"] = "0"
+
+from app import search_index  # noqa: E402
+from benchmarks._paths import add_scraper_to_path  # noqa: E402
+from benchmarks.fixtures import build_scaled_db  # noqa: E402
+
+# the scraper modules (bulk_writer, job_queue, http_cache, parsers) are tested in place
+add_scraper_to_path()
+
+# the repo snapshot has no Standorte; a few with coordinates and links let the Standort routes read rows
+STANDORTE = [
+    (300000, "Bürgeramt Mitte", "https://service.berlin.de/standort/300000/", "Karl-Marx-Allee 31, 10178 Berlin", 52.5186, 13.4183),
+    (300001, "Bürgeramt Kreuzberg", "https://service.berlin.de/standort/300001/", "Yorckstraße 4, 10965 Berlin", 52.4929, 13.3886),
+    (300002, "Bürgeramt Spandau", "https://service.berlin.de/standort/300002/", "Carl-Schurz-Straße 2, 13597 Berlin", 52.5353, 13.2006),
+]
+
+
+def _seed_standorte(path):
+    conn = sqlite3.connect(path)
+    try:
+        service_ids = [row[0] for row in conn.execute("SELECT id FROM service ORDER BY id LIMIT 20")]
+        conn.executemany("INSERT INTO standorte (id, name, link, address, lat, lon) VALUES (?, ?, ?, ?, ?, ?)", STANDORTE)
+        conn.executemany(
+            "INSERT INTO standorteservices (standort_id, service_id) VALUES (?, ?)",
+            [(standort[0], service_id) for i, standort in enumerate(STANDORTE) for service_id in service_ids[i::2]],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _build_fixture(path):
+    build_scaled_db(path)
+    _seed_standorte(path)
+    writer = create_engine(f"sqlite:///{path}")
+    with writer.begin() as conn:
+        search_index.rebuild(conn)
+    writer.dispose()
+
+
+_build_fixture(FIXTURE_DB)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(FIXTURE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from app.models import engine
+
+    return engine
+
+
+@pytest.fixture
+def scraper_engine(tmp_path, engine):
+    """A writable engine on a private copy of the fixture database, as the scraper opens it."""
+    from app.database import make_engine
+
+    path = shutil.copyfile(FIXTURE_DB, tmp_path / "services.db")
+    scraper_engine = make_engine("scraper", str(path))
+    yield scraper_engine
+    scraper_engine.dispose()
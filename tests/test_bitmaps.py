@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.bitmaps import BitmapCache
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE service (id INTEGER PRIMARY KEY, can_be_done_online BOOLEAN)")
+        conn.exec_driver_sql("CREATE TABLE standorteservices (standort_id INTEGER NOT NULL, service_id INTEGER NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO service VALUES (1, 1), (2, 0), (3, 1)")
+        conn.exec_driver_sql("INSERT INTO standorteservices VALUES (10, 1), (11, 2)")
+    return engine
+
+
+def run(engine, *statements):
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+
+
+def test_added_links_are_picked_up(engine):
+    cache = BitmapCache()
+    assert cache.get("v1", engine).offering("all", (1,)) == [10]
+    run(engine, "INSERT INTO standorteservices VALUES (12, 1)")
+    assert cache.get("v2", engine).offering("all", (1,)) == [10, 12]
+
+
+def test_rewritten_link_with_reused_rowid_rebuilds(engine):
+    # the scraper replaces the links of a Standort; SQLite hands the deleted max rowid out again
+    cache = BitmapCache()
+    assert cache.get("v1", engine).offering("all", (2,)) == [11]
+    run(engine, "DELETE FROM standorteservices WHERE standort_id = 11", "INSERT INTO standorteservices VALUES (11, 3)")
+    bitmaps = cache.get("v2", engine)
+    assert bitmaps.offering("all", (2,)) == []
+    assert bitmaps.offering("all", (3,)) == [11]
+
+
+def test_swapped_links_rebuild(engine):
+    cache = BitmapCache()
+    assert cache.get("v1", engine).offering("all", (1,)) == [10]
+    run(engine, "UPDATE standorteservices SET service_id = 3 - service_id")
+    bitmaps = cache.get("v2", engine)
+    assert bitmaps.offering("all", (1,)) == [11]
+    assert bitmaps.offering("all", (2,)) == [10]
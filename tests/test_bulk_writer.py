@@ -0,0 +1,117 @@
+from sqlalchemy import text
+
+from app import dataset_version
+from bulk_writer import BulkWriter
+
+
+def _service(conn, service_id):
+    return conn.execute(text("SELECT service_name, link, can_be_done_online FROM service WHERE id = :id"), {"id": service_id}).one()
+
+
+def _events(conn):
+    return conn.execute(text("SELECT entity, entity_id, op FROM change_log ORDER BY seq")).all()
+
+
+def _version(engine):
+    with engine.connect() as conn:
+        return dataset_version.read(conn)
+
+
+def _write_service(writer, service_id, name, formulare, description="<p>Beschreibung</p>"):
+    writer.add_service(service_id, name, f"https://service.berlin.de/dienstleistung/{service_id}/", False)
+    writer.add_service_detail(service_id, name, description)
+    writer.replace_formulare(service_id, [{"title": title, "url": url} for title, url in formulare])
+
+
+def test_only_new_and_changed_rows_are_written(scraper_engine):
+    formulare = [("Antrag", "https://example.org/antrag.pdf"), ("Vollmacht", "https://example.org/vollmacht.pdf")]
+    with BulkWriter(scraper_engine, batch_size=2) as writer:
+        _write_service(writer, 900001, "Testdienst", formulare)
+        writer.add_standort(900002, "Testamt", "/standort/900002/", "Teststraße 1, 10115 Berlin")
+        writer.link_services(900002, [900001])
+    with scraper_engine.connect() as conn:
+        assert sorted((entity, op) for entity, _, op in _events(conn)) == [
+            ("formular", "created"), ("formular", "created"), ("link", "created"),
+            ("service", "created"), ("servicedetail", "created"), ("standort", "created"),
+        ]
+    version = _version(scraper_engine)
+
+    # the same records again, with whitespace differences only: nothing is written
+    with BulkWriter(scraper_engine) as writer:
+        _write_service(writer, 900001, "Testdienst ", formulare, description="<p>Beschreibung</p>\n")
+        writer.add_standort(900002, "Testamt", "/standort/900002/", "Teststraße  1, 10115 Berlin")
+        writer.link_services(900002, [900001])
+    with scraper_engine.connect() as conn:
+        assert len(_events(conn)) == 6
+    assert _version(scraper_engine) == version
+
+    # a renamed Formular is updated in place, a dropped one deleted, and so is the dropped link
+    with BulkWriter(scraper_engine) as writer:
+        _write_service(writer, 900001, "Testdienst", [("Antrag (neu)", "https://example.org/antrag.pdf")])
+        writer.link_services(900002, [])
+    with scraper_engine.connect() as conn:
+        assert [(entity, op) for entity, _, op in _events(conn)[6:]] == [
+            ("formular", "deleted"), ("formular", "updated"), ("link", "deleted"),
+        ]
+        assert conn.execute(text("SELECT title FROM formular WHERE service_id = 900001")).scalars().all() == ["Antrag (neu)"]
+        assert conn.execute(text("SELECT count(*) FROM standorteservices WHERE standort_id = 900002")).scalar() == 0
+    assert _version(scraper_engine) != version
+
+
+def test_listing_of_an_unchanged_page_renames_and_keeps_the_detail_fields(scraper_engine):
+    with scraper_engine.connect() as conn:
+        service_id, name, link, online = conn.execute(text("SELECT id, service_name, link, can_be_done_online FROM service LIMIT 1")).one()
+    with BulkWriter(scraper_engine) as writer:
+        writer.add_service_listing(service_id, f"{name} (neu)", link)
+        writer.add_service_listing(99_999_999, "never stored", "https://example.org/")
+    with scraper_engine.connect() as conn:
+        assert tuple(_service(conn, service_id)) == (f"{name} (neu)", link, online)
+        assert conn.execute(text("SELECT count(*) FROM service WHERE id = 99999999")).scalar() == 0
+        assert _events(conn) == [("service", service_id, "updated")]
+
+    with BulkWriter(scraper_engine) as writer:
+        writer.add_service_listing(service_id, f"{name} (neu)", link)
+    with scraper_engine.connect() as conn:
+        assert len(_events(conn)) == 1
+
+
+def test_services_and_standorte_missing_from_a_complete_listing_are_deleted(scraper_engine):
+    with scraper_engine.connect() as conn:
+        service_ids = conn.execute(text("SELECT id FROM service ORDER BY id")).scalars().all()
+        standort_ids = conn.execute(text("SELECT id FROM standorte ORDER BY id")).scalars().all()
+        gone_service = conn.execute(
+            text("SELECT service_id FROM standorteservices WHERE service_id IN (SELECT service_id FROM formular) LIMIT 1")
+        ).scalar_one()
+        formulare = conn.execute(text("SELECT id FROM formular WHERE service_id = :id"), {"id": gone_service}).scalars().all()
+    gone_standort = standort_ids[-1]
+    with BulkWriter(scraper_engine) as writer:
+        writer.remove_unlisted("service", set(service_ids) - {gone_service})
+        writer.remove_unlisted("standort", set(standort_ids) - {gone_standort})
+        # an empty listing is a broken index page, it removes nothing
+        writer.remove_unlisted("standort", set())
+
+    with scraper_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM service WHERE id = :id"), {"id": gone_service}).scalar() == 0
+        assert conn.execute(text("SELECT count(*) FROM servicedetail WHERE service_id = :id"), {"id": gone_service}).scalar() == 0
+        assert conn.execute(text("SELECT count(*) FROM formular WHERE service_id = :id"), {"id": gone_service}).scalar() == 0
+        assert conn.execute(
+            text("SELECT count(*) FROM standorteservices WHERE service_id = :service OR standort_id = :standort"),
+            {"service": gone_service, "standort": gone_standort},
+        ).scalar() == 0
+        assert conn.execute(text("SELECT count(*) FROM standorte")).scalar() == len(standort_ids) - 1
+        assert conn.execute(
+            text("SELECT count(*) FROM search_document WHERE (kind = 'service' AND ref_id = :service) "
+                 "OR (kind = 'formular' AND service_id = :service) OR (kind = 'standort' AND ref_id = :standort)"),
+            {"service": gone_service, "standort": gone_standort},
+        ).scalar() == 0
+        deleted = {(entity, entity_id) for entity, entity_id, op in _events(conn) if op == "deleted"}
+        assert {("service", gone_service), ("servicedetail", gone_service), ("standort", gone_standort)} <= deleted
+        assert {("formular", formular_id) for formular_id in formulare} <= deleted
+        assert {op for _, _, op in _events(conn)} == {"deleted"}
+        logged = len(_events(conn))
+
+    # a second pass over the same listing finds nothing left to delete
+    with BulkWriter(scraper_engine) as writer:
+        writer.remove_unlisted("service", set(service_ids) - {gone_service})
+    with scraper_engine.connect() as conn:
+        assert len(_events(conn)) == logged
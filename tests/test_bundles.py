@@ -0,0 +1,71 @@
+from sqlalchemy import event, text
+
+from app.read_model import ReadModel
+from app.repository import SqlRepository
+
+INCLUDE = "detail,formulare,standorte"
+
+
+def _linked_service_ids(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT service_id FROM standorteservices WHERE service_id IN (SELECT service_id FROM formular) "
+                 "GROUP BY service_id ORDER BY service_id DESC LIMIT 3")
+        ).scalars().all()
+
+
+def test_service_bundle_has_the_requested_records(client, engine):
+    service_id = _linked_service_ids(engine)[0]
+    bundle = client.get(f"/api/services/{service_id}", params={"include": INCLUDE}).json()
+    with engine.connect() as conn:
+        formulare = conn.execute(text("SELECT id FROM formular WHERE service_id = :id ORDER BY id"), {"id": service_id}).scalars().all()
+        standorte = conn.execute(
+            text("SELECT standort_id FROM standorteservices WHERE service_id = :id ORDER BY standort_id"), {"id": service_id}
+        ).scalars().all()
+    assert bundle["id"] == service_id
+    assert bundle["detail"]["service_id"] == service_id
+    assert [formular["id"] for formular in bundle["formulare"]] == formulare
+    assert [standort["id"] for standort in bundle["standorte"]] == standorte
+
+    only_formulare = client.get(f"/api/services/{service_id}", params={"include": "formulare"}).json()
+    assert "detail" not in only_formulare and "standorte" not in only_formulare
+    assert only_formulare["formulare"] == bundle["formulare"]
+
+
+def test_multi_id_bundle_keeps_the_order_of_ids_and_skips_unknown_ones(client, engine):
+    service_ids = _linked_service_ids(engine)
+    ids = ",".join(str(service_id) for service_id in [*reversed(service_ids), 999999999])
+    bundles = client.get("/api/services/", params={"ids": ids, "include": INCLUDE}).json()
+    assert [bundle["id"] for bundle in bundles] == list(reversed(service_ids))
+    assert all(bundle["formulare"] and bundle["standorte"] for bundle in bundles)
+
+
+def test_bundle_errors(client):
+    assert client.get("/api/services/999999999", params={"include": "detail"}).status_code == 404
+    assert client.get("/api/services/", params={"ids": "1,x"}).status_code == 400
+    assert client.get("/api/services/", params={"ids": "1", "include": "owner"}).status_code == 400
+    assert client.get("/api/services/", params={"include": "detail"}).status_code == 400
+
+
+def test_bundles_take_three_statements_however_many_ids(engine):
+    with engine.connect() as conn:
+        service_ids = conn.execute(text("SELECT id FROM service ORDER BY id")).scalars().all()
+    statements = []
+
+    def count(*_):
+        statements.append(1)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        SqlRepository(engine).service_bundles(tuple(service_ids), ("detail", "formulare", "standorte"))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert len(statements) == 3
+
+
+def test_read_model_bundles_match_the_database(engine):
+    service_ids = tuple(_linked_service_ids(engine))
+    include = ("detail", "formulare", "standorte")
+    from_model = ReadModel.load(engine).service_bundles(service_ids, include)
+    from_database = SqlRepository(engine).service_bundles(service_ids, include)
+    assert from_model == from_database
@@ -0,0 +1,62 @@
+import shutil
+
+from sqlalchemy import create_engine
+
+from app import dataset_version
+from app.caching import IndexCache, etag_matches
+from app.migrations import migrate
+from benchmarks.fixtures import REPO_DB
+
+
+def test_index_of_an_unstamped_database_is_built_once():
+    loads = []
+    cache = IndexCache(list)
+
+    def load():
+        loads.append(1)
+        return [1, 2]
+
+    assert cache.get(None, load) == [1, 2]
+    assert cache.get(None, load) == [1, 2]
+    assert len(loads) == 1
+    cache.get("v1", load)
+    assert len(loads) == 2
+
+
+def test_migrate_stamps_an_initial_version(tmp_path):
+    path = shutil.copyfile(REPO_DB, tmp_path / "services.db")
+    engine = create_engine(f"sqlite:///{path}")
+    migrate(engine)
+    with engine.connect() as conn:
+        version = dataset_version.read(conn)
+    assert version is not None
+    migrate(engine)
+    with engine.connect() as conn:
+        assert dataset_version.read(conn) == version
+
+
+def test_etag_matches_with_weak_comparison():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"xyz", W/"abc"', '"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('W/"xyz"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_weak_if_none_match_is_answered_with_304(client):
+    etag = client.get("/api/services/").headers["etag"]
+    response = client.get("/api/services/", headers={"If-None-Match": f"W/{etag}"})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_wildcard_if_none_match_only_matches_existing_resources(client, engine):
+    with engine.connect() as conn:
+        service_id = conn.exec_driver_sql("SELECT id FROM service LIMIT 1").scalar_one()
+    response = client.get(f"/api/services/{service_id}", headers={"If-None-Match": "*"})
+    assert response.status_code == 304
+    assert response.headers["etag"] == client.get(f"/api/services/{service_id}").headers["etag"]
+    assert client.get("/api/services/999999999", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get("/api/standorte/999999999", headers={"If-None-Match": "*"}).status_code == 404
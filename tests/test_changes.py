@@ -0,0 +1,71 @@
+import json
+import time
+
+import pytest
+
+from app import changes
+from app.controllers import changes_controller
+from bulk_writer import BulkWriter
+
+
+@pytest.fixture
+def feed(client, scraper_engine, monkeypatch):
+    """The client, with /api/changes reading the change log of the scraper's private database."""
+    monkeypatch.setattr(changes_controller, "engine", scraper_engine)
+    return client
+
+
+def _read(client, **params):
+    response = client.get("/api/changes", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()], int(response.headers["x-next-cursor"])
+
+
+def test_feed_streams_the_scraper_writes_in_order(feed, scraper_engine):
+    assert _read(feed, since=0) == ([], 0)
+    with BulkWriter(scraper_engine) as writer:
+        writer.add_service(900001, "Testdienst", "https://service.berlin.de/dienstleistung/900001/", True)
+        writer.replace_formulare(900001, [{"title": "Antrag", "url": "https://example.org/antrag.pdf"}])
+        writer.add_standort(900002, "Testamt", "/standort/900002/", "Teststraße 1, 10115 Berlin")
+        writer.link_services(900002, [900001])
+    events, cursor = _read(feed, since=0)
+    assert [(event["entity"], event["op"]) for event in events] == [
+        ("service", "created"), ("formular", "created"), ("standort", "created"), ("link", "created"),
+    ]
+    assert [event["cursor"] for event in events] == list(range(1, 5)) and cursor == 4
+    assert events[1]["related_id"] == 900001 and events[3]["id"] == 900002
+    assert all(len(event["content_hash"]) == 32 for event in events)
+
+    with BulkWriter(scraper_engine) as writer:
+        writer.add_service(900001, "Testdienst (neu)", "https://service.berlin.de/dienstleistung/900001/", True)
+    # a client that read everything only gets the new event
+    (event,), cursor = _read(feed, since=4)
+    assert (event["entity"], event["id"], event["op"], cursor) == ("service", 900001, "updated", 5)
+
+
+def test_feed_is_paged_with_limit(feed, scraper_engine):
+    with BulkWriter(scraper_engine) as writer:
+        for service_id in range(900001, 900006):
+            writer.add_service(service_id, f"Testdienst {service_id}", f"https://example.org/{service_id}/", False)
+    seen, cursor = [], 0
+    while True:
+        events, next_cursor = _read(feed, since=cursor, limit=2)
+        if not events:
+            break
+        assert len(events) <= 2 and next_cursor == events[-1]["cursor"]
+        seen.extend(event["id"] for event in events)
+        cursor = next_cursor
+    assert seen == list(range(900001, 900006))
+    assert cursor == 5
+
+
+def test_cursors_outside_the_log_are_gone(feed, scraper_engine):
+    with BulkWriter(scraper_engine) as writer:
+        writer.add_service(900001, "Testdienst", "https://example.org/900001/", False)
+    assert feed.get("/api/changes", params={"since": 7}).status_code == 410
+    with scraper_engine.begin() as conn:
+        assert changes.prune(conn, time.time() + 1) == 1
+    # the pruned event can not be streamed any more, a client that saw it may continue
+    assert feed.get("/api/changes", params={"since": 0}).status_code == 410
+    assert _read(feed, since=1) == ([], 1)
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import event, text
+
+from app.main import app
+
+REQUESTS = 16
+DELAY = 0.1
+
+
+def test_slow_statements_do_not_block_the_event_loop(engine):
+    with engine.connect() as conn:
+        service_id = conn.execute(text("SELECT id FROM service LIMIT 1")).scalar()
+    statements = []
+
+    def slow_statement(*_):
+        statements.append(1)
+        time.sleep(DELAY)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def probe_latencies():
+                latencies = []
+                while len(latencies) < 10:
+                    start = time.perf_counter()
+                    await client.get("/")
+                    latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(0.02)
+                return latencies
+
+            start = time.perf_counter()
+            slow = [client.get(f"/api/services/{service_id}", params={"n": i}) for i in range(REQUESTS)]
+            responses, latencies = await asyncio.gather(asyncio.gather(*slow), probe_latencies())
+            return responses, latencies, time.perf_counter() - start
+
+    event.listen(engine, "before_cursor_execute", slow_statement)
+    try:
+        responses, latencies, elapsed = asyncio.run(run())
+    finally:
+        event.remove(engine, "before_cursor_execute", slow_statement)
+
+    assert all(response.status_code == 200 for response in responses)
+    # run one after another, the statements would take len(statements) * DELAY
+    assert elapsed < len(statements) * DELAY / 2
+    # a statement run on the event loop would hold every other request for at least DELAY
+    assert max(latencies) < DELAY
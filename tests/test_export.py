@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+
+import openpyxl
+import pytest
+from sqlalchemy import text
+
+from app import export
+
+
+def _rows(engine, table):
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(f'SELECT * FROM "{table}" ORDER BY rowid'))]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 10000])
+def test_ndjson_endpoint_streams_every_row(client, engine, chunk_size):
+    response = client.get("/api/export", params={"table": "formular", "format": "ndjson", "chunk_size": chunk_size})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    names = export.columns(engine, "formular")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [tuple(line[name] for name in names) for line in lines] == _rows(engine, "formular")
+
+
+def test_csv_endpoint_has_a_header_and_every_row(client, engine):
+    response = client.get("/api/export", params={"table": "standorteservices", "format": "csv", "chunk_size": 4})
+    assert response.headers["content-disposition"] == 'attachment; filename="standorteservices.csv"'
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == export.columns(engine, "standorteservices")
+    assert len(rows) == len(_rows(engine, "standorteservices"))
+
+
+def test_unknown_table_is_not_exported(client):
+    assert client.get("/api/export", params={"table": "user"}).status_code == 404
+
+
+def test_cli_export_writes_one_file_per_table(engine, tmp_path):
+    results = export.export(engine, "ndjson", str(tmp_path / "export"), chunk_size=50)
+    assert [stats.table for stats in results] == list(export.TABLES)
+    for stats in results:
+        with open(tmp_path / "export" / f"{stats.table}.ndjson", encoding="utf-8") as exported:
+            assert sum(1 for _ in exported) == stats.rows == len(_rows(engine, stats.table))
+
+
+def test_xlsx_export_has_a_sheet_per_table(engine, tmp_path):
+    path = tmp_path / "services.xlsx"
+    results = export.export(engine, "xlsx", str(path), tables=("service", "standorte"), chunk_size=30)
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Services", "Standorte"]
+    for stats, sheet in zip(results, workbook.worksheets):
+        assert sum(1 for _ in sheet.iter_rows()) == stats.rows + 1
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from app import geocoding, settings
+from app.spatial import GridIndex, haversine_m
+
+
+def test_gazetteer_matches_addresses_then_postcodes(tmp_path):
+    path = tmp_path / "gazetteer.csv"
+    path.write_text("address,lat,lon\n\"Yorckstraße 4, 10965 Berlin\",52.4929,13.3886\n10178,52.5219,13.4132\n", encoding="utf-8")
+    gazetteer = geocoding.GazetteerGeocoder(str(path))
+    assert gazetteer.geocode("Yorckstrasse 4,10965  Berlin") == (52.4929, 13.3886)
+    assert gazetteer.geocode("Karl-Marx-Allee 31, 10178 Berlin") == (52.5219, 13.4132)
+    assert gazetteer.geocode("Carl-Schurz-Straße 2, 13597 Berlin") is None
+
+
+def test_a_missing_gazetteer_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "GAZETTEER_PATH", str(tmp_path / "missing.csv"))
+    with pytest.raises(geocoding.GazetteerMissing, match="missing.csv"):
+        geocoding.ensure_available("gazetteer")
+    with pytest.raises(geocoding.GazetteerMissing):
+        geocoding.make_geocoder("gazetteer")
+    geocoding.ensure_available("none")
+
+
+def test_nearest_orders_standorte_by_distance(client):
+    # Mehringdamm, about 1 km from the Kreuzberg office and 3 km from the one in Mitte
+    hits = client.get("/api/standorte/nearest", params={"lat": 52.4935, "lon": 13.3878, "k": 3}).json()
+    assert [hit["id"] for hit in hits] == [300001, 300000, 300002]
+    distances = [hit["distance_m"] for hit in hits]
+    assert distances == sorted(distances) and distances[0] < 100
+    assert (hits[0]["lat"], hits[0]["lon"]) == (52.4929, 13.3886)
+
+
+def test_nearest_only_returns_standorte_offering_the_service(client, engine):
+    with engine.connect() as conn:
+        service_id = conn.exec_driver_sql(
+            "SELECT service_id FROM standorteservices WHERE standort_id IN (300000, 300002) "
+            "GROUP BY service_id HAVING count(*) = 2 LIMIT 1"
+        ).scalar_one()
+    hits = client.get("/api/standorte/nearest", params={"lat": 52.4935, "lon": 13.3878, "service_id": service_id}).json()
+    assert [hit["id"] for hit in hits] == [300000, 300002]
+
+
+def test_grid_index_agrees_with_a_full_scan():
+    rng = random.Random(19)
+    points = [(i, 52.35 + rng.random() * 0.33, 13.1 + rng.random() * 0.65) for i in range(2000)]
+    grid = GridIndex(points, cell_km=0.5)
+    # the city centre, its edge, and Potsdam outside the covered area
+    for lat, lon in [(52.52, 13.405), (52.36, 13.74), (52.39, 12.97)]:
+        for accept in (None, lambda point_id: point_id % 7 == 0):
+            expected = sorted(
+                (haversine_m(lat, lon, point_lat, point_lon), point_id)
+                for point_id, point_lat, point_lon in points
+                if accept is None or accept(point_id)
+            )[:5]
+            found = grid.nearest(lat, lon, k=5, accept=accept)
+            assert [point_id for point_id, _ in found] == [point_id for _, point_id in expected]
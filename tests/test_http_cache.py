@@ -0,0 +1,67 @@
+import httpx
+import pytest
+
+from http_cache import ResponseCache
+
+URL = "https://service.berlin.de/dienstleistung/120335/"
+
+
+class Site:
+    """A page that answers If-None-Match with 304 while its ETag is current."""
+
+    def __init__(self):
+        self.body = "<h1>Abmeldung einer Wohnung</h1>"
+        self.etag = '"v1"'
+        self.requests = []
+
+    def handle(self, request):
+        self.requests.append(dict(request.headers))
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(200, text=self.body, headers={"ETag": self.etag, "Last-Modified": "Wed, 01 Oct 2026 08:00:00 GMT"})
+
+
+@pytest.fixture
+def site():
+    return Site()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http_cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def _fetch(site, cache):
+    with httpx.Client(transport=httpx.MockTransport(site.handle)) as client:
+        return cache.resolve(URL, client.get(URL, headers=cache.conditional_headers(URL)))
+
+
+def test_saved_pages_are_revalidated_and_served_from_the_cache(site, cache):
+    page = _fetch(site, cache)
+    assert page.changed and "if-none-match" not in site.requests[0]
+    cache.save(page)
+
+    again = _fetch(site, cache)
+    assert site.requests[1]["if-none-match"] == '"v1"'
+    assert site.requests[1]["if-modified-since"] == "Wed, 01 Oct 2026 08:00:00 GMT"
+    assert not again.changed and again.text == site.body
+    assert (cache.stats.not_modified, cache.stats.misses, cache.stats.bytes_saved) == (1, 1, len(site.body))
+
+
+def test_a_new_etag_with_the_same_body_is_not_a_change(site, cache):
+    cache.save(_fetch(site, cache))
+    site.etag = '"v2"'
+    page = _fetch(site, cache)
+    assert not page.changed and cache.stats.identical == 1
+    site.body = "<h1>Abmeldung einer Wohnung (neu)</h1>"
+    site.etag = '"v3"'
+    assert _fetch(site, cache).changed
+
+
+def test_unsaved_pages_are_fetched_again(site, cache):
+    # a page is only saved once its records have been written, so a failed write is redone
+    _fetch(site, cache)
+    page = _fetch(site, cache)
+    assert page.changed and "if-none-match" not in site.requests[1]
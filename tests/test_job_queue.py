@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import job_queue
+import pytest
+
+from app.database import make_engine
+
+
+@pytest.fixture
+def queue(scraper_engine):
+    job_queue.ScrapeJob.__table__.create(scraper_engine)
+    job_queue.enqueue(scraper_engine, "service", [(ref_id, f"Dienst {ref_id}", f"https://example.org/{ref_id}/") for ref_id in range(8)])
+    return scraper_engine
+
+
+def _claim_all(engine):
+    return job_queue.claim(engine, "test-worker", limit=100)
+
+
+def test_failed_job_is_retried_with_backoff_until_attempts_run_out(queue):
+    claimed = _claim_all(queue)
+    job_id, *_, attempts = claimed[0]
+    with queue.begin() as conn:
+        job_queue.mark_done(conn, [job[0] for job in claimed[1:]])
+    job_queue.mark_failed(queue, job_id, attempts, "HTTP 503", max_attempts=2, backoff=60)
+    assert _claim_all(queue) == []
+    assert job_queue.next_due(queue) > 50
+
+    with queue.begin() as conn:
+        conn.execute(job_queue._jobs().update().values(next_attempt_at=0.0))
+    (job_id, *_, attempts), = _claim_all(queue)
+    assert attempts == 2
+    job_queue.mark_failed(queue, job_id, attempts, "HTTP 503", max_attempts=2)
+    assert job_queue.status_counts(queue) == {job_queue.DONE: 7, job_queue.FAILED: 1}
+    assert _claim_all(queue) == []
+
+
+def test_resume_requeues_only_failed_and_interrupted_jobs(queue):
+    claimed = _claim_all(queue)
+    assert len(claimed) == 8
+    failed, interrupted, *done = claimed
+    with queue.begin() as conn:
+        job_queue.mark_done(conn, [job[0] for job in done])
+    job_queue.mark_failed(queue, failed[0], failed[-1], "HTTP 500", max_attempts=1)
+    assert job_queue.status_counts(queue) == {job_queue.DONE: 6, job_queue.FAILED: 1, job_queue.RUNNING: 1}
+
+    assert job_queue.has_unfinished(queue)
+    assert job_queue.resume(queue) == (1, 1)
+    resumed = _claim_all(queue)
+    assert sorted(job[0] for job in resumed) == sorted([failed[0], interrupted[0]])
+    # a failed job starts over with a fresh set of attempts
+    assert {job[0]: job[-1] for job in resumed}[failed[0]] == 1
+
+
+def test_finished_queue_has_nothing_to_resume(queue):
+    claimed = _claim_all(queue)
+    with queue.begin() as conn:
+        job_queue.mark_done(conn, [job[0] for job in claimed])
+    assert not job_queue.has_unfinished(queue)
+
+
+def test_concurrent_workers_never_claim_a_job_twice(queue):
+    job_queue.enqueue(queue, "standort", [(ref_id, f"Amt {ref_id}", f"/standort/{ref_id}/") for ref_id in range(200)])
+
+    def work(worker):
+        # every worker process has its own connection to the database
+        engine = make_engine("scraper", queue.url.database)
+        claimed = []
+        while batch := job_queue.claim(engine, worker, limit=3):
+            claimed.extend(job[0] for job in batch)
+        engine.dispose()
+        return claimed
+
+    with ThreadPoolExecutor(4) as pool:
+        claimed = [job_id for batch in pool.map(work, [f"worker-{i}" for i in range(4)]) for job_id in batch]
+    assert len(claimed) == len(set(claimed)) == 208
+    assert job_queue.status_counts(queue) == {job_queue.RUNNING: 208}
@@ -0,0 +1,48 @@
+from sqlalchemy import text
+
+from app import settings, templating
+
+
+def _samples(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def _delta(before, after, sample):
+    return after.get(sample, 0.0) - before.get(sample, 0.0)
+
+
+def test_requests_are_recorded_per_route_template(client, engine):
+    with engine.connect() as conn:
+        service_ids = conn.execute(text("SELECT id FROM service ORDER BY id LIMIT 3")).scalars().all()
+    api = 'method="GET",route="/api/services/{service_id}"'
+    page = 'method="GET",route="/services/{service_id}"'
+    templating.render_cache.clear()
+    before = _samples(client)
+    for service_id in service_ids:
+        client.get(f"/api/services/{service_id}")
+        client.get(f"/services/{service_id}")
+    client.get("/no/such/page")
+    after = _samples(client)
+
+    # one series per route template, not per id
+    assert _delta(before, after, f'http_requests_total{{{api},status="200"}}') == 3
+    assert _delta(before, after, f"http_request_duration_seconds_count{{{api}}}") == 3
+    assert _delta(before, after, f'http_request_duration_seconds_bucket{{{api},le="+Inf"}}') == 3
+    assert _delta(before, after, f"http_request_db_statements_total{{{api}}}") >= 3
+    assert _delta(before, after, f"http_request_db_seconds_total{{{api}}}") > 0
+    assert _delta(before, after, f"http_request_render_seconds_total{{{page}}}") > 0
+    assert _delta(before, after, 'http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert not any(str(service_ids[0]) in sample for sample in after)
+
+
+def test_metrics_can_be_turned_off(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS", False)
+    assert client.get("/metrics").status_code == 404
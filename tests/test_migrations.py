@@ -0,0 +1,16 @@
+import shutil
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.migrations import PendingMigrations, ensure_current, migrate
+from benchmarks.fixtures import REPO_DB
+
+
+def test_unmigrated_database_is_refused_until_migrated(tmp_path):
+    path = shutil.copyfile(REPO_DB, tmp_path / "services.db")
+    engine = create_engine(f"sqlite:///{path}")
+    with pytest.raises(PendingMigrations, match="python -m app.migrations migrate"):
+        ensure_current(engine)
+    migrate(engine)
+    ensure_current(engine)
@@ -0,0 +1,33 @@
+from app import templating
+from app.schemas import FormularOut, NearestStandort, ServiceBundle, ServiceDetailOut, ServiceOut, StandortOut
+
+
+def test_cached_next_link_does_not_carry_the_host(client):
+    templating.render_cache.clear()
+    first = client.get("/api/services/?limit=2", headers={"Host": "internal:8000"})
+    second = client.get("/api/services/?limit=2", headers={"Host": "services.example.org"})
+    cursor = first.headers["x-next-cursor"]
+    assert first.headers["link"] == f'</api/services/?limit=2&cursor={cursor}>; rel="next"'
+    assert second.headers["link"] == first.headers["link"]
+
+
+def test_next_link_continues_the_list(client):
+    first = client.get("/api/services/?limit=2&order=name&fields=id")
+    target = first.headers["link"].split(">")[0][1:]
+    second = client.get(target)
+    assert second.status_code == 200
+    assert not {row["id"] for row in first.json()} & {row["id"] for row in second.json()}
+
+
+def test_records_match_their_documented_shapes(client):
+    templating.render_cache.clear()
+    for url, schema in (("/api/services/", ServiceOut), ("/api/standorte/", StandortOut), ("/api/formulare/", FormularOut)):
+        row = client.get(url, params={"limit": 1}).json()[0]
+        assert set(row) == set(schema.model_fields), url
+        assert client.get(url, params={"fields": "id,content_hash"}).status_code == 400
+    service_id = client.get("/api/services/", params={"limit": 1}).json()[0]["id"]
+    bundle = client.get(f"/api/services/{service_id}", params={"include": "detail,formulare,standorte"}).json()
+    assert set(bundle) == set(ServiceBundle.model_fields)
+    assert set(bundle["detail"]) == set(ServiceDetailOut.model_fields)
+    nearest = client.get("/api/standorte/nearest", params={"lat": 52.52, "lon": 13.4, "k": 1}).json()[0]
+    assert set(nearest) == set(NearestStandort.model_fields)
@@ -0,0 +1,82 @@
+import parsers
+
+SERVICE_PAGE = """
+<html><head><title>Service Berlin</title><script>var tracking = 1;</script></head><body>
+<nav><ul class="menu"><li><a href="/">Start</a></li></ul></nav>
+<h1 class="title">Abmeldung einer Wohnung</h1>
+<div id="layout-grid__area--maincontent" class="servicedetail-view">
+  <p>Wer aus Deutschland wegzieht, muss sich abmelden.</p>
+  <h2>Voraussetzungen</h2><ul><li>Auszug ins Ausland</li></ul>
+  <h2 id="Online-Abwicklung">Online-Abwicklung</h2><p>Die Abmeldung ist online möglich.</p>
+  <h2>Für Sie zuständig</h2><p>Bürgeramt</p>
+</div>
+<h2 class="title">Formulare</h2>
+<ul class="list-clean">
+  <li><a href="https://service.berlin.de/abmeldung.pdf"> Abmeldung </a></li>
+  <li><a href="https://service.berlin.de/vollmacht.pdf">Vollmacht</a></li>
+</ul>
+<footer><ul class="list-clean"><li><a href="/impressum/">Impressum</a></li></ul></footer>
+</body></html>
+"""
+
+STANDORT_PAGE = """
+<html><body>
+<h1>Bürgeramt Mitte</h1>
+<div class="modul-contact"><ul>
+  <li class="address loc">Karl-Marx-Allee 31, 10178 Berlin</li>
+  <li class="tel">Tel.: (030) 115</li>
+  <li class="fax">Fax: (030) 9018 0</li>
+  <li class="email"><a href="mailto:buergeramt@ba-mitte.berlin.de">E-Mail</a></li>
+  <li class="homepage"><a href="https://www.berlin.de/ba-mitte/ ">Website</a></li>
+</ul></div>
+<form class="location_servicelist_checkboxgroup">
+  <input type="checkbox" name="anliegen[]" value="120335"/>
+  <input type="checkbox" name="anliegen[]" value="keine-nummer"/>
+  <input type="checkbox" name="anliegen[]" value="120686"/>
+  <input type="checkbox" name="newsletter" value="1"/>
+</form>
+</body></html>
+"""
+
+
+def test_strained_service_page_parses_like_the_full_page():
+    details, online, formulare = parsers.parse_service_detail(SERVICE_PAGE)
+    assert (details, online, formulare) == parsers.extract_service_detail(parsers.make_soup(SERVICE_PAGE))
+    assert details["title"] == "Abmeldung einer Wohnung"
+    assert "wegzieht" in details["description"] and "Für Sie zuständig" not in details["description"]
+    assert online is True
+    assert formulare == [
+        {"title": "Abmeldung", "url": "https://service.berlin.de/abmeldung.pdf"},
+        {"title": "Vollmacht", "url": "https://service.berlin.de/vollmacht.pdf"},
+    ]
+
+
+def test_service_page_without_online_section_or_formulare():
+    page = SERVICE_PAGE.replace(' id="Online-Abwicklung"', "").replace(">Formulare<", ">Links<")
+    _, online, formulare = parsers.parse_service_detail(page)
+    assert (online, formulare) == (False, [])
+
+
+def test_strained_standort_page_parses_like_the_full_page():
+    parsed = parsers.parse_standorte_details(STANDORT_PAGE)
+    assert parsed == parsers.extract_standorte_details(parsers.make_soup(STANDORT_PAGE))
+    assert parsed == (
+        "Karl-Marx-Allee 31, 10178 Berlin", "(030) 115", "(030) 9018 0", "buergeramt@ba-mitte.berlin.de",
+        "https://www.berlin.de/ba-mitte/", [120335, 120686],
+    )
+
+
+def test_index_pages():
+    services = parsers.parse_service_index(
+        '<div class="azlist-letter"><h2 class="letter">A</h2></div>'
+        '<ul><li><a href="https://service.berlin.de/dienstleistung/120335/">Abmeldung einer Wohnung</a></li>'
+        '<li><a href="https://service.berlin.de/dienstleistung/120686/"> Anmeldung einer Wohnung </a></li></ul>'
+    )
+    assert services == [("A", [
+        (120335, "Abmeldung einer Wohnung", "https://service.berlin.de/dienstleistung/120335/"),
+        (120686, "Anmeldung einer Wohnung", "https://service.berlin.de/dienstleistung/120686/"),
+    ])]
+    standorte = parsers.parse_standorte_index(
+        '<div class="azlist-letter"><h2 class="letter"> B </h2></div><ul><li><a href="/standort/122210/">Bürgeramt Mitte</a></li><li>kein Link</li></ul>'
+    )
+    assert standorte == [("B", [(122210, "Bürgeramt Mitte", "/standort/122210/")])]
@@ -0,0 +1,20 @@
+import pytest
+
+from app import templating
+from app.instrumentation import QueryBudgetExceeded, assert_query_budget, sample_urls
+from app.models import engine
+
+
+@pytest.mark.parametrize("url", sample_urls(engine))
+def test_route_stays_within_its_query_budget(client, url):
+    # rendered pages would be served from the cache without running any statement
+    templating.render_cache.clear()
+    response = assert_query_budget(client, url)
+    assert response.status_code in (200, 404)
+
+
+def test_exceeded_budget_fails(client):
+    url = sample_urls(engine)[0]
+    templating.render_cache.clear()
+    with pytest.raises(QueryBudgetExceeded):
+        assert_query_budget(client, url, max_queries=0)
@@ -0,0 +1,21 @@
+import pytest
+
+from app import templating
+from app.instrumentation import sample_urls
+from app.models import engine
+from app.query_plans import check, full_scans
+
+
+def test_constant_rows_and_temp_b_trees_are_not_table_scans():
+    plan = ["SCAN CONSTANT ROW", "USE TEMP B-TREE FOR ORDER BY", "SEARCH service USING INTEGER PRIMARY KEY (rowid=?)"]
+    assert full_scans(plan) == []
+    assert full_scans(["SCAN service"]) == ["service"]
+    assert full_scans(["SCAN service"], frozenset({"service"})) == []
+
+
+@pytest.mark.parametrize("url", sample_urls(engine))
+def test_route_scans_only_declared_tables(client, url):
+    # rendered pages would be served from the cache without running any statement
+    templating.render_cache.clear()
+    _, failures = check(client, engine, url)
+    assert failures == []
@@ -0,0 +1,32 @@
+import pytest
+
+from app.models import Formular, Service, Standorte
+from app.pagination import page_request
+from app.read_model import ReadModel
+from app.repository import SqlRepository
+
+# SQLite's LIKE folds the case of ASCII letters only, the read model has to match it
+SEARCHES = ["wohnung", "WOHNUNG", "Änderung", "änderung", "ÄNDERUNG", "bürgeramt", "BÜRGERAMT", "BüRGERAMT", "antrag"]
+
+
+@pytest.fixture(scope="module")
+def repositories(engine):
+    return ReadModel.load(engine), SqlRepository(engine)
+
+
+@pytest.mark.parametrize("search", SEARCHES)
+def test_search_matches_the_sql_repository(repositories, search):
+    model, sql = repositories
+    for method, page_method, entity in (
+        ("services", "services_page", Service), ("standorte", "standorte_page", Standorte), ("formulare", "formulare_page", Formular),
+    ):
+        assert {row.id for row in getattr(model, method)(search)} == {row.id for row in getattr(sql, method)(search)}, method
+        page = page_request(entity, "name", limit=5)
+        assert getattr(model, page_method)(page, search) == getattr(sql, page_method)(page, search), page_method
+
+
+def test_non_ascii_letters_keep_their_case(repositories):
+    model, _ = repositories
+    assert "Änderung/Wechsel der Hauptwohnung" not in {service.service_name for service in model.services("änderung")}
+    assert [service.service_name for service in model.services("Änderung")] == ["Änderung/Wechsel der Hauptwohnung"]
+    assert len(model.standorte("BüRGERAMT")) == 3
@@ -0,0 +1,48 @@
+import json
+
+import run_report
+from bulk_writer import BulkWriter
+
+
+def test_report_counts_fetches_and_row_outcomes(scraper_engine, tmp_path):
+    stats = run_report.RunStats()
+    with stats.stage("services"):
+        stats.record_fetch(0.05, 200, 2048)
+        stats.record_fetch(0.2, 304)
+        stats.record_fetch(1.5, error="ConnectTimeout")
+        with BulkWriter(scraper_engine, stats=stats) as writer:
+            writer.add_service(900001, "Testdienst", "https://example.org/900001/", False)
+        with BulkWriter(scraper_engine, stats=stats) as writer:
+            writer.add_service(900001, "Testdienst", "https://example.org/900001/", False)
+            writer.add_service(900002, "Zweiter Testdienst", "https://example.org/900002/", True)
+    # a queue worker reports separately, its numbers are merged into the run's
+    worker = run_report.RunStats()
+    worker.record_fetch(0.1, 200, 1024)
+    worker.parse.add(0.01)
+    stats.merge(worker)
+
+    report = run_report.build(stats, "sequential", 1_700_000_000, 1_700_000_010, error=None)
+    assert report["status"] == "ok" and report["duration_seconds"] == 10
+    assert report["fetch"]["requests"] == 4
+    assert report["fetch"]["bytes"] == 3072
+    assert report["fetch"]["status_codes"] == {"200": 2, "304": 1}
+    assert report["fetch"]["errors"] == {"ConnectTimeout": 1}
+    assert report["db_write"]["count"] == 2 and report["parse"]["count"] == 1
+    assert report["rows"] == {"service": {"created": 2, "updated": 0, "deleted": 0, "unchanged": 1}}
+    assert set(report["stages"]) == {"services"}
+
+    path, textfile = tmp_path / "report.json", tmp_path / "scrape.prom"
+    run_report.write(report, stats, str(path), str(textfile))
+    assert json.loads(path.read_text()) == report
+    metrics = textfile.read_text()
+    assert "services_scrape_success 1" in metrics
+    assert 'services_scrape_fetch_responses{code="304"} 1' in metrics
+    assert 'services_scrape_rows{entity="service",outcome="created"} 2' in metrics
+    assert "services_scrape_fetch_duration_seconds_count 4" in metrics
+
+
+def test_failed_run_is_reported(tmp_path):
+    report = run_report.build(run_report.RunStats(), "queue", 1_700_000_000, 1_700_000_001, error="HTTPError: 503")
+    assert (report["status"], report["error"], report["cache"]) == ("failed", "HTTPError: 503", None)
+    assert "services_scrape_success 0" in run_report.prometheus_text(report, run_report.RunStats())
+    assert run_report.summary(report).startswith("Run failed in 1.0 s: 0 requests")
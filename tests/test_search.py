@@ -0,0 +1,23 @@
+from app import search_index
+
+
+def test_snippets_show_the_original_text(client):
+    for query in ("Führungszeugnis", "führungszeugnis", "FUEHRUNGSZEUGNIS"):
+        hits = client.get("/api/search", params={"q": query, "kind": "service"}).json()
+        snippets = " ".join(hit["snippet"] for hit in hits)
+        assert "<mark>Führungszeugnis" in snippets, query
+        assert "ueh" not in snippets
+
+
+def test_reindex_replaces_the_indexed_text(scraper_engine):
+    with scraper_engine.begin() as conn:
+        service_id = conn.exec_driver_sql("SELECT id FROM service ORDER BY id LIMIT 1").scalar_one()
+        conn.exec_driver_sql("UPDATE service SET service_name = 'Straßenfest anmelden' WHERE id = ?", (service_id,))
+        search_index.reindex(conn, "service", [service_id])
+
+        hits = search_index.search(conn, "strassenfest", kinds=["service"])
+        assert [(hit["id"], hit["title"]) for hit in hits] == [(service_id, "Straßenfest anmelden")]
+        # the replaced document left the index along with its content row
+        documents = conn.exec_driver_sql(f"SELECT count(*) FROM {search_index.DOCUMENTS}").scalar_one()
+        indexed = conn.exec_driver_sql(f"SELECT count(*) FROM {search_index.TABLE}_docsize").scalar_one()
+        assert documents == indexed
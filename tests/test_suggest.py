@@ -0,0 +1,55 @@
+import random
+
+from app.suggest import TOP_K, SuggestIndex, words
+
+
+def _naive(entries, query, kinds=None):
+    """The labels that a SuggestIndex matches without typos: every query word starts one of their words."""
+    tokens = words(query)
+    return {
+        label for kind, _, _, label in entries
+        if (not kinds or kind in kinds) and all(any(word.startswith(token) for word in words(label)) for token in tokens)
+    }
+
+
+def test_typed_prefixes_and_typos_find_the_label():
+    index = SuggestIndex([
+        ("service", 1, 1, "Personalausweis beantragen"),
+        ("service", 2, 2, "Reisepass beantragen"),
+        ("formular", 3, 2, "Antrag auf einen Reisepass"),
+        ("standort", 4, None, "Bürgeramt Mitte"),
+    ])
+    assert [hit["title"] for hit in index.suggest("perso")] == ["Personalausweis beantragen"]
+    assert index.suggest("Personalauswies")[0] == {
+        "kind": "service", "id": 1, "service_id": 1, "title": "Personalausweis beantragen", "edits": 1,
+    }
+    # the label starting with the query goes first
+    assert [hit["id"] for hit in index.suggest("reisepass")] == [2, 3]
+    assert [hit["id"] for hit in index.suggest("reisepass", kinds=["formular"])] == [3]
+    assert [hit["title"] for hit in index.suggest("buergeramt")] == ["Bürgeramt Mitte"]
+    assert [hit["title"] for hit in index.suggest("Bürgeramt mi")] == ["Bürgeramt Mitte"]
+    # short words are never taken for typos
+    assert index.suggest("pas") == []
+
+
+def test_exact_matches_agree_with_a_full_scan():
+    rng = random.Random(21)
+    vocabulary = ["antrag", "ausweis", "anmeldung", "wohnung", "gewerbe", "pass", "parken", "park", "bürger", "amt"]
+    # more labels than TOP_K share a prefix, so the trie keeps their ranks as bitsets
+    entries = [
+        (rng.choice(["service", "formular", "standort"]), i, i, " ".join(rng.sample(vocabulary, 3)))
+        for i in range(4 * TOP_K)
+    ]
+    index = SuggestIndex(entries)
+    for query in ["a", "an", "antrag wo", "pa", "park pass", "bürg amt", "ausweis gewerbe park"]:
+        for kinds in (None, ["service", "standort"]):
+            expected = _naive(entries, query, kinds)
+            hits = index.suggest(query, limit=len(entries), kinds=kinds)
+            assert {hit["title"] for hit in hits if hit["edits"] == 0} == expected
+
+
+def test_suggest_endpoint(client):
+    hits = client.get("/api/suggest", params={"q": "anmeldng wohn"}).json()
+    assert hits[0] == {"kind": "service", "id": 120686, "service_id": 120686, "title": "Anmeldung einer Wohnung", "edits": 1}
+    assert all(hit["kind"] == "formular" for hit in client.get("/api/suggest", params={"q": "antrag", "kind": "formular"}).json())
+    assert client.get("/api/suggest", params={"q": "x", "limit": 51}).status_code == 422